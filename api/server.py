@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Royal Restaurant Billing System - Headless JSON API
+A lightweight asyncio HTTP/JSON server for POS tablets and handheld devices,
+built on the same db_utils and calculator functions as the Streamlit pages.
+
+Endpoints:
+    GET  /api/health
+    GET  /api/menu
+    POST /api/cart/price                 {"items": [{"id": 1, "quantity": 2}], "discount_percent": 0}
+    POST /api/orders                     {"service_mode": "Dine-In", "payment_method": "Cash", "items": [...], ...}
+    GET  /api/orders?from=YYYY-MM-DD&to=YYYY-MM-DD
+    GET  /api/orders/<order_number>
+    GET  /api/tabs
+    GET  /api/tabs/<table_number>
+    POST /api/tabs/<table_number>/items  {"items": [{"id": 1, "quantity": 2}]}
+    POST /api/orders/<order_number>/status  {"status": "Preparing"}
+    GET  /api/kitchen/tickets
+    GET  /api/kitchen/events?after=<event_id>&wait=<seconds>   (long poll)
+    GET  /api/customers?q=<phone or name prefix>
+    GET  /api/customers/<phone>
+    GET  /api/reports/sales-summary?from=YYYY-MM-DD&to=YYYY-MM-DD
+    GET  /api/reports/heatmap?from=YYYY-MM-DD&to=YYYY-MM-DD
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs, unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import db_utils
+from db.change_feed import get_watcher, POLL_INTERVAL
+from db.models import Order, OrderItem
+from db.order_queue import submit_order, OrderQueueFull
+from utils.calculator import calculate_order_total, validate_order, generate_bill_text
+
+SERVICE_MODES = ["Dine-In", "Takeaway"]
+PAYMENT_METHODS = ["Cash", "Card", "UPI", "Net Banking"]
+
+# Menu is re-read at most this often (seconds) so pricing stays cheap
+MENU_TTL = 5.0
+
+MAX_BODY_BYTES = 1_000_000
+
+# Longest a kitchen events request is held open waiting for changes (seconds)
+KITCHEN_WAIT_MAX = 30.0
+
+# Threads waiting on order acknowledgements; sized so batches can fill up
+_write_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix='order-submit')
+
+# Unexpected errors are logged here; clients only get a generic message
+logger = logging.getLogger('restaurant.api')
+
+STATUS_TEXT = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error',
+               503: 'Service Unavailable'}
+
+class ApiError(Exception):
+    """Error returned to the client as a JSON body"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+_menu = {'loaded_at': 0.0, 'items': [], 'by_id': {}}
+
+async def load_menu():
+    """Get available menu items, refreshing at most every MENU_TTL seconds"""
+    if time.monotonic() - _menu['loaded_at'] > MENU_TTL:
+        items = [item.to_dict() for item in await asyncio.to_thread(db_utils.list_menu_items)]
+        _menu['items'] = items
+        _menu['by_id'] = {int(item['id']): item for item in items}
+        _menu['loaded_at'] = time.monotonic()
+    return _menu
+
+async def price_items(requested_items):
+    """Turn [{"id", "quantity"}] into order items priced from the menu"""
+    if not isinstance(requested_items, list) or not requested_items:
+        raise ApiError(400, "items must be a non-empty list")
+
+    menu = await load_menu()
+    order_items = []
+    for requested in requested_items:
+        try:
+            item_id = int(requested['id'])
+            quantity = int(requested['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise ApiError(400, "each item needs an integer id and quantity")
+        menu_item = menu['by_id'].get(item_id)
+        if menu_item is None:
+            raise ApiError(400, f"menu item {item_id} is not available")
+        try:
+            order_items.append(OrderItem.from_dict(dict(menu_item, quantity=quantity)))
+        except ValueError as e:
+            raise ApiError(400, str(e))
+
+    is_valid, message = validate_order(order_items)
+    if not is_valid:
+        raise ApiError(400, message)
+    return order_items
+
+def get_discount(body):
+    """Read and bound the discount percentage like the Order Entry slider"""
+    try:
+        discount_percent = float(body.get('discount_percent', 0))
+    except (TypeError, ValueError):
+        raise ApiError(400, "discount_percent must be a number")
+    if not 0 <= discount_percent <= 50:
+        raise ApiError(400, "discount_percent must be between 0 and 50")
+    return discount_percent
+
+def get_date_range(query):
+    """Read from/to query parameters, defaulting to today"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    date_from = query.get('from', [today])[0]
+    date_to = query.get('to', [date_from])[0]
+    for value in (date_from, date_to):
+        try:
+            datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            raise ApiError(400, "dates must use YYYY-MM-DD")
+    return date_from, date_to
+
+async def handle_health(query, body):
+    return 200, {'status': 'ok', 'outlet': db_utils.OUTLET_ID}
+
+async def handle_menu(query, body):
+    menu = await load_menu()
+    return 200, menu['items']
+
+async def handle_cart_price(query, body):
+    order_items = await price_items(body.get('items'))
+    calculations = calculate_order_total(order_items, get_discount(body))
+    return 200, {'items': [item.to_dict() for item in order_items], 'calculations': calculations}
+
+async def handle_create_order(query, body):
+    service_mode = body.get('service_mode')
+    if service_mode not in SERVICE_MODES:
+        raise ApiError(400, f"service_mode must be one of {SERVICE_MODES}")
+    payment_method = body.get('payment_method')
+    if payment_method not in PAYMENT_METHODS:
+        raise ApiError(400, f"payment_method must be one of {PAYMENT_METHODS}")
+
+    # "bill_tab": true bills the open tab of table_number instead of sent items
+    tab_version = None
+    if body.get('bill_tab'):
+        if service_mode != "Dine-In" or not str(body.get('table_number', '')).strip():
+            raise ApiError(400, "bill_tab needs a Dine-In order with a table_number")
+        order_items, tab_version = await asyncio.to_thread(db_utils.get_tab, str(body['table_number']).strip())
+        if not order_items:
+            raise ApiError(404, f"table {body['table_number']} has no open tab")
+    else:
+        order_items = await price_items(body.get('items'))
+    calculations = calculate_order_total(order_items, get_discount(body))
+
+    order = Order(
+        order_number=db_utils.generate_order_number(),
+        service_mode=service_mode,
+        customer_name=str(body.get('customer_name', '')),
+        customer_phone=str(body.get('customer_phone', '')),
+        table_number=str(body.get('table_number', '')).strip() if service_mode == "Dine-In" else '',
+        subtotal=calculations['subtotal'],
+        gst_amount=calculations['gst_amount'],
+        discount_amount=calculations['discount_amount'],
+        grand_total=calculations['grand_total'],
+        payment_method=payment_method,
+        order_status='Placed',
+        order_date=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    )
+
+    # The batching writer group-commits orders from every connection; a tab is
+    # saved and closed in its own transaction
+    try:
+        if tab_version is not None:
+            order_id = await asyncio.to_thread(db_utils.save_order, order, order_items, tab_version)
+        else:
+            order_id = await asyncio.wrap_future(_write_executor.submit(submit_order, order, order_items))
+    except OrderQueueFull as e:
+        raise ApiError(503, str(e))
+    except db_utils.TabChanged as e:
+        raise ApiError(409, str(e))
+
+    response = {'order_id': order_id, 'order': order.to_data(), 'items': [item.to_dict() for item in order_items]}
+    if body.get('include_bill'):
+        response['bill_text'] = generate_bill_text(order, order_items, calculations)
+    return 201, response
+
+async def handle_list_orders(query, body):
+    date_from, date_to = get_date_range(query)
+    orders = await asyncio.to_thread(db_utils.list_orders, date_from, date_to)
+    payload = []
+    for order in orders:
+        data = order.to_dict()
+        del data['items_json'], data['items']
+        payload.append(data)
+    return 200, payload
+
+async def handle_get_order(query, body, order_number):
+    order = await asyncio.to_thread(db_utils.get_order_by_number, order_number)
+    if order is None:
+        raise ApiError(404, f"order {order_number} not found")
+    order.pop('items_json', None)
+    return 200, order
+
+async def handle_set_status(query, body, order_number):
+    status = body.get('status')
+    if status not in db_utils.ORDER_STATUSES:
+        raise ApiError(400, f"status must be one of {db_utils.ORDER_STATUSES}")
+    order = await asyncio.to_thread(db_utils.fetch_order, order_number)
+    if order is None or order.id is None or not await asyncio.to_thread(db_utils.set_order_status, order.id, status):
+        raise ApiError(404, f"order {order_number} not found")
+    return 200, {'order_number': order_number, 'status': status}
+
+async def handle_kitchen_tickets(query, body):
+    # Read the event id first so no change between the two reads is missed
+    last_event_id = await asyncio.to_thread(db_utils.get_last_event_id)
+    tickets = await asyncio.to_thread(db_utils.get_tickets)
+    payload = []
+    for ticket in tickets:
+        data = ticket.to_dict()
+        del data['items_json']
+        payload.append(data)
+    return 200, {'tickets': payload, 'last_event_id': last_event_id}
+
+async def handle_kitchen_events(query, body):
+    """Return events after ?after=, holding the request until one arrives or ?wait= passes"""
+    try:
+        after = int(query.get('after', ['0'])[0])
+        wait = float(query.get('wait', ['0'])[0])
+    except ValueError:
+        raise ApiError(400, "after and wait must be numbers")
+    # nan would make the deadline unreachable and the loop below spin forever
+    if not math.isfinite(wait):
+        raise ApiError(400, "wait must be a finite number of seconds")
+    wait = max(0.0, min(wait, KITCHEN_WAIT_MAX))
+
+    watcher = get_watcher()
+    deadline = time.monotonic() + wait
+    while True:
+        # Taken before the query so a commit in between still wakes the wait below
+        version = await asyncio.to_thread(watcher.version)
+        events = await asyncio.to_thread(db_utils.get_order_events, after)
+        if events or time.monotonic() >= deadline:
+            break
+        # data_version moves on any commit, without reading a table; the watcher's
+        # shared connection is still a blocking call, so it stays off the event loop
+        while await asyncio.to_thread(watcher.version) == version and time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+
+    return 200, {'events': events, 'last_event_id': events[-1]['id'] if events else after}
+
+async def handle_list_tabs(query, body):
+    return 200, await asyncio.to_thread(db_utils.list_open_tabs)
+
+async def handle_get_tab(query, body, table_number):
+    order_items, version = await asyncio.to_thread(db_utils.get_tab, table_number)
+    calculations = calculate_order_total(order_items)
+    return 200, {
+        'table_number': table_number,
+        'items': [item.to_dict() for item in order_items],
+        'calculations': calculations,
+        'version': version
+    }
+
+async def handle_add_to_tab(query, body, table_number):
+    order_items = await price_items(body.get('items'))
+    for item in order_items:
+        await asyncio.to_thread(db_utils.add_tab_item, table_number, item)
+    return await handle_get_tab(query, body, table_number)
+
+async def handle_search_customers(query, body):
+    customers = await asyncio.to_thread(db_utils.search_customers, query.get('q', [''])[0])
+    return 200, [customer.to_dict() for customer in customers]
+
+async def handle_get_customer(query, body, phone):
+    customer = await asyncio.to_thread(db_utils.get_customer, phone)
+    if customer is None:
+        raise ApiError(404, f"customer {phone} not found")
+    return 200, customer.to_dict()
+
+async def handle_sales_summary(query, body):
+    date_from, date_to = get_date_range(query)
+    daily_sales, most_sold, payment_breakdown = await asyncio.to_thread(
+        db_utils.get_sales_summary, date_from, date_to, True
+    )
+    return 200, (
+        '{"daily_sales": ' + daily_sales.to_json(orient='records')
+        + ', "most_sold": ' + most_sold.to_json(orient='records')
+        + ', "payment_breakdown": ' + payment_breakdown.to_json(orient='records') + '}'
+    )
+
+async def handle_heatmap(query, body):
+    date_from, date_to = get_date_range(query)
+    heatmap = await asyncio.to_thread(db_utils.get_hourly_heatmap, date_from, date_to, True)
+    return 200, heatmap.to_json(orient='records')
+
+ROUTES = {
+    ('GET', '/api/health'): handle_health,
+    ('GET', '/api/menu'): handle_menu,
+    ('POST', '/api/cart/price'): handle_cart_price,
+    ('POST', '/api/orders'): handle_create_order,
+    ('GET', '/api/orders'): handle_list_orders,
+    ('GET', '/api/tabs'): handle_list_tabs,
+    ('GET', '/api/kitchen/tickets'): handle_kitchen_tickets,
+    ('GET', '/api/kitchen/events'): handle_kitchen_events,
+    ('GET', '/api/customers'): handle_search_customers,
+    ('GET', '/api/reports/sales-summary'): handle_sales_summary,
+    ('GET', '/api/reports/heatmap'): handle_heatmap,
+}
+
+async def dispatch(method, target, body_bytes):
+    """Route a request and return (status, JSON text)"""
+    url = urlsplit(target)
+    query = parse_qs(url.query)
+    path = url.path.rstrip('/') or '/'
+
+    try:
+        body = json.loads(body_bytes) if body_bytes else {}
+        if not isinstance(body, dict):
+            raise ApiError(400, "request body must be a JSON object")
+
+        handler = ROUTES.get((method, path))
+        if handler is not None:
+            status, payload = await handler(query, body)
+        elif method == 'GET' and path.startswith('/api/orders/'):
+            status, payload = await handle_get_order(query, body, unquote(path[len('/api/orders/'):]))
+        elif method == 'POST' and path.startswith('/api/orders/') and path.endswith('/status'):
+            status, payload = await handle_set_status(query, body, unquote(path[len('/api/orders/'):-len('/status')]))
+        elif method == 'POST' and path.startswith('/api/tabs/') and path.endswith('/items'):
+            status, payload = await handle_add_to_tab(query, body, unquote(path[len('/api/tabs/'):-len('/items')]))
+        elif method == 'GET' and path.startswith('/api/tabs/'):
+            status, payload = await handle_get_tab(query, body, unquote(path[len('/api/tabs/'):]))
+        elif method == 'GET' and path.startswith('/api/customers/'):
+            status, payload = await handle_get_customer(query, body, unquote(path[len('/api/customers/'):]))
+        elif any(route_path == path for _, route_path in ROUTES):
+            raise ApiError(405, f"{method} not allowed on {path}")
+        else:
+            raise ApiError(404, f"no route for {path}")
+    except ApiError as e:
+        status, payload = e.status, {'error': e.message}
+    except json.JSONDecodeError:
+        status, payload = 400, {'error': "invalid JSON body"}
+    except Exception:
+        logger.exception(f"{method} {target} failed")
+        status, payload = 500, {'error': "internal server error"}
+
+    # Handlers may return pre-serialized JSON from pandas
+    if not isinstance(payload, str):
+        payload = json.dumps(payload, default=str)
+    return status, payload
+
+async def handle_connection(reader, writer):
+    """Serve HTTP/1.1 requests on one connection, with keep-alive"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                break
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            try:
+                length = int(headers.get('content-length', 0) or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                # The body cannot be skipped without knowing its length
+                status, payload = 400, json.dumps({'error': "invalid Content-Length header"})
+                keep_alive = False
+            elif length > MAX_BODY_BYTES:
+                status, payload = 413, json.dumps({'error': "request body too large"})
+                keep_alive = False
+            else:
+                body_bytes = await reader.readexactly(length) if length else b''
+                status, payload = await dispatch(method.upper(), target, body_bytes)
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+            data = payload.encode('utf-8')
+            writer.write(
+                f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host, port):
+    server = await asyncio.start_server(handle_connection, host, port)
+    print(f"🍽️  Restaurant API listening on http://{host}:{port}/api")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless JSON API for POS tablets")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--outlet", default=db_utils.OUTLET_ID, help="Outlet whose database to serve")
+    args = parser.parse_args()
+    
+    db_utils.set_outlet(args.outlet)
+
+    if not os.path.exists('db'):
+        os.makedirs('db')
+    db_utils.init_database()
+
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n🛑 API server stopped")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
 from datetime import datetime
 import json
 import os
-from db.db_utils import init_database, get_menu_items, add_sample_menu
+from db import db_utils
+from db.db_utils import init_database, count_menu_items, add_sample_menu, get_day_counters
+from db.change_feed import has_changed
 from utils.calculator import calculate_order_total
+from utils.profiler import start_page_profile, profile_mark, finish_page_profile
+
+# How often Today's Summary checks for new orders (seconds); a check reads no table
+SUMMARY_REFRESH_SECONDS = float(os.environ.get('RESTAURANT_LIVE_REFRESH', '5'))
 
 # Page configuration
 st.set_page_config(
@@ -14,6 +18,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+start_page_profile("Home")
 
 # Custom CSS for warm royal colors
 st.markdown("""
@@ -90,19 +95,22 @@ def initialize_app():
     init_database()
     
     # Add sample menu if menu is empty
-    menu_items = get_menu_items()
-    if menu_items.empty:
+    if count_menu_items() == 0:
         add_sample_menu()
 
 def main():
     # Initialize the app
     initialize_app()
     
+    profile_mark("Main header")
+    
     # Main header
-    st.markdown("""
+    outlet_line = f"<p>Outlet {db_utils.OUTLET_ID}</p>" if db_utils.OUTLET_ID else ""
+    st.markdown(f"""
     <div class="main-header">
         <h1>🍽️ Royal Restaurant Billing System</h1>
         <p>Premium Dining Experience with Professional Billing</p>
+        {outlet_line}
     </div>
     """, unsafe_allow_html=True)
     
@@ -114,6 +122,8 @@ def main():
     if 'customer_info' not in st.session_state:
         st.session_state.customer_info = {}
     
+    profile_mark("Main dashboard")
+    
     # Main dashboard
     col1, col2, col3 = st.columns(3)
     
@@ -151,6 +161,8 @@ def main():
         </div>
         """, unsafe_allow_html=True)
     
+    profile_mark("Current order status")
+    
     # Current order status
     if st.session_state.service_mode:
         st.markdown(f"""
@@ -162,7 +174,7 @@ def main():
         """, unsafe_allow_html=True)
         
         if st.session_state.current_order:
-            total_amount = sum(item['price'] * item['quantity'] for item in st.session_state.current_order)
+            total_amount = sum(item.total_price for item in st.session_state.current_order)
             gst_amount = total_amount * 0.05
             grand_total = total_amount + gst_amount
             
@@ -191,6 +203,8 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
     
+    profile_mark("Quick actions")
+    
     # Quick actions
     st.markdown("### Quick Actions")
     col1, col2, col3, col4 = st.columns(4)
@@ -211,55 +225,64 @@ def main():
         if st.button("📊 Reports", use_container_width=True):
             st.switch_page("pages/4_Reports.py")
     
+    profile_mark("Today's summary")
+    
     # Today's summary
     st.markdown("### Today's Summary")
     
     try:
-        conn = sqlite3.connect('db/restaurant.db')
-        today = datetime.now().strftime('%Y-%m-%d')
+        todays_summary()
+    except Exception as e:
+        st.error(f"Error loading today's summary: {str(e)}")
+
+@st.fragment(run_every=SUMMARY_REFRESH_SECONDS)
+def todays_summary():
+    """Live totals for today from the daily counters, re-read only when something was saved"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    summary = st.session_state.get('today_summary')
+    
+    # A data_version check reads no table; the counters are a handful of rows
+    if has_changed(st.session_state, 'today_summary') or summary is None or summary['day'] != today:
+        summary = st.session_state.today_summary = dict(get_day_counters(today), day=today)
+    
+    total_orders, total_sales = summary['orders'], summary['revenue']
+    
+    if total_orders:
+        avg_order_value = total_sales / total_orders if total_orders > 0 else 0
         
-        # Get today's orders
-        today_orders = pd.read_sql_query(
-            "SELECT * FROM orders WHERE DATE(order_date) = ?",
-            conn, params=[today]
-        )
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.markdown(f"""
+            <div class="metric-card">
+                <h4>Total Sales</h4>
+                <h2>₹{total_sales:.2f}</h2>
+            </div>
+            """, unsafe_allow_html=True)
         
-        if not today_orders.empty:
-            total_sales = today_orders['grand_total'].sum()
-            total_orders = len(today_orders)
-            avg_order_value = total_sales / total_orders if total_orders > 0 else 0
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h4>Total Sales</h4>
-                    <h2>₹{total_sales:.2f}</h2>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h4>Total Orders</h4>
-                    <h2>{total_orders}</h2>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h4>Avg Order Value</h4>
-                    <h2>₹{avg_order_value:.2f}</h2>
-                </div>
-                """, unsafe_allow_html=True)
-        else:
-            st.info("No orders recorded for today yet.")
+        with col2:
+            st.markdown(f"""
+            <div class="metric-card">
+                <h4>Total Orders</h4>
+                <h2>{total_orders}</h2>
+            </div>
+            """, unsafe_allow_html=True)
         
-        conn.close()
+        with col3:
+            st.markdown(f"""
+            <div class="metric-card">
+                <h4>Avg Order Value</h4>
+                <h2>₹{avg_order_value:.2f}</h2>
+            </div>
+            """, unsafe_allow_html=True)
         
-    except Exception as e:
-        st.error(f"Error loading today's summary: {str(e)}")
+        st.caption(" · ".join(
+            f"{method}: {count} orders, ₹{revenue:.2f}" for method, (count, revenue) in summary['payments'].items()
+        ))
+    else:
+        st.info("No orders recorded for today yet.")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        finish_page_profile()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Synthetic order history generator for benchmarks.
+Writes reproducible menu, orders and order_items rows directly into a SQLite file.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import db_utils
+
+CATEGORIES = ["Appetizers", "Main Course", "Bread & Rice", "Beverages", "Desserts", "Chinese", "South Indian"]
+SERVICE_MODES = ["Dine-In", "Takeaway"]
+PAYMENT_METHODS = ["Cash", "Card", "UPI", "Net Banking"]
+
+# Rough lunch and dinner peaks used to pick order hours
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 0, 1, 2, 3, 3, 5, 9, 10, 7, 3, 2, 3, 5, 9, 10, 8, 4, 1]
+
+def generate_menu(rng, menu_size):
+    """Build a list of (name, category, price, gst_rate) tuples"""
+    return [
+        (f"Item {idx + 1:04d}", CATEGORIES[idx % len(CATEGORIES)], float(rng.randrange(40, 500, 10)), 5.0)
+        for idx in range(menu_size)
+    ]
+
+def generate_history(db_path, menu_size=60, orders_per_day=200, years=1.0,
+                     total_orders=None, seed=42, end_date=None, batch_size=5000):
+    """Generate a synthetic order history into db_path and return the number of orders"""
+    rng = random.Random(seed)
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    previous_path = db_utils.DB_PATH
+    db_utils.DB_PATH = db_path
+    try:
+        db_utils.init_database()
+    finally:
+        db_utils.DB_PATH = previous_path
+
+    if total_orders is None:
+        total_orders = int(orders_per_day * 365 * years)
+    days = max(1, -(-total_orders // orders_per_day))
+    end_date = end_date or datetime.now().date()
+    start_date = end_date - timedelta(days=days - 1)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    cursor = conn.cursor()
+
+    menu = generate_menu(rng, menu_size)
+    cursor.executemany('''
+        INSERT INTO menu (name, category, price, gst_rate)
+        VALUES (?, ?, ?, ?)
+    ''', menu)
+    menu_items = [
+        {'id': idx + 1, 'name': name, 'category': category, 'price': price, 'gst_rate': gst_rate}
+        for idx, (name, category, price, gst_rate) in enumerate(menu)
+    ]
+
+    order_rows = []
+    item_rows = []
+    order_id = 0
+
+    for order_index in range(total_orders):
+        day = start_date + timedelta(days=order_index // orders_per_day)
+        hour = rng.choices(range(24), weights=HOUR_WEIGHTS)[0]
+        order_date = datetime(day.year, day.month, day.day, hour, rng.randrange(60), rng.randrange(60))
+
+        items = []
+        for menu_item in rng.sample(menu_items, rng.randint(1, min(6, len(menu_items)))):
+            item = dict(menu_item)
+            item['quantity'] = rng.randint(1, 4)
+            items.append(item)
+
+        subtotal = sum(item['price'] * item['quantity'] for item in items)
+        discount_amount = subtotal * rng.choice([0, 0, 0, 5, 10]) / 100
+        gst_amount = subtotal * 0.05
+        service_mode = rng.choice(SERVICE_MODES)
+
+        order_id += 1
+        order_rows.append((
+            order_id, f"ORD{order_date.strftime('%Y%m%d%H%M%S')}{order_id:07d}", service_mode,
+            f"Customer {rng.randrange(5000)}", f"9{rng.randrange(10**9):09d}",
+            str(rng.randint(1, 30)) if service_mode == "Dine-In" else '',
+            round(subtotal, 2), round(gst_amount, 2), round(discount_amount, 2),
+            round(subtotal + gst_amount - discount_amount, 2), rng.choice(PAYMENT_METHODS),
+            order_date.strftime('%Y-%m-%d %H:%M:%S'), json.dumps(items)
+        ))
+        item_rows.extend(
+            (order_id, item['name'], item['category'], item['quantity'], item['price'], item['price'] * item['quantity'])
+            for item in items
+        )
+
+        if len(order_rows) >= batch_size:
+            _flush(cursor, order_rows, item_rows)
+
+    _flush(cursor, order_rows, item_rows)
+    # Rows were bulk inserted around insert_order, so the counters and the
+    # customer directory are built once here
+    db_utils.rebuild_daily_counters(conn)
+    db_utils.rebuild_customers(conn)
+    conn.commit()
+    conn.close()
+
+    return total_orders
+
+def _flush(cursor, order_rows, item_rows):
+    """Bulk insert buffered rows and clear the buffers"""
+    cursor.executemany('''
+        INSERT INTO orders (
+            id, order_number, service_mode, customer_name, customer_phone,
+            table_number, subtotal, gst_amount, discount_amount,
+            grand_total, payment_method, order_date, items_json
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', order_rows)
+    cursor.executemany('''
+        INSERT INTO order_items (
+            order_id, item_name, category, quantity, unit_price, total_price
+        ) VALUES (?, ?, ?, ?, ?, ?)
+    ''', item_rows)
+    order_rows.clear()
+    item_rows.clear()
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic restaurant order history")
+    parser.add_argument("--db", default="benchmarks/data/synthetic.db", help="Output SQLite file")
+    parser.add_argument("--outlets", type=int, default=1, help="Number of outlet databases to generate")
+    parser.add_argument("--menu-size", type=int, default=60)
+    parser.add_argument("--orders-per-day", type=int, default=200)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--orders", type=int, default=None, help="Total orders per outlet (overrides --years)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for outlet in range(1, args.outlets + 1):
+        db_path = args.db if args.outlets == 1 else db_utils.outlet_db_path(args.db, outlet)
+        started = datetime.now()
+        count = generate_history(
+            db_path, menu_size=args.menu_size, orders_per_day=args.orders_per_day,
+            years=args.years, total_orders=args.orders, seed=args.seed + outlet - 1
+        )
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"✅ {db_path}: {count} orders in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
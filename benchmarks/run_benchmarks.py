@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the data and billing paths.
+Times db_utils and calculator functions against synthetic histories and saves
+the results as JSON so runs can be compared before and after a change.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import db_utils
+from db.report_cache import clear_report_cache
+from utils.calculator import calculate_order_total, generate_bill_text
+from benchmarks.generate_data import generate_history
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def time_call(func, repeat):
+    """Run func repeat times and return timing statistics in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(timings[0], 4),
+        'median_ms': round(statistics.median(timings), 4),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        'max_ms': round(timings[-1], 4),
+    }
+
+def sample_order(item_count=5):
+    """Build an order and its items in the shape Order Entry produces"""
+    order_items = [
+        {'id': idx + 1, 'name': f"Item {idx + 1:04d}", 'category': 'Main Course',
+         'price': 100.0 + idx * 10, 'gst_rate': 5.0, 'quantity': 1 + idx % 3}
+        for idx in range(item_count)
+    ]
+    calculations = calculate_order_total(order_items, 10)
+    order_data = {
+        'order_number': db_utils.generate_order_number(),
+        'service_mode': 'Dine-In',
+        'customer_name': 'Benchmark',
+        'customer_phone': '9999999999',
+        'table_number': '7',
+        'payment_method': 'Cash',
+        'order_status': 'Paid',
+        'order_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        **calculations
+    }
+    return order_data, order_items, calculations
+
+def run_size(size, data_dir, repeat, regenerate):
+    """Benchmark every target against a history of the given size"""
+    db_path = os.path.join(data_dir, f"bench_{size}.db")
+    if regenerate or not os.path.exists(db_path):
+        print(f"📦 Generating {size} orders into {db_path}...")
+        generate_history(db_path, total_orders=size, orders_per_day=max(50, size // 365))
+
+    db_utils.DB_PATH = db_path
+    clear_report_cache()
+
+    today = datetime.now().date()
+    week_from = (today - timedelta(days=6)).strftime('%Y-%m-%d')
+    month_from = (today - timedelta(days=29)).strftime('%Y-%m-%d')
+    year_from = (today - timedelta(days=364)).strftime('%Y-%m-%d')
+    today_str = today.strftime('%Y-%m-%d')
+
+    order_data, order_items, calculations = sample_order()
+    counter = [0]
+
+    def save():
+        counter[0] += 1
+        db_utils.save_order(dict(order_data, order_number=f"BENCH{size}-{time.time_ns()}-{counter[0]}"), order_items)
+
+    targets = {
+        'save_order': (save, repeat),
+        'get_orders_today': (lambda: db_utils.get_orders(today_str, today_str), repeat),
+        'get_orders_7d': (lambda: db_utils.get_orders(week_from, today_str), repeat),
+        'get_orders_30d': (lambda: db_utils.get_orders(month_from, today_str), max(3, repeat // 4)),
+        'get_sales_summary_30d': (lambda: db_utils.get_sales_summary(month_from, today_str), max(3, repeat // 4)),
+        'get_sales_summary_365d': (lambda: db_utils.get_sales_summary(year_from, today_str), max(3, repeat // 4)),
+        'calculate_order_total': (lambda: calculate_order_total(order_items, 10), repeat * 100),
+        'generate_bill_text': (lambda: generate_bill_text(order_data, order_items, calculations), repeat * 100),
+    }
+
+    results = {}
+    for name, (func, runs) in targets.items():
+        results[name] = time_call(func, runs)
+        print(f"   {name:<26} median {results[name]['median_ms']:>10.3f} ms  p95 {results[name]['p95_ms']:>10.3f} ms")
+    return results
+
+def compare(current, baseline_path):
+    """Print median changes against a previous results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n📊 Comparison with {baseline_path}")
+    for size, targets in current['results'].items():
+        for name, stats in targets.items():
+            previous = baseline.get('results', {}).get(size, {}).get(name)
+            if previous and previous['median_ms'] > 0:
+                change = (stats['median_ms'] - previous['median_ms']) / previous['median_ms'] * 100
+                print(f"   {size:>8} {name:<26} {previous['median_ms']:>10.3f} -> {stats['median_ms']:>10.3f} ms ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the restaurant billing data paths")
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES, help="Order history sizes")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per database benchmark")
+    parser.add_argument("--data-dir", default=os.path.join('benchmarks', 'data'))
+    parser.add_argument("--regenerate", action='store_true', help="Rebuild the synthetic databases")
+    parser.add_argument("--output", help="Results JSON file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {},
+    }
+
+    for size in args.sizes:
+        print(f"\n⏱️  {size} orders")
+        report['results'][str(size)] = run_size(size, args.data_dir, args.repeat, args.regenerate)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results saved to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Concurrent write stress harness.
+Simulates several billing terminals saving orders against one database while
+report readers run alongside, and reports throughput, latency, lock errors
+and order-number collisions.
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import db_utils
+from db.order_queue import submit_order
+from benchmarks.run_benchmarks import sample_order
+
+def percentile(values, pct):
+    """Get a percentile from a list of values"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def classify_error(error):
+    """Map an exception to a result bucket"""
+    message = str(error).lower()
+    if isinstance(error, sqlite3.IntegrityError) and 'order_number' in message:
+        return 'collisions'
+    if 'locked' in message or 'busy' in message:
+        return 'lock_errors'
+    return 'other_errors'
+
+def writer(db_path, rate, duration, start_at, results, queued=False):
+    """Save orders at a fixed rate (orders/second, 0 = as fast as possible)"""
+    db_utils.DB_PATH = db_path
+    save = submit_order if queued else db_utils.save_order
+    order_data, order_items, _ = sample_order()
+    stats = {'role': 'writer', 'latencies': [], 'lock_errors': 0, 'collisions': 0, 'other_errors': 0}
+    interval = 1.0 / rate if rate > 0 else 0
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    next_run = time.perf_counter()
+    deadline = start_at + duration
+    while time.time() < deadline:
+        data = dict(order_data, order_number=db_utils.generate_order_number())
+        started = time.perf_counter()
+        try:
+            save(data, order_items)
+            stats['latencies'].append((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            stats[classify_error(e)] += 1
+        if interval:
+            next_run += interval
+            delay = next_run - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    results.put(stats)
+
+def reader(db_path, interval, duration, start_at, results):
+    """Run sales summaries for today in a loop"""
+    db_utils.DB_PATH = db_path
+    stats = {'role': 'reader', 'latencies': [], 'lock_errors': 0, 'collisions': 0, 'other_errors': 0}
+    today = time.strftime('%Y-%m-%d')
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    deadline = start_at + duration
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            db_utils.get_sales_summary(today, today)
+            stats['latencies'].append((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            stats[classify_error(e)] += 1
+        time.sleep(interval)
+
+    results.put(stats)
+
+def summarize(all_stats, duration):
+    """Aggregate per-worker stats for one role"""
+    latencies = [value for stats in all_stats for value in stats['latencies']]
+    return {
+        'operations': len(latencies),
+        'throughput_per_sec': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(max(latencies), 3) if latencies else 0.0,
+        'lock_errors': sum(stats['lock_errors'] for stats in all_stats),
+        'collisions': sum(stats['collisions'] for stats in all_stats),
+        'other_errors': sum(stats['other_errors'] for stats in all_stats),
+    }
+
+def run_stress(db_path, writers=4, readers=1, rate=10.0, duration=10.0,
+               reader_interval=0.5, use_threads=False, queued=False):
+    """Run the stress test and return per-role summaries"""
+    if use_threads:
+        results = queue.Queue()
+        worker_type = threading.Thread
+    else:
+        results = multiprocessing.Queue()
+        worker_type = multiprocessing.Process
+
+    start_at = time.time() + 1.0
+    workers = [
+        worker_type(target=writer, args=(db_path, rate, duration, start_at, results, queued))
+        for _ in range(writers)
+    ] + [
+        worker_type(target=reader, args=(db_path, reader_interval, duration, start_at, results))
+        for _ in range(readers)
+    ]
+
+    for worker in workers:
+        worker.start()
+    collected = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    return {
+        'writers': summarize([stats for stats in collected if stats['role'] == 'writer'], duration),
+        'readers': summarize([stats for stats in collected if stats['role'] == 'reader'], duration),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress concurrent order writes against one database")
+    parser.add_argument("--db", default="benchmarks/data/stress.db", help="Database to write to")
+    parser.add_argument("--copy-from", help="Copy this database to --db before starting")
+    parser.add_argument("--writers", type=int, default=4, help="Number of billing terminals")
+    parser.add_argument("--readers", type=int, default=1, help="Number of report readers")
+    parser.add_argument("--rate", type=float, default=10.0, help="Orders per second per writer (0 = unthrottled)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Test duration in seconds")
+    parser.add_argument("--reader-interval", type=float, default=0.5, help="Seconds between reader queries")
+    parser.add_argument("--threads", action='store_true', help="Use threads instead of processes")
+    parser.add_argument("--queued", action='store_true', help="Save through the batching order writer (implies --threads)")
+    args = parser.parse_args()
+
+    directory = os.path.dirname(args.db)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if args.copy_from:
+        shutil.copyfile(args.copy_from, args.db)
+
+    db_utils.DB_PATH = args.db
+    db_utils.init_database()
+
+    print(f"🔥 {args.writers} writers x {args.rate} orders/s, {args.readers} readers, {args.duration}s on {args.db}")
+    summary = run_stress(
+        args.db, writers=args.writers, readers=args.readers, rate=args.rate,
+        duration=args.duration, reader_interval=args.reader_interval,
+        use_threads=args.threads or args.queued, queued=args.queued
+    )
+
+    for role, stats in summary.items():
+        print(f"\n{role.title()}:")
+        for key, value in stats.items():
+            print(f"   {key:<20} {value}")
+
+if __name__ == "__main__":
+    main()
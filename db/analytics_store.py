@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Columnar analytics store for long-range reports.
+New orders and order items are exported incrementally to month-partitioned
+Parquet files, and multi-month reports are aggregated there with DuckDB when it
+is installed, or with pyarrow's vectorized group-by otherwise.
+
+Enable with RESTAURANT_ANALYTICS=1 (requires pyarrow; duckdb is optional).
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from db import db_utils
+from db.instrumentation import instrumented
+
+# pyarrow and duckdb are imported on first use by load_engines()
+pa = ds = pq = duckdb = None
+
+ANALYTICS_ENABLED = os.environ.get('RESTAURANT_ANALYTICS', '0') == '1'
+
+ANALYTICS_DIR = os.environ.get('RESTAURANT_ANALYTICS_DIR', os.path.join('data', 'analytics'))
+
+# Ranges at least this long are answered from the analytics store
+ANALYTICS_MIN_DAYS = int(os.environ.get('RESTAURANT_ANALYTICS_MIN_DAYS', '31'))
+
+# A month partition with more small files than this is rewritten as one file
+COMPACT_FILES = 16
+
+EXPORT_BATCH_SIZE = 100_000
+
+_export_lock = threading.Lock()
+
+def default_store_dir():
+    """Get the store directory for the current database, one per outlet"""
+    if os.path.abspath(db_utils.DB_PATH) == os.path.abspath(db_utils.BASE_DB_PATH):
+        return ANALYTICS_DIR
+    return os.path.join(ANALYTICS_DIR, os.path.splitext(os.path.basename(db_utils.DB_PATH))[0])
+
+def load_engines():
+    """Import pyarrow (required) and duckdb (optional); returns False without pyarrow"""
+    global pa, ds, pq, duckdb
+    if pa is None:
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+            import pyarrow.parquet as pq
+        except ImportError:
+            pa = None
+            return False
+        try:
+            import duckdb
+        except ImportError:
+            duckdb = None
+    return True
+
+def analytics_available():
+    """Check whether the analytics store is enabled and usable"""
+    return ANALYTICS_ENABLED and load_engines()
+
+def use_analytics(date_from, date_to):
+    """Check whether a report range should be answered from the analytics store"""
+    if not analytics_available():
+        return False
+    days = (datetime.strptime(str(date_to), '%Y-%m-%d') - datetime.strptime(str(date_from), '%Y-%m-%d')).days + 1
+    return days >= ANALYTICS_MIN_DAYS
+
+def _watermark_path(store_dir):
+    return os.path.join(store_dir, '_watermark.json')
+
+def get_watermark(store_dir=None):
+    """Get the highest order id already exported"""
+    path = _watermark_path(store_dir or default_store_dir())
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return json.load(f)['last_order_id']
+
+def _set_watermark(store_dir, last_order_id):
+    path = _watermark_path(store_dir)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'last_order_id': last_order_id, 'exported_at': datetime.now().isoformat()}, f)
+    os.replace(path + '.tmp', path)
+
+def _write_partitions(frame, table_dir, first_id, last_id):
+    """Write one Parquet file per month present in frame; returns the months touched"""
+    months = []
+    for month, part in frame.groupby('month'):
+        month_dir = os.path.join(table_dir, f"month={month}")
+        os.makedirs(month_dir, exist_ok=True)
+        pq.write_table(
+            pa.Table.from_pandas(part.drop(columns=['month']), preserve_index=False),
+            os.path.join(month_dir, f"part-{first_id:012d}-{last_id:012d}.parquet")
+        )
+        months.append(month)
+    return months
+
+def _compact(month_dir):
+    """Rewrite a month partition made of many small files as a single file"""
+    files = sorted(glob.glob(os.path.join(month_dir, '*.parquet')))
+    if len(files) <= COMPACT_FILES:
+        return
+    table = pa.concat_tables([pq.read_table(path) for path in files], promote_options='default')
+    first = os.path.basename(files[0]).split('-')[1]
+    last = os.path.basename(files[-1]).split('-')[2]
+    target = os.path.join(month_dir, f"part-{first}-{last}")
+    pq.write_table(table, target + '.tmp')
+    os.replace(target + '.tmp', target)
+    for path in files:
+        os.remove(path)
+
+@instrumented
+def refresh_analytics_store(store_dir=None):
+    """Export orders added since the last refresh; returns the number exported"""
+    if not load_engines():
+        raise RuntimeError("pyarrow is required for the analytics store: pip install pyarrow")
+
+    store_dir = store_dir or default_store_dir()
+    with _export_lock:
+        os.makedirs(store_dir, exist_ok=True)
+        watermark = get_watermark(store_dir)
+        exported = 0
+
+        conn = db_utils.get_connection()
+        sources = db_utils.get_sources(conn)
+        try:
+            while True:
+                # Every store is read so a first export includes archived months too
+                orders = pd.concat([
+                    pd.read_sql_query(f'''
+                        SELECT
+                            id, order_date,
+                            DATE(order_date) as date,
+                            substr(order_date, 1, 7) as month,
+                            CAST(strftime('%w', order_date) AS INTEGER) as weekday,
+                            CAST(strftime('%H', order_date) AS INTEGER) as hour,
+                            service_mode, payment_method, grand_total
+                        FROM {orders_table}
+                        WHERE id > ?
+                        ORDER BY id
+                        LIMIT ?
+                    ''', source, params=[watermark, EXPORT_BATCH_SIZE])
+                    for source, orders_table, _ in sources
+                ], ignore_index=True).sort_values('id').head(EXPORT_BATCH_SIZE)
+                if orders.empty:
+                    break
+
+                first_id, last_id = int(orders['id'].iloc[0]), int(orders['id'].iloc[-1])
+                items = pd.concat([
+                    pd.read_sql_query(f'''
+                        SELECT
+                            oi.order_id, DATE(o.order_date) as date,
+                            substr(o.order_date, 1, 7) as month,
+                            oi.item_name, oi.category, oi.quantity, oi.total_price
+                        FROM {items_table} oi
+                        JOIN {orders_table} o ON oi.order_id = o.id
+                        WHERE o.id BETWEEN ? AND ?
+                    ''', source, params=[first_id, last_id])
+                    for source, orders_table, items_table in sources
+                ], ignore_index=True)
+
+                months = _write_partitions(orders, os.path.join(store_dir, 'orders'), first_id, last_id)
+                _write_partitions(items, os.path.join(store_dir, 'order_items'), first_id, last_id)
+                _set_watermark(store_dir, last_id)
+                for month in months:
+                    for table in ('orders', 'order_items'):
+                        _compact(os.path.join(store_dir, table, f"month={month}"))
+
+                watermark = last_id
+                exported += len(orders)
+        finally:
+            db_utils.close_sources(sources)
+
+    return exported
+
+def _empty(columns):
+    return pd.DataFrame({column: [] for column in columns})
+
+def _has_data(store_dir, table):
+    return bool(glob.glob(os.path.join(store_dir, table, 'month=*', '*.parquet')))
+
+def _duckdb_query(store_dir, sql, params):
+    """Run sql with {orders}/{order_items} bound to the Parquet datasets"""
+    con = duckdb.connect()
+    try:
+        return con.execute(sql.format(**{
+            table: f"read_parquet('{os.path.join(store_dir, table, '**', '*.parquet')}', hive_partitioning = true, union_by_name = true)"
+            for table in ('orders', 'order_items')
+        }), params).df()
+    finally:
+        con.close()
+
+def _arrow_scan(store_dir, table, columns, date_from, date_to):
+    """Read the given columns for a date range, pruning month partitions"""
+    dataset = ds.dataset(os.path.join(store_dir, table), format='parquet', partitioning='hive')
+    month = ds.field('month')
+    date = ds.field('date')
+    return dataset.to_table(columns=columns, filter=(
+        (month >= date_from[:7]) & (month <= date_to[:7]) & (date >= date_from) & (date <= date_to)
+    ))
+
+def _arrow_group(table, keys, aggregations, names):
+    """Group an Arrow table and return a DataFrame with the given column names"""
+    grouped = table.group_by(keys).aggregate(aggregations).to_pandas()
+    return grouped[keys + [f"{column}_{func}" for column, func in aggregations]].set_axis(keys + names, axis=1)
+
+@instrumented
+def get_sales_summary(date_from, date_to, store_dir=None):
+    """Get sales summary for a date range from the analytics store"""
+    store_dir = store_dir or default_store_dir()
+    refresh_analytics_store(store_dir)
+    if not _has_data(store_dir, 'orders'):
+        return db_utils.get_sales_summary(date_from, date_to)
+
+    if duckdb is not None:
+        daily_sales = _duckdb_query(store_dir, '''
+            SELECT date, COUNT(*) as total_orders, SUM(grand_total) as total_sales,
+                   AVG(grand_total) as avg_order_value
+            FROM {orders}
+            WHERE month BETWEEN ? AND ? AND date BETWEEN ? AND ?
+            GROUP BY date ORDER BY date
+        ''', [date_from[:7], date_to[:7], date_from, date_to])
+        most_sold = _duckdb_query(store_dir, '''
+            SELECT item_name, category, CAST(SUM(quantity) AS BIGINT) as total_quantity,
+                   SUM(total_price) as total_revenue
+            FROM {order_items}
+            WHERE month BETWEEN ? AND ? AND date BETWEEN ? AND ?
+            GROUP BY item_name, category
+            ORDER BY total_quantity DESC
+            LIMIT 10
+        ''', [date_from[:7], date_to[:7], date_from, date_to])
+        payment_breakdown = _duckdb_query(store_dir, '''
+            SELECT payment_method, COUNT(*) as order_count, SUM(grand_total) as total_amount
+            FROM {orders}
+            WHERE month BETWEEN ? AND ? AND date BETWEEN ? AND ?
+            GROUP BY payment_method
+        ''', [date_from[:7], date_to[:7], date_from, date_to])
+        return daily_sales, most_sold, payment_breakdown
+
+    orders = _arrow_scan(store_dir, 'orders', ['date', 'payment_method', 'grand_total'], date_from, date_to)
+    daily_sales = _arrow_group(
+        orders, ['date'], [('grand_total', 'count'), ('grand_total', 'sum'), ('grand_total', 'mean')],
+        ['total_orders', 'total_sales', 'avg_order_value']
+    ).sort_values('date').reset_index(drop=True)
+    payment_breakdown = _arrow_group(
+        orders, ['payment_method'], [('grand_total', 'count'), ('grand_total', 'sum')],
+        ['order_count', 'total_amount']
+    )
+    if _has_data(store_dir, 'order_items'):
+        items = _arrow_scan(
+            store_dir, 'order_items', ['item_name', 'category', 'quantity', 'total_price'], date_from, date_to
+        )
+        most_sold = _arrow_group(
+            items, ['item_name', 'category'], [('quantity', 'sum'), ('total_price', 'sum')],
+            ['total_quantity', 'total_revenue']
+        ).sort_values('total_quantity', ascending=False).head(10).reset_index(drop=True)
+        # Integer like the SQLite path, whatever type the Parquet column was written with
+        most_sold['total_quantity'] = most_sold['total_quantity'].astype('int64')
+    else:
+        most_sold = _empty(['item_name', 'category', 'total_quantity', 'total_revenue'])
+    return daily_sales, most_sold, payment_breakdown
+
+@instrumented
+def get_hourly_heatmap(date_from, date_to, store_dir=None):
+    """Get order count and revenue per weekday and hour from the analytics store"""
+    store_dir = store_dir or default_store_dir()
+    refresh_analytics_store(store_dir)
+    if not _has_data(store_dir, 'orders'):
+        return db_utils.get_hourly_heatmap(date_from, date_to)
+
+    if duckdb is not None:
+        return _duckdb_query(store_dir, '''
+            SELECT weekday, hour, COUNT(*) as order_count, SUM(grand_total) as total_sales,
+                   AVG(grand_total) as avg_order_value
+            FROM {orders}
+            WHERE month BETWEEN ? AND ? AND date BETWEEN ? AND ?
+            GROUP BY weekday, hour ORDER BY weekday, hour
+        ''', [date_from[:7], date_to[:7], date_from, date_to])
+
+    orders = _arrow_scan(store_dir, 'orders', ['weekday', 'hour', 'grand_total'], date_from, date_to)
+    return _arrow_group(
+        orders, ['weekday', 'hour'], [('grand_total', 'count'), ('grand_total', 'sum'), ('grand_total', 'mean')],
+        ['order_count', 'total_sales', 'avg_order_value']
+    ).sort_values(['weekday', 'hour']).reset_index(drop=True)
+
+@instrumented
+def get_service_summary(date_from, date_to, store_dir=None):
+    """Get order count, revenue and average order value per service mode"""
+    store_dir = store_dir or default_store_dir()
+    refresh_analytics_store(store_dir)
+    columns = ['service_mode', 'Order Count', 'Total Revenue', 'Avg Order Value']
+    if not _has_data(store_dir, 'orders'):
+        return _empty(columns)
+
+    if duckdb is not None:
+        summary = _duckdb_query(store_dir, '''
+            SELECT service_mode, COUNT(*), SUM(grand_total), AVG(grand_total)
+            FROM {orders}
+            WHERE month BETWEEN ? AND ? AND date BETWEEN ? AND ?
+            GROUP BY service_mode ORDER BY service_mode
+        ''', [date_from[:7], date_to[:7], date_from, date_to])
+    else:
+        orders = _arrow_scan(store_dir, 'orders', ['service_mode', 'grand_total'], date_from, date_to)
+        summary = orders.group_by('service_mode').aggregate(
+            [('grand_total', 'count'), ('grand_total', 'sum'), ('grand_total', 'mean')]
+        ).to_pandas().sort_values('service_mode')
+    return summary.set_axis(columns, axis=1).round(2).reset_index(drop=True)
+
+@instrumented
+def get_year_over_year(date_from, date_to, store_dir=None):
+    """Get monthly sales for a range and the same range one year earlier"""
+    store_dir = store_dir or default_store_dir()
+    refresh_analytics_store(store_dir)
+    columns = ['month', 'total_orders', 'total_sales', 'period']
+    if not _has_data(store_dir, 'orders'):
+        return _empty(columns)
+
+    start = datetime.strptime(date_from, '%Y-%m-%d')
+    end = datetime.strptime(date_to, '%Y-%m-%d')
+    # Same calendar dates a year back (Feb 29 falls back to Feb 28)
+    previous = [
+        (day - timedelta(days=1) if (day.month, day.day) == (2, 29) else day).replace(year=day.year - 1)
+        for day in (start, end)
+    ]
+
+    frames = []
+    for label, (range_from, range_to) in (
+        ('Previous year', tuple(day.strftime('%Y-%m-%d') for day in previous)),
+        ('Selected range', (date_from, date_to)),
+    ):
+        if duckdb is not None:
+            monthly = _duckdb_query(store_dir, '''
+                SELECT month, COUNT(*) as total_orders, SUM(grand_total) as total_sales
+                FROM {orders}
+                WHERE month BETWEEN ? AND ? AND date BETWEEN ? AND ?
+                GROUP BY month ORDER BY month
+            ''', [range_from[:7], range_to[:7], range_from, range_to])
+        else:
+            orders = _arrow_scan(store_dir, 'orders', ['month', 'grand_total'], range_from, range_to)
+            monthly = _arrow_group(
+                orders, ['month'], [('grand_total', 'count'), ('grand_total', 'sum')],
+                ['total_orders', 'total_sales']
+            ).sort_values('month')
+        monthly['month'] = monthly['month'].astype(str)
+        monthly['period'] = label
+        frames.append(monthly)
+
+    return pd.concat(frames, ignore_index=True)[columns]
+
+def main():
+    parser = argparse.ArgumentParser(description="Export orders to the Parquet analytics store")
+    parser.add_argument("--store", help="Analytics store directory (default: data/analytics, per outlet when one is set)")
+    args = parser.parse_args()
+
+    exported = refresh_analytics_store(args.store)
+    engine = "DuckDB" if duckdb is not None else "pyarrow"
+    print(f"✅ Exported {exported} new orders to {args.store} (reports use {engine})")
+
+if __name__ == "__main__":
+    main()
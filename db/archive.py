@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Archive partitioning for historical orders.
+Orders older than a configurable horizon are moved from the operational
+database into per-month (or per-year) SQLite files. A manifest table in the
+operational database lets db_utils attach only the partitions that overlap a
+requested date range.
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ARCHIVE_DIR = os.environ.get('RESTAURANT_ARCHIVE_DIR', os.path.join('db', 'archive'))
+
+# Orders older than this many days are eligible for archiving
+ARCHIVE_HORIZON_DAYS = int(os.environ.get('RESTAURANT_ARCHIVE_HORIZON_DAYS', '180'))
+
+# 'month' or 'year'
+ARCHIVE_GRANULARITY = os.environ.get('RESTAURANT_ARCHIVE_GRANULARITY', 'month')
+
+# SQLite allows 10 attached databases by default; one slot is kept spare
+MAX_ATTACHED = 9
+
+# Tables moved into archive files, parents first
+ARCHIVED_TABLES = ('orders', 'order_items', 'order_events')
+
+def create_manifest(conn):
+    """Create the partition manifest in the operational database"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive_partitions (
+            path TEXT PRIMARY KEY,
+            period_start TEXT NOT NULL,
+            period_end TEXT NOT NULL,
+            order_count INTEGER NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def get_partitions(conn, date_from=None, date_to=None):
+    """Get archive files whose period overlaps [date_from, date_to] (inclusive dates)"""
+    query = "SELECT path FROM archive_partitions WHERE 1 = 1"
+    params = []
+    if date_from:
+        query += " AND period_end > ?"
+        params.append(str(date_from))
+    if date_to:
+        query += " AND period_start <= ?"
+        params.append(str(date_to))
+    query += " ORDER BY period_start"
+    try:
+        rows = conn.execute(query, params).fetchall()
+    except sqlite3.OperationalError:
+        # Nothing has been archived yet
+        return []
+    partitions = []
+    for (path,) in rows:
+        if os.path.exists(path):
+            partitions.append(path)
+        else:
+            # Reports would silently leave these months out
+            logging.getLogger('restaurant.archive').warning(f"archive partition {path} not found, skipped")
+    return partitions
+
+def attach_partitions(conn, paths):
+    """Attach archive files and create temp union views over them
+
+    Returns the (orders, order_items) names to query.
+    """
+    orders_parts = ["SELECT * FROM main.orders"]
+    items_parts = ["SELECT * FROM main.order_items"]
+    for idx, path in enumerate(paths):
+        conn.execute(f"ATTACH DATABASE ? AS arch{idx}", (path,))
+        orders_parts.append(f"SELECT * FROM arch{idx}.orders")
+        items_parts.append(f"SELECT * FROM arch{idx}.order_items")
+    conn.execute("DROP VIEW IF EXISTS temp.all_orders")
+    conn.execute("DROP VIEW IF EXISTS temp.all_order_items")
+    conn.execute(f"CREATE TEMP VIEW all_orders AS {' UNION ALL '.join(orders_parts)}")
+    conn.execute(f"CREATE TEMP VIEW all_order_items AS {' UNION ALL '.join(items_parts)}")
+    return 'all_orders', 'all_order_items'
+
+def period_bounds(day, granularity):
+    """Get the [start, end) dates of the period containing day"""
+    if granularity == 'year':
+        return day.replace(month=1, day=1), day.replace(year=day.year + 1, month=1, day=1)
+    start = day.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+def partition_path(start, granularity, archive_dir):
+    """Get the absolute path of a period's archive file
+
+    The manifest keeps it as is, so processes started from another working
+    directory still find the file.
+    """
+    name = f"orders_{start.year}.db" if granularity == 'year' else f"orders_{start.year}_{start.month:02d}.db"
+    return os.path.abspath(os.path.join(archive_dir, name))
+
+def create_partition_schema(main_conn, path):
+    """Create the archived tables and their indexes in an archive file"""
+    ddl = main_conn.execute(f'''
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name IN ({', '.join('?' * len(ARCHIVED_TABLES))}) AND sql IS NOT NULL
+        ORDER BY type = 'index'
+    ''', ARCHIVED_TABLES).fetchall()
+    conn = sqlite3.connect(path)
+    try:
+        for (sql,) in ddl:
+            sql = sql.replace('CREATE TABLE ', 'CREATE TABLE IF NOT EXISTS ', 1)
+            sql = sql.replace('CREATE INDEX ', 'CREATE INDEX IF NOT EXISTS ', 1)
+            conn.execute(sql)
+        conn.commit()
+    finally:
+        conn.close()
+
+def archive_orders(db_path=None, horizon_days=None, granularity=None, archive_dir=None):
+    """Move orders older than the horizon into period archive files
+
+    Rows are first copied (INSERT OR IGNORE, keeping ids) and committed, then
+    removed from the operational database, so an interrupted run can be repeated.
+    Returns a list of (path, orders moved).
+    """
+    from db import db_utils
+
+    db_path = db_path or db_utils.DB_PATH
+    horizon_days = ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+    granularity = granularity or ARCHIVE_GRANULARITY
+    if archive_dir is None:
+        # Outlets share the archive directory, so each gets its own folder
+        archive_dir = ARCHIVE_DIR
+        if os.path.abspath(db_path) != os.path.abspath(db_utils.BASE_DB_PATH):
+            archive_dir = os.path.join(ARCHIVE_DIR, os.path.splitext(os.path.basename(db_path))[0])
+    if granularity not in ('month', 'year'):
+        raise ValueError("granularity must be 'month' or 'year'")
+
+    # Only whole periods are archived
+    cutoff, _ = period_bounds(datetime.now().date() - timedelta(days=horizon_days), granularity)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    moved = []
+
+    try:
+        create_manifest(conn)
+        # Older manifests kept paths relative to the working directory of the run
+        for (path,) in conn.execute("SELECT path FROM archive_partitions").fetchall():
+            if not os.path.isabs(path) and os.path.exists(path):
+                conn.execute("UPDATE archive_partitions SET path = ? WHERE path = ?", (os.path.abspath(path), path))
+        conn.commit()
+
+        oldest = conn.execute(
+            "SELECT MIN(order_date) FROM orders WHERE order_date < ?", (cutoff.isoformat(),)
+        ).fetchone()[0]
+
+        start = period_bounds(datetime.strptime(oldest[:10], '%Y-%m-%d').date(), granularity)[0] if oldest else cutoff
+        while start < cutoff:
+            _, end = period_bounds(start, granularity)
+            path = partition_path(start, granularity, archive_dir)
+            period = (start.isoformat(), end.isoformat())
+
+            if conn.execute(
+                "SELECT 1 FROM orders WHERE order_date >= ? AND order_date < ? LIMIT 1", period
+            ).fetchone():
+                create_partition_schema(conn, path)
+                conn.execute("ATTACH DATABASE ? AS part", (path,))
+                try:
+                    # Copy, then commit the archive before touching the operational data
+                    conn.execute('''
+                        INSERT OR IGNORE INTO part.orders
+                        SELECT * FROM main.orders WHERE order_date >= ? AND order_date < ?
+                    ''', period)
+                    for table in ARCHIVED_TABLES[1:]:
+                        conn.execute(f'''
+                            INSERT OR IGNORE INTO part.{table}
+                            SELECT child.* FROM main.{table} child
+                            JOIN main.orders o ON child.order_id = o.id
+                            WHERE o.order_date >= ? AND o.order_date < ?
+                        ''', period)
+                    conn.commit()
+
+                    count = conn.execute('''
+                        SELECT COUNT(*) FROM main.orders
+                        WHERE order_date >= ? AND order_date < ?
+                        AND id IN (SELECT id FROM part.orders)
+                    ''', period).fetchone()[0]
+                    for table in ARCHIVED_TABLES[1:]:
+                        conn.execute(f'''
+                            DELETE FROM main.{table} WHERE order_id IN (
+                                SELECT id FROM main.orders
+                                WHERE order_date >= ? AND order_date < ?
+                                AND id IN (SELECT id FROM part.orders)
+                            )
+                        ''', period)
+                    conn.execute('''
+                        DELETE FROM main.orders
+                        WHERE order_date >= ? AND order_date < ?
+                        AND id IN (SELECT id FROM part.orders)
+                    ''', period)
+                    total = conn.execute("SELECT COUNT(*) FROM part.orders").fetchone()[0]
+                    conn.execute('''
+                        INSERT OR REPLACE INTO archive_partitions (path, period_start, period_end, order_count)
+                        VALUES (?, ?, ?, ?)
+                    ''', (path, period[0], period[1], total))
+                    # Other processes' cached reports still point at the moved rows
+                    db_utils.bump_report_generation(conn)
+                    conn.commit()
+                    moved.append((path, count))
+                finally:
+                    conn.execute("DETACH DATABASE part")
+
+            start = end
+    finally:
+        conn.close()
+
+    return moved
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old orders into per-period SQLite files")
+    parser.add_argument("--db", help="Operational database (default: db/restaurant.db)")
+    parser.add_argument("--horizon-days", type=int, default=ARCHIVE_HORIZON_DAYS)
+    parser.add_argument("--granularity", choices=['month', 'year'], default=ARCHIVE_GRANULARITY)
+    parser.add_argument("--archive-dir", help="Partition directory (default: db/archive, per outlet when one is set)")
+    args = parser.parse_args()
+
+    moved = archive_orders(args.db, args.horizon_days, args.granularity, args.archive_dir)
+    if not moved:
+        print("✅ Nothing to archive")
+    for path, count in moved:
+        print(f"📦 {count} orders moved to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Online backups of the operational database.
+Snapshots are taken with SQLite's online backup API a few hundred pages at a
+time, sleeping between steps so terminals can commit orders while a backup
+runs. Archive partitions are copied alongside the main file. Each copy is
+integrity-checked before it is kept, optionally gzipped, and older snapshots
+are rotated out. A snapshot is restored through the same
+API, so the live file is replaced under SQLite's own locking.
+"""
+
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKUP_DIR = os.environ.get('RESTAURANT_BACKUP_DIR', os.path.join('db', 'backups'))
+
+# Snapshots kept per database; older ones are deleted after each backup
+BACKUP_KEEP = int(os.environ.get('RESTAURANT_BACKUP_KEEP', '14'))
+
+# Pages copied per step and the pause between steps (seconds); the source is
+# only read-locked during a step, so writers wait at most one step
+BACKUP_STEP_PAGES = int(os.environ.get('RESTAURANT_BACKUP_STEP_PAGES', '256'))
+BACKUP_STEP_SLEEP = float(os.environ.get('RESTAURANT_BACKUP_STEP_SLEEP', '0.01'))
+
+BACKUP_COMPRESS = os.environ.get('RESTAURANT_BACKUP_COMPRESS', '0') == '1'
+
+# A commit from another connection restarts a stepped backup; after this many
+# restarts the rest is copied in one step
+MAX_RESTARTS = 5
+
+class BackupError(Exception):
+    """Raised when a backup copy or a snapshot to restore fails verification"""
+
+class _TooManyRestarts(Exception):
+    pass
+
+def default_backup_dir(db_path):
+    """Get the snapshot directory for a database, one folder per outlet"""
+    from db import db_utils
+    if os.path.abspath(db_path) == os.path.abspath(db_utils.BASE_DB_PATH):
+        return BACKUP_DIR
+    return os.path.join(BACKUP_DIR, os.path.splitext(os.path.basename(db_path))[0])
+
+def snapshot_name(db_path, taken_at):
+    # Microseconds, so back-to-back snapshots never share a name
+    return f"{os.path.splitext(os.path.basename(db_path))[0]}_{taken_at.strftime('%Y%m%d_%H%M%S_%f')}.db"
+
+def archive_copies_dir(path):
+    """Get the folder holding a snapshot's copies of the archive partitions"""
+    return path.split('.db')[0] + '.archive'
+
+def list_backups(backup_dir):
+    """Get snapshot paths in a directory, newest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    paths = [
+        os.path.join(backup_dir, name) for name in os.listdir(backup_dir)
+        if name.endswith(('.db', '.db.gz'))
+    ]
+    return sorted(paths, key=_taken_at, reverse=True)
+
+def _taken_at(path):
+    """Sort key: a snapshot's timestamp, for names with and without microseconds"""
+    match = re.search(r'(\d{8}_\d{6})(_\d{6})?$', os.path.basename(path).split('.')[0])
+    if match is None:
+        return ''
+    return match.group(1) + (match.group(2) or '_000000')
+
+def check_integrity(db_path):
+    """Run PRAGMA integrity_check on a database file; returns the problems found"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    finally:
+        conn.close()
+    return [] if problems == ['ok'] else problems
+
+def _copy_pages(source, target, pages, sleep):
+    """Copy source into target in steps, falling back to one step if writers keep restarting it"""
+    progress = {'remaining': None, 'restarts': 0, 'steps': 0}
+
+    def on_step(status, remaining, total):
+        progress['steps'] += 1
+        if progress['remaining'] is not None and remaining > progress['remaining']:
+            progress['restarts'] += 1
+            if progress['restarts'] > MAX_RESTARTS:
+                raise _TooManyRestarts()
+        progress['remaining'] = remaining
+
+    try:
+        source.backup(target, pages=pages, progress=on_step, sleep=sleep)
+    except _TooManyRestarts:
+        source.backup(target)
+        progress['steps'] += 1
+    return progress
+
+def _snapshot_file(source_path, path, compress, pages, sleep):
+    """Copy one database file to path (plus .gz when compressing) and verify it
+
+    Returns (final path, pages copied, copy progress). Refuses to overwrite.
+    """
+    final = path + '.gz' if compress else path
+    partial = path + '.partial'
+    if os.path.exists(final) or os.path.exists(partial):
+        raise BackupError(f"Snapshot {final} already exists")
+
+    source = sqlite3.connect(source_path, timeout=30)
+    target = sqlite3.connect(partial)
+    try:
+        progress = _copy_pages(source, target, pages, sleep)
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+        # The copy is a single self-contained file whatever the live journal mode
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+        source.close()
+
+    problems = check_integrity(partial)
+    if problems:
+        os.remove(partial)
+        raise BackupError(f"Backup of {source_path} failed integrity check: {problems[:5]}")
+
+    if compress:
+        with open(partial, 'rb') as raw, gzip.open(final, 'wb') as packed:
+            shutil.copyfileobj(raw, packed)
+        os.remove(partial)
+    else:
+        os.replace(partial, final)
+    return final, page_count, progress
+
+def backup_database(db_path=None, backup_dir=None, compress=None, keep=None, pages=None, sleep=None):
+    """Take a verified snapshot of a live database and rotate old ones
+
+    The archive partitions listed in the database are copied next to it, into
+    <snapshot>.archive/. Returns a dict with the snapshot path, its size, pages
+    copied, steps, restarts, archives copied and elapsed seconds. Raises
+    BackupError if a copy fails its integrity check.
+    """
+    from db import db_utils
+    from db.archive import get_partitions
+
+    db_path = db_path or db_utils.DB_PATH
+    backup_dir = backup_dir or default_backup_dir(db_path)
+    compress = BACKUP_COMPRESS if compress is None else compress
+    keep = BACKUP_KEEP if keep is None else keep
+    pages = pages or BACKUP_STEP_PAGES
+    sleep = BACKUP_STEP_SLEEP if sleep is None else sleep
+
+    os.makedirs(backup_dir, exist_ok=True)
+    started = time.perf_counter()
+    path, page_count, progress = _snapshot_file(
+        db_path, os.path.join(backup_dir, snapshot_name(db_path, datetime.now())), compress, pages, sleep
+    )
+
+    # Partitions only change when db/archive.py runs, so a one-step copy is enough
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        partitions = get_partitions(conn)
+    finally:
+        conn.close()
+    if partitions:
+        os.makedirs(archive_copies_dir(path))
+    for partition in partitions:
+        _snapshot_file(
+            partition, os.path.join(archive_copies_dir(path), os.path.basename(partition)), compress, -1, 0
+        )
+
+    removed = rotate_backups(backup_dir, keep, path)
+    return {
+        'path': path,
+        'bytes': os.path.getsize(path),
+        'pages': page_count,
+        'steps': progress['steps'],
+        'restarts': progress['restarts'],
+        'archives': len(partitions),
+        'seconds': round(time.perf_counter() - started, 3),
+        'removed': removed,
+    }
+
+def rotate_backups(backup_dir, keep, taken=None):
+    """Delete all but the newest keep snapshots and their archive copies; returns the deleted paths
+
+    taken, the snapshot just written, is never deleted.
+    """
+    removed = [path for path in list_backups(backup_dir)[keep:] if path != taken] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+        shutil.rmtree(archive_copies_dir(path), ignore_errors=True)
+    return removed
+
+def _open_snapshot(path):
+    """Get a plain database file for a snapshot and whether it is a temporary copy"""
+    if not path.endswith('.gz'):
+        return path, False
+    handle, plain = tempfile.mkstemp(suffix='.db')
+    with os.fdopen(handle, 'wb') as raw, gzip.open(path, 'rb') as packed:
+        shutil.copyfileobj(packed, raw)
+    return plain, True
+
+def _archive_copies(path):
+    """Get {partition file name: copy path} for a snapshot's archive copies"""
+    folder = archive_copies_dir(path)
+    if not os.path.isdir(folder):
+        return {}
+    return {name.split('.db')[0] + '.db': os.path.join(folder, name) for name in sorted(os.listdir(folder))}
+
+def _check_file(path):
+    plain, temporary = _open_snapshot(path)
+    try:
+        return check_integrity(plain)
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        if temporary:
+            os.remove(plain)
+
+def verify_backup(path):
+    """Check a snapshot (plain or gzipped) and its archive copies; returns the problems found"""
+    problems = _check_file(path)
+    for name, copy in _archive_copies(path).items():
+        problems += [f"{name}: {problem}" for problem in _check_file(copy)]
+    return problems
+
+def _restore_file(path, target_path):
+    plain, temporary = _open_snapshot(path)
+    source = sqlite3.connect(f"file:{plain}?mode=ro", uri=True)
+    target = sqlite3.connect(target_path, timeout=30)
+    try:
+        # One step: terminals wait for the restore instead of seeing half of it
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+        if temporary:
+            os.remove(plain)
+
+def restore_backup(path, db_path=None, backup_dir=None):
+    """Replace a database's contents, and its archive partitions, with a snapshot
+
+    The snapshot is verified first and the current database is backed up (and
+    kept regardless of rotation) before it is overwritten. Partitions are put
+    back at the paths the snapshot's manifest lists. Returns that safety
+    snapshot's path.
+    """
+    from db import db_utils
+
+    db_path = db_path or db_utils.DB_PATH
+    problems = verify_backup(path)
+    if problems:
+        raise BackupError(f"Snapshot {path} failed integrity check: {problems[:5]}")
+
+    safety = None
+    if os.path.exists(db_path):
+        safety = backup_database(
+            db_path, os.path.join(backup_dir or default_backup_dir(db_path), 'pre_restore'), keep=0
+        )['path']
+
+    _restore_file(path, db_path)
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        manifest = [path for (path,) in conn.execute("SELECT path FROM archive_partitions")]
+    except sqlite3.OperationalError:
+        manifest = []
+    finally:
+        conn.close()
+    copies = _archive_copies(path)
+    for partition in manifest:
+        copy = copies.get(os.path.basename(partition))
+        if copy is None:
+            raise BackupError(f"Snapshot {path} has no copy of archive {partition}")
+        os.makedirs(os.path.dirname(partition) or '.', exist_ok=True)
+        _restore_file(copy, partition)
+    return safety
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up, verify and restore the restaurant database")
+    parser.add_argument("--db", help="Operational database (default: db/restaurant.db)")
+    parser.add_argument("--backup-dir", help="Snapshot directory (default: db/backups, per outlet when one is set)")
+    commands = parser.add_subparsers(dest="command")
+
+    backup = commands.add_parser("backup", help="Take a snapshot (default)")
+    backup.add_argument("--compress", action="store_true", default=BACKUP_COMPRESS, help="gzip the snapshot")
+    backup.add_argument("--keep", type=int, default=BACKUP_KEEP, help="Snapshots to keep (0 keeps all)")
+    backup.add_argument("--step-pages", type=int, default=BACKUP_STEP_PAGES)
+    backup.add_argument("--step-sleep", type=float, default=BACKUP_STEP_SLEEP)
+
+    commands.add_parser("list", help="List snapshots, newest first")
+
+    verify = commands.add_parser("verify", help="Check a snapshot's integrity")
+    verify.add_argument("snapshot")
+
+    restore = commands.add_parser("restore", help="Replace the database with a snapshot")
+    restore.add_argument("snapshot")
+    args = parser.parse_args()
+
+    from db import db_utils
+    db_path = args.db or db_utils.DB_PATH
+    backup_dir = args.backup_dir or default_backup_dir(db_path)
+
+    try:
+        if args.command in (None, "backup"):
+            if args.command is None:
+                result = backup_database(db_path, backup_dir)
+            else:
+                result = backup_database(
+                    db_path, backup_dir, args.compress, args.keep, args.step_pages, args.step_sleep
+                )
+            print(
+                f"💾 {result['path']} ({result['bytes'] / 1024:.0f} KB, {result['pages']} pages "
+                f"in {result['steps']} steps, {result['restarts']} restarts, {result['seconds']}s)"
+            )
+            if result['archives']:
+                print(f"📦 {result['archives']} archive partitions copied to {archive_copies_dir(result['path'])}")
+            for path in result['removed']:
+                print(f"🗑️ Rotated out {path}")
+        elif args.command == "list":
+            snapshots = list_backups(backup_dir)
+            if not snapshots:
+                print(f"📭 No snapshots in {backup_dir}")
+            for path in snapshots:
+                print(f"{path}  {os.path.getsize(path) / 1024:.0f} KB")
+        elif args.command == "verify":
+            problems = verify_backup(args.snapshot)
+            if problems:
+                print(f"❌ {args.snapshot} is damaged: {problems[:5]}")
+                sys.exit(1)
+            print(f"✅ {args.snapshot} passed integrity check")
+        elif args.command == "restore":
+            safety = restore_backup(args.snapshot, db_path, backup_dir)
+            if safety:
+                print(f"💾 Previous database saved to {safety}")
+            print(f"✅ {db_path} restored from {args.snapshot}; restart the app and API server")
+    except BackupError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
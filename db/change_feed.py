@@ -0,0 +1,67 @@
+"""
+Cheap change detection for screens that follow the database live.
+PRAGMA data_version changes whenever another connection commits to the file,
+so a watcher can be polled many times a second without reading any table;
+callers re-query only after the version moves, and then only the rows above
+the orders high-water mark they last saw.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+# How often wait() re-checks the version (seconds)
+POLL_INTERVAL = float(os.environ.get('RESTAURANT_CHANGE_POLL_INTERVAL', '0.1'))
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+class DataVersionWatcher:
+    """A long-lived read-only connection reporting the file's data_version"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # Shared by every session and request thread; calls are serialized
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def version(self):
+        """Current data_version; it differs from an earlier value once another connection committed"""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def wait(self, since, timeout, interval=None):
+        """Block until the version differs from since or timeout passes; returns the version"""
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self.version()
+            if current != since or time.monotonic() >= deadline:
+                return current
+            time.sleep(min(interval or POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+
+def get_watcher(db_path=None):
+    """Get the shared watcher for a database file (defaults to db_utils.DB_PATH)"""
+    if db_path is None:
+        from db import db_utils
+        db_path = db_utils.DB_PATH
+    key = os.path.abspath(db_path)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = _watchers[key] = DataVersionWatcher(db_path)
+        return watcher
+
+def has_changed(state, key, db_path=None, remember=True):
+    """Check whether the database changed since key was last checked
+
+    state is any dict-like store kept between checks, e.g. st.session_state.
+    The first check for a key always reports a change. remember=False only peeks.
+    """
+    version = get_watcher(db_path).version()
+    name = f"{key}_data_version"
+    if state.get(name) == version:
+        return False
+    if remember:
+        state[name] = version
+    return True
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Head-office consolidation across outlet databases.
+Each outlet's sales summary is computed in a worker process, then the partial
+aggregates are merged: counts and sums are added, averages recomputed from
+them, and top items re-ranked over the full per-outlet item totals.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from db import db_utils
+
+# Worker processes; defaults to one per CPU core
+CONSOLIDATION_WORKERS = int(os.environ.get('RESTAURANT_CONSOLIDATION_WORKERS', '0')) or os.cpu_count() or 1
+
+TOP_ITEMS = 10
+
+_pool = None
+_pool_workers = 0
+
+def get_pool(workers):
+    """Get the shared worker pool, reused across reports"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        # Spawned workers are safe to start from threaded servers like Streamlit
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        _pool_workers = workers
+    return _pool
+
+def outlet_partials(outlet, db_path, date_from, date_to):
+    """Compute one outlet's partial aggregates (runs in a worker process)"""
+    # db_path is passed explicitly: with a single worker this runs inside the
+    # server process, where db_utils.DB_PATH belongs to every other session
+    daily_sales, items, payment_breakdown = db_utils.get_sales_summary(
+        date_from, date_to, top_items=None, db_path=db_path
+    )
+    heatmap = db_utils.get_hourly_heatmap(date_from, date_to, db_path=db_path)
+
+    conn = db_utils.get_connection(db_path)
+    sources = db_utils.get_sources(conn, date_from, date_to)
+    service_modes = db_utils.combine_frames([
+        pd.read_sql_query(f'''
+            SELECT
+                service_mode,
+                COUNT(*) as order_count,
+                SUM(grand_total) as total_sales
+            FROM {orders}
+            WHERE DATE(order_date) BETWEEN ? AND ?
+            GROUP BY service_mode
+        ''', source, params=[date_from, date_to])
+        for source, orders, _ in sources
+    ], ['service_mode'], ['order_count', 'total_sales'])
+    db_utils.close_sources(sources)
+
+    return outlet, {
+        'daily_sales': daily_sales,
+        'items': items,
+        'payment_breakdown': payment_breakdown,
+        'heatmap': heatmap,
+        'service_modes': service_modes,
+    }
+
+def consolidate(date_from, date_to, outlets=None, workers=None, top_items=TOP_ITEMS):
+    """Get chain-wide reports for a date range across outlet databases
+
+    outlets maps outlet id to database file and defaults to db_utils.list_outlets().
+    Returns a dict of DataFrames: daily_sales, most_sold, payment_breakdown,
+    heatmap, service_modes and outlet_sales.
+    """
+    outlets = outlets if outlets is not None else db_utils.list_outlets()
+    if not outlets:
+        raise ValueError("No outlet databases found")
+    workers = max(1, min(workers or CONSOLIDATION_WORKERS, len(outlets)))
+
+    if workers == 1:
+        partials = [outlet_partials(outlet, path, date_from, date_to) for outlet, path in outlets.items()]
+    else:
+        pool = get_pool(workers)
+        futures = [
+            pool.submit(outlet_partials, outlet, path, date_from, date_to)
+            for outlet, path in outlets.items()
+        ]
+        partials = [future.result() for future in futures]
+
+    def frames(name):
+        return [partial[name] for _, partial in partials]
+
+    daily_sales = db_utils.combine_frames(
+        frames('daily_sales'), ['date'], ['total_orders', 'total_sales'],
+        averages={'avg_order_value': ('total_sales', 'total_orders')}, sort_by='date'
+    )
+    # Every outlet returns all its items, so the merged ranking is exact
+    most_sold = db_utils.combine_frames(
+        frames('items'), ['item_name', 'category'], ['total_quantity', 'total_revenue'],
+        sort_by='total_quantity', ascending=False, limit=top_items
+    )
+    payment_breakdown = db_utils.combine_frames(
+        frames('payment_breakdown'), ['payment_method'], ['order_count', 'total_amount']
+    )
+    heatmap = db_utils.combine_frames(
+        frames('heatmap'), ['weekday', 'hour'], ['order_count', 'total_sales'],
+        averages={'avg_order_value': ('total_sales', 'order_count')},
+        sort_by=['weekday', 'hour']
+    )
+    service_modes = db_utils.combine_frames(
+        frames('service_modes'), ['service_mode'], ['order_count', 'total_sales']
+    )
+    outlet_sales = pd.DataFrame([
+        {
+            'outlet': outlet,
+            'total_orders': int(partial['daily_sales']['total_orders'].sum()),
+            'total_sales': float(partial['daily_sales']['total_sales'].sum()),
+        }
+        for outlet, partial in partials
+    ])
+
+    return {
+        'daily_sales': daily_sales,
+        'most_sold': most_sold,
+        'payment_breakdown': payment_breakdown,
+        'heatmap': heatmap,
+        'service_modes': service_modes,
+        'outlet_sales': outlet_sales,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Consolidated chain-wide sales across outlet databases")
+    parser.add_argument("--from", dest="date_from", required=True, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", required=True, help="End date (YYYY-MM-DD)")
+    parser.add_argument("--db", default=db_utils.BASE_DB_PATH, help="Base database path the outlet files sit next to")
+    parser.add_argument("--workers", type=int, default=CONSOLIDATION_WORKERS)
+    parser.add_argument("--csv-dir", help="Also write each table as CSV into this directory")
+    args = parser.parse_args()
+
+    outlets = db_utils.list_outlets(args.db)
+    print(f"🏢 Consolidating {len(outlets)} outlets with {min(args.workers, max(len(outlets), 1))} workers...")
+    started = time.perf_counter()
+    report = consolidate(args.date_from, args.date_to, outlets, args.workers)
+    elapsed = time.perf_counter() - started
+
+    daily_sales = report['daily_sales']
+    print(f"✅ {int(daily_sales['total_orders'].sum())} orders, "
+          f"₹{daily_sales['total_sales'].sum():.2f} sales in {elapsed:.2f}s\n")
+    for name in ('outlet_sales', 'most_sold', 'payment_breakdown', 'service_modes'):
+        print(f"📊 {name}")
+        print(report[name].to_string(index=False))
+        print()
+
+    if args.csv_dir:
+        os.makedirs(args.csv_dir, exist_ok=True)
+        for name, frame in report.items():
+            frame.to_csv(os.path.join(args.csv_dir, f"{name}_{args.date_from}_to_{args.date_to}.csv"), index=False)
+        print(f"📥 CSV files written to {args.csv_dir}")
+
+if __name__ == "__main__":
+    main()
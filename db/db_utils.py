@@ -1,13 +1,73 @@
 import sqlite3
-import pandas as pd
 from datetime import datetime
+import glob
 import json
+import os
+import re
+from db.report_cache import make_key, get_cached, put_cached, is_live_range
+from db.instrumentation import instrumented, attach
+from db.metrics import start_metrics_exporter
+from db.maintenance import start_maintenance_scheduler
+from db.archive import MAX_ATTACHED, get_partitions, attach_partitions
+from db.models import MenuItem, Order, OrderItem, Customer, as_order, as_order_items
 
+# pandas is imported inside the DataFrame helpers so pages and tools that only
+# write orders or read single rows start without it
+
+# Database file for a single restaurant; outlets get their own file next to it
+BASE_DB_PATH = 'db/restaurant.db'
+
+# Outlet served by this process and the database file used by every helper in
+# this module; both are set from RESTAURANT_OUTLET below
+OUTLET_ID = ''
+DB_PATH = BASE_DB_PATH
+
+def outlet_db_path(db_path, outlet):
+    """Get the database file for one outlet"""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_outlet{outlet}{ext or '.db'}"
+
+def set_outlet(outlet):
+    """Route this process's reads and writes to an outlet's own database file"""
+    global OUTLET_ID, DB_PATH
+    outlet = str(outlet or '').strip()
+    if outlet and not re.fullmatch(r'[A-Za-z0-9_-]+', outlet):
+        raise ValueError(f"Invalid outlet id {outlet!r}: use letters, digits, '-' or '_'")
+    OUTLET_ID = outlet
+    DB_PATH = outlet_db_path(BASE_DB_PATH, outlet) if outlet else BASE_DB_PATH
+    return DB_PATH
+
+def list_outlets(db_path=None):
+    """Get {outlet: database file} for every outlet database next to db_path"""
+    root, ext = os.path.splitext(db_path or BASE_DB_PATH)
+    prefix = f"{root}_outlet"
+    outlets = {
+        path[len(prefix):-len(ext or '.db')]: path
+        for path in glob.glob(f"{glob.escape(prefix)}*{ext or '.db'}")
+    }
+    # Numeric outlet ids sort as numbers
+    return dict(sorted(
+        outlets.items(),
+        key=lambda item: (not item[0].isdigit(), int(item[0]) if item[0].isdigit() else 0, item[0])
+    ))
+
+set_outlet(os.environ.get('RESTAURANT_OUTLET', ''))
+
+def get_connection(db_path=None):
+    """Open a connection to the restaurant database, or to db_path"""
+    db_path = db_path or DB_PATH
+    return attach(sqlite3.connect(db_path), db_path)
+
+@instrumented
 def init_database():
     """Initialize the SQLite database with required tables"""
-    conn = sqlite3.connect('db/restaurant.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
+    # Lets db/maintenance.py hand free pages back without a full VACUUM; only
+    # takes effect on a new, empty database
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    
     # Create menu table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS menu (
@@ -35,7 +95,7 @@ def init_database():
             discount_amount REAL DEFAULT 0,
             grand_total REAL NOT NULL,
             payment_method TEXT NOT NULL,
-            order_status TEXT DEFAULT 'Completed',
+            order_status TEXT DEFAULT 'Paid',
             order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             items_json TEXT NOT NULL
         )
@@ -55,12 +115,115 @@ def init_database():
         )
     ''')
     
+    # Covering index for date-range scans and time-of-day aggregates
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_orders_date_total
+        ON orders (order_date, grand_total)
+    ''')
+    
+    # Line item lookups by order
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_order_items_order_id
+        ON order_items (order_id)
+    ''')
+    
+    # Order lifecycle history; the kitchen display follows it by id
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_order_events_order
+        ON order_events (order_id, id)
+    ''')
+    
+    # Orders saved before the lifecycle existed were marked 'Completed', which is
+    # not a lifecycle status; they have been paid for. Runs once per database
+    if cursor.execute("PRAGMA user_version").fetchone()[0] < 1:
+        migrate_completed_orders(conn)
+        cursor.execute("PRAGMA user_version = 1")
+    
+    # Orders still in the kitchen; partial, so finished orders cost nothing
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_orders_kitchen_status
+        ON orders (order_status)
+        WHERE order_status IN ('Placed', 'Preparing', 'Ready')
+    ''')
+    
+    # Per-day totals kept current by insert_order, so the home page reads a few rows
+    counters_exist = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_counters'"
+    ).fetchone()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_counters (
+            day TEXT NOT NULL,
+            payment_method TEXT NOT NULL,
+            order_count INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            gst_amount REAL NOT NULL,
+            discount_amount REAL NOT NULL,
+            PRIMARY KEY (day, payment_method)
+        )
+    ''')
+    if not counters_exist:
+        rebuild_daily_counters(conn)
+    
+    # Customer directory keyed by normalized phone, kept current by insert_order
+    customers_exist = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers'"
+    ).fetchone()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            phone TEXT PRIMARY KEY,
+            name TEXT NOT NULL COLLATE NOCASE,
+            visit_count INTEGER NOT NULL,
+            lifetime_spend REAL NOT NULL,
+            first_visit TIMESTAMP,
+            last_visit TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+    
+    # Name prefix search for autocomplete
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_customers_name
+        ON customers (name)
+    ''')
+    if not customers_exist:
+        rebuild_customers(conn)
+    
+    # Open dine-in tabs shared by every terminal; each change appends one line
+    # (negative quantities take items off) until the tab is billed
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS open_tab_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_number TEXT NOT NULL,
+            menu_item_id INTEGER,
+            item_name TEXT NOT NULL,
+            category TEXT,
+            unit_price REAL NOT NULL,
+            gst_rate REAL,
+            quantity INTEGER NOT NULL,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_open_tab_items_table
+        ON open_tab_items (table_number, id)
+    ''')
+    
     conn.commit()
     conn.close()
 
+@instrumented
 def add_menu_item(name, category, price, gst_rate=5.0):
     """Add a new item to the menu"""
-    conn = sqlite3.connect('db/restaurant.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -71,9 +234,31 @@ def add_menu_item(name, category, price, gst_rate=5.0):
     conn.commit()
     conn.close()
 
+@instrumented
+def count_menu_items():
+    """Count available menu items"""
+    conn = get_connection()
+    count = conn.execute("SELECT COUNT(*) FROM menu WHERE available = 1").fetchone()[0]
+    conn.close()
+    return count
+
+@instrumented
+def list_menu_items():
+    """Get available menu items as MenuItem records"""
+    conn = get_connection()
+    items = [
+        MenuItem(*row) for row in conn.execute(
+            f"SELECT {MenuItem.COLUMNS} FROM menu WHERE available = 1 ORDER BY category, name"
+        )
+    ]
+    conn.close()
+    return items
+
+@instrumented
 def get_menu_items():
     """Get all menu items"""
-    conn = sqlite3.connect('db/restaurant.db')
+    import pandas as pd
+    conn = get_connection()
     menu_df = pd.read_sql_query(
         "SELECT * FROM menu WHERE available = 1 ORDER BY category, name",
         conn
@@ -81,9 +266,10 @@ def get_menu_items():
     conn.close()
     return menu_df
 
+@instrumented
 def update_menu_item(item_id, name, category, price, gst_rate, available):
     """Update a menu item"""
-    conn = sqlite3.connect('db/restaurant.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -95,9 +281,10 @@ def update_menu_item(item_id, name, category, price, gst_rate, available):
     conn.commit()
     conn.close()
 
+@instrumented
 def delete_menu_item(item_id):
     """Delete a menu item"""
-    conn = sqlite3.connect('db/restaurant.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('DELETE FROM menu WHERE id = ?', (item_id,))
@@ -105,56 +292,648 @@ def delete_menu_item(item_id):
     conn.commit()
     conn.close()
 
+# Order lifecycle, in order; orders in KITCHEN_STATUSES are shown on the kitchen display
+ORDER_STATUSES = ['Placed', 'Preparing', 'Ready', 'Served', 'Paid']
+KITCHEN_STATUSES = ['Placed', 'Preparing', 'Ready']
+
+def migrate_completed_orders(conn):
+    """Move orders and events with the pre-lifecycle 'Completed' status to 'Paid' (no commit)
+
+    Archive partitions are updated too, on their own connections.
+    """
+    conn.execute("UPDATE orders SET order_status = 'Paid' WHERE order_status = 'Completed'")
+    conn.execute("UPDATE order_events SET status = 'Paid' WHERE status = 'Completed'")
+    for path in get_partitions(conn):
+        archive = sqlite3.connect(path, timeout=30)
+        try:
+            archive.execute("UPDATE orders SET order_status = 'Paid' WHERE order_status = 'Completed'")
+            # Partitions archived before events moved with their orders have none
+            if archive.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'order_events'"
+            ).fetchone():
+                archive.execute("UPDATE order_events SET status = 'Paid' WHERE status = 'Completed'")
+            archive.commit()
+        finally:
+            archive.close()
+    bump_report_generation(conn)
+
 def generate_order_number():
     """Generate a unique order number"""
     now = datetime.now()
-    timestamp = now.strftime('%Y%m%d%H%M%S')
+    # Microseconds keep numbers unique when several orders are saved in the same second
+    timestamp = now.strftime('%Y%m%d%H%M%S%f')
+    # The outlet suffix keeps numbers unique across the chain
+    if OUTLET_ID:
+        return f"ORD{timestamp}-{OUTLET_ID}"
     return f"ORD{timestamp}"
 
-def save_order(order_data, order_items):
-    """Save a completed order to the database"""
-    conn = sqlite3.connect('db/restaurant.db')
-    cursor = conn.cursor()
-    
+def insert_order(cursor, order_data, order_items, order_date=None):
+    """Insert an order and its items using an open cursor (no commit)
+
+    order_date (UTC, 'YYYY-MM-DD HH:MM:SS') defaults to the current time.
+    Accepts an Order and OrderItems, or their dict forms.
+    """
+    order = as_order(order_data)
+    order_items = as_order_items(order_items)
+
     # Insert order
     cursor.execute('''
         INSERT INTO orders (
             order_number, service_mode, customer_name, customer_phone, 
             table_number, subtotal, gst_amount, discount_amount, 
-            grand_total, payment_method, items_json
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            grand_total, payment_method, order_status, items_json, order_date
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
     ''', (
-        order_data['order_number'], order_data['service_mode'],
-        order_data.get('customer_name', ''), order_data.get('customer_phone', ''),
-        order_data.get('table_number', ''), order_data['subtotal'],
-        order_data['gst_amount'], order_data['discount_amount'],
-        order_data['grand_total'], order_data['payment_method'],
-        json.dumps(order_items)
+        order.order_number, order.service_mode,
+        order.customer_name or '', order.customer_phone or '',
+        order.table_number or '', order.subtotal,
+        order.gst_amount, order.discount_amount,
+        order.grand_total, order.payment_method, order.order_status or 'Paid',
+        json.dumps([item.to_dict() for item in order_items]), order_date
     ))
     
     order_id = cursor.lastrowid
     
-    # Insert order items
-    for item in order_items:
+    cursor.execute(
+        "INSERT INTO order_events (order_id, status) VALUES (?, ?)",
+        (order_id, order.order_status or 'Paid')
+    )
+    
+    # Same transaction as the order, so the counters never drift from it
+    cursor.execute('''
+        INSERT INTO daily_counters (day, payment_method, order_count, revenue, gst_amount, discount_amount)
+        SELECT DATE(order_date), payment_method, 1, grand_total, gst_amount, discount_amount
+        FROM orders WHERE id = ?
+        ON CONFLICT (day, payment_method) DO UPDATE SET
+            order_count = order_count + 1,
+            revenue = revenue + excluded.revenue,
+            gst_amount = gst_amount + excluded.gst_amount,
+            discount_amount = discount_amount + excluded.discount_amount
+    ''', (order_id,))
+    
+    # Same for the customer's visits and spend; later orders update the name
+    phone = normalize_phone(order.customer_phone)
+    if phone:
         cursor.execute('''
-            INSERT INTO order_items (
-                order_id, item_name, category, quantity, unit_price, total_price
-            ) VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            order_id, item['name'], item.get('category', ''),
-            item['quantity'], item['price'], item['price'] * item['quantity']
-        ))
+            INSERT INTO customers (phone, name, visit_count, lifetime_spend, first_visit, last_visit)
+            SELECT ?, customer_name, 1, grand_total, order_date, order_date
+            FROM orders WHERE id = ?
+            ON CONFLICT (phone) DO UPDATE SET
+                name = CASE
+                    WHEN excluded.name != '' AND excluded.last_visit >= last_visit THEN excluded.name
+                    ELSE name
+                END,
+                visit_count = visit_count + 1,
+                lifetime_spend = lifetime_spend + excluded.lifetime_spend,
+                first_visit = MIN(first_visit, excluded.first_visit),
+                last_visit = MAX(last_visit, excluded.last_visit)
+        ''', (phone, order_id))
     
-    conn.commit()
-    conn.close()
+    # Insert order items
+    cursor.executemany('''
+        INSERT INTO order_items (
+            order_id, item_name, category, quantity, unit_price, total_price
+        ) VALUES (?, ?, ?, ?, ?, ?)
+    ''', [
+        (order_id, item.name, item.category, item.quantity, item.price, item.total_price)
+        for item in order_items
+    ])
     
     return order_id
 
-def get_orders(date_from=None, date_to=None):
+class TabChanged(Exception):
+    """Raised when a tab gained lines on another terminal after it was read for billing"""
+
+@instrumented
+def save_order(order_data, order_items, tab_version=None):
+    """Save a completed order to the database
+
+    tab_version (from get_tab) bills the open tab of the order's table: the
+    order is saved and the tab closed in one transaction, unless the tab has
+    changed since it was read, in which case TabChanged is raised.
+    """
+    conn = get_connection()
+    
+    try:
+        if tab_version is None:
+            order_id = insert_order(conn.cursor(), order_data, order_items)
+        else:
+            table_number = str(as_order(order_data).table_number or '')
+            # Take the write lock first so no line can be appended in between
+            conn.execute("BEGIN IMMEDIATE")
+            if _tab_version(conn, table_number) != tab_version:
+                raise TabChanged(f"Table {table_number} was updated on another terminal")
+            order_id = insert_order(conn.cursor(), order_data, order_items)
+            conn.execute("DELETE FROM open_tab_items WHERE table_number = ?", (table_number,))
+        conn.commit()
+    except Exception:
+        # Release the write lock straight away instead of when the connection is collected
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    
+    return order_id
+
+@instrumented
+def set_order_status(order_id, status):
+    """Move an order to a lifecycle status and record the event; False if the order is unknown"""
+    if status not in ORDER_STATUSES:
+        raise ValueError(f"Unknown order status {status!r}")
+    conn = get_connection()
+    try:
+        cursor = conn.execute("UPDATE orders SET order_status = ? WHERE id = ?", (status, int(order_id)))
+        if cursor.rowcount == 0:
+            return False
+        conn.execute("INSERT INTO order_events (order_id, status) VALUES (?, ?)", (int(order_id), status))
+        # Cached reports over closed ranges would keep the old status
+        order_date = conn.execute("SELECT order_date FROM orders WHERE id = ?", (int(order_id),)).fetchone()[0]
+        if not is_live_range(str(order_date)[:10]):
+            bump_report_generation(conn)
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+@instrumented
+def get_tickets(order_ids=None):
+    """Get kitchen tickets as Orders with items, oldest first
+
+    order_ids limits the result to those orders; by default every order still in
+    KITCHEN_STATUSES is returned.
+    """
+    conn = get_connection()
+    try:
+        if order_ids is None:
+            # Literal values, so SQLite can use the partial idx_orders_kitchen_status
+            statuses = ', '.join(f"'{status}'" for status in KITCHEN_STATUSES)
+            rows = conn.execute(
+                f"SELECT {Order.COLUMNS} FROM orders WHERE order_status IN ({statuses}) ORDER BY id"
+            ).fetchall()
+        else:
+            order_ids = [int(order_id) for order_id in order_ids]
+            rows = conn.execute(
+                f"SELECT {Order.COLUMNS} FROM orders WHERE id IN ({', '.join('?' * len(order_ids))}) ORDER BY id",
+                order_ids
+            ).fetchall() if order_ids else []
+        tickets = {row[0]: Order(*row) for row in rows}
+        if tickets:
+            for order_id, *item in conn.execute(
+                f"SELECT order_id, {OrderItem.COLUMNS} FROM order_items "
+                f"WHERE order_id IN ({', '.join('?' * len(tickets))}) ORDER BY id",
+                list(tickets)
+            ):
+                tickets[order_id].items.append(OrderItem(*item))
+    finally:
+        conn.close()
+    return list(tickets.values())
+
+@instrumented
+def get_order_events(after_id=0, limit=500):
+    """Get lifecycle events newer than after_id as dicts, oldest first"""
+    conn = get_connection()
+    try:
+        rows = conn.execute('''
+            SELECT id, order_id, status, changed_at FROM order_events
+            WHERE id > ? ORDER BY id LIMIT ?
+        ''', (int(after_id), int(limit))).fetchall()
+    finally:
+        conn.close()
+    return [
+        {'id': event_id, 'order_id': order_id, 'status': status, 'changed_at': changed_at}
+        for event_id, order_id, status, changed_at in rows
+    ]
+
+@instrumented
+def get_last_event_id():
+    """Id of the newest lifecycle event, 0 when there are none"""
+    conn = get_connection()
+    try:
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM order_events").fetchone()[0]
+    finally:
+        conn.close()
+
+def _tab_version(conn, table_number):
+    """Id of a tab's latest line, or 0 when the table has no open tab"""
+    return conn.execute(
+        "SELECT COALESCE(MAX(id), 0) FROM open_tab_items WHERE table_number = ?", (table_number,)
+    ).fetchone()[0]
+
+@instrumented
+def add_tab_item(table_number, item, quantity=None):
+    """Append one line to a table's open tab, opening it if needed
+
+    quantity defaults to item.quantity; a negative quantity takes items off.
+    """
+    quantity = item.quantity if quantity is None else int(quantity)
+    conn = get_connection()
+    try:
+        cursor = conn.execute('''
+            INSERT INTO open_tab_items (
+                table_number, menu_item_id, item_name, category, unit_price, gst_rate, quantity
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (str(table_number), item.id, item.name, item.category, item.price, item.gst_rate, quantity))
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+@instrumented
+def get_tab(table_number):
+    """Get a table's open tab as (OrderItems, version)
+
+    Lines for the same item are added up; pass version to save_order when billing.
+    """
+    conn = get_connection()
+    try:
+        # Version first, and only lines up to it, so a line appended in between
+        # is in neither and billing against this version fails instead of dropping it
+        version = _tab_version(conn, str(table_number))
+        rows = conn.execute('''
+            SELECT item_name, category, SUM(quantity), unit_price, menu_item_id, gst_rate
+            FROM open_tab_items
+            WHERE table_number = ? AND id <= ?
+            GROUP BY menu_item_id, item_name, category, unit_price, gst_rate
+            HAVING SUM(quantity) > 0
+            ORDER BY MIN(id)
+        ''', (str(table_number), version)).fetchall()
+    finally:
+        conn.close()
+    return [OrderItem(*row) for row in rows], version
+
+@instrumented
+def list_open_tabs():
+    """Get open tabs as dicts with table_number, item_count, subtotal and opened_at"""
+    conn = get_connection()
+    try:
+        rows = conn.execute('''
+            SELECT table_number, SUM(quantity), SUM(quantity * unit_price), MIN(added_at)
+            FROM open_tab_items
+            GROUP BY table_number
+            HAVING SUM(quantity) > 0
+            ORDER BY MIN(added_at)
+        ''').fetchall()
+    finally:
+        conn.close()
+    return [
+        {'table_number': table, 'item_count': count, 'subtotal': round(subtotal, 2), 'opened_at': opened_at}
+        for table, count, subtotal, opened_at in rows
+    ]
+
+@instrumented
+def discard_tab(table_number):
+    """Close a table's open tab without billing it"""
+    conn = get_connection()
+    try:
+        conn.execute("DELETE FROM open_tab_items WHERE table_number = ?", (str(table_number),))
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_sources(conn, date_from=None, date_to=None):
+    """Get (connection, orders table, items table) for every store covering a date range
+
+    The first entry uses conn; archive partitions overlapping the range are attached
+    to it, spilling onto extra connections once SQLite's attach limit is reached.
+    """
+    partitions = get_partitions(conn, date_from, date_to)
+    if not partitions:
+        return [(conn, 'orders', 'order_items')]
+    
+    sources = [(conn, *attach_partitions(conn, partitions[:MAX_ATTACHED]))]
+    rest = partitions[MAX_ATTACHED:]
+    for start in range(0, len(rest), MAX_ATTACHED + 1):
+        group = rest[start:start + MAX_ATTACHED + 1]
+        extra = attach(sqlite3.connect(group[0]), group[0])
+        sources.append((extra, *attach_partitions(extra, group[1:])))
+    return sources
+
+def close_sources(sources):
+    """Close every connection returned by get_sources"""
+    for conn, _, _ in sources:
+        conn.close()
+
+def combine_frames(frames, keys, sums, averages=None, sort_by=None, ascending=True, limit=None):
+    """Merge per-source aggregates: add up sums per key and recompute averages
+
+    averages maps a column to its (numerator, denominator) columns.
+    """
+    import pandas as pd
+    if len(frames) == 1:
+        return frames[0].head(limit) if limit else frames[0]
+    combined = pd.concat(frames, ignore_index=True).groupby(keys, as_index=False)[sums].sum()
+    for column, (numerator, denominator) in (averages or {}).items():
+        combined[column] = combined[numerator] / combined[denominator]
+    if sort_by:
+        combined = combined.sort_values(sort_by, ascending=ascending)
+    if limit:
+        combined = combined.head(limit)
+    return combined[list(frames[0].columns)].reset_index(drop=True)
+
+def get_orders_version(conn):
+    """Get the orders high-water mark used to invalidate cached reports"""
+    row = conn.execute("SELECT MAX(id) FROM orders").fetchone()
+    return row[0] or 0
+
+def get_report_generation(conn):
+    """Get the persisted report generation, part of every report cache key"""
+    try:
+        row = conn.execute("SELECT generation FROM report_generation").fetchone()
+    except sqlite3.OperationalError:
+        # Nothing has invalidated past reports yet
+        return 0
+    return row[0] if row else 0
+
+def bump_report_generation(conn):
+    """Invalidate cached reports in every process after past orders changed (no commit)
+
+    The report cache is per process and keeps closed date ranges until
+    eviction, so the marker lives in the database itself.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS report_generation (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO report_generation (id, generation) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET generation = generation + 1
+    ''')
+
+@instrumented
+def get_orders_high_water():
+    """Get the id of the newest order; rows above it are new to a caller holding it"""
+    conn = get_connection()
+    try:
+        return get_orders_version(conn)
+    finally:
+        conn.close()
+
+@instrumented
+def get_new_orders(after_id, date_from=None, date_to=None):
+    """Get orders added above the after_id high-water mark, and the new mark
+
+    Only the operational database is read, since new orders are never archived.
+    Returns (orders DataFrame newest first, high-water mark).
+    """
+    import pandas as pd
+    conn = get_connection()
+    try:
+        # Read the mark first and bound the rows by it, so none is skipped next time
+        high_water = max(get_orders_version(conn), int(after_id))
+        query = "SELECT * FROM orders WHERE id > ? AND id <= ?"
+        params = [int(after_id), high_water]
+        if date_from:
+            query += " AND DATE(order_date) >= ?"
+            params.append(date_from)
+        if date_to:
+            query += " AND DATE(order_date) <= ?"
+            params.append(date_to)
+        orders_df = pd.read_sql_query(query + " ORDER BY order_date DESC", conn, params=params)
+    finally:
+        conn.close()
+    return orders_df, high_water
+
+def rebuild_daily_counters(conn):
+    """Recompute the per-day counters from orders, archives included (no commit)"""
+    conn.execute("DELETE FROM daily_counters")
+    # Archives are read on their own connections: ATTACH is not allowed inside
+    # the transaction the caller may have open
+    stores = [conn] + [sqlite3.connect(path) for path in get_partitions(conn)]
+    try:
+        for store in stores:
+            conn.executemany('''
+                INSERT INTO daily_counters (day, payment_method, order_count, revenue, gst_amount, discount_amount)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (day, payment_method) DO UPDATE SET
+                    order_count = order_count + excluded.order_count,
+                    revenue = revenue + excluded.revenue,
+                    gst_amount = gst_amount + excluded.gst_amount,
+                    discount_amount = discount_amount + excluded.discount_amount
+            ''', store.execute('''
+                SELECT DATE(order_date), payment_method, COUNT(*), SUM(grand_total), SUM(gst_amount), SUM(discount_amount)
+                FROM orders
+                GROUP BY DATE(order_date), payment_method
+            ''').fetchall())
+    finally:
+        for store in stores[1:]:
+            store.close()
+
+@instrumented
+def get_day_counters(day):
+    """Get a day's live totals: orders, revenue, gst_amount, discount_amount and payments
+
+    payments maps each payment method to (orders, revenue).
+    """
+    conn = get_connection()
+    try:
+        rows = conn.execute('''
+            SELECT payment_method, order_count, revenue, gst_amount, discount_amount
+            FROM daily_counters WHERE day = ?
+            ORDER BY revenue DESC
+        ''', (day,)).fetchall()
+    finally:
+        conn.close()
+    return {
+        'orders': sum(row[1] for row in rows),
+        'revenue': sum(row[2] for row in rows),
+        'gst_amount': sum(row[3] for row in rows),
+        'discount_amount': sum(row[4] for row in rows),
+        'payments': {row[0]: (row[1], row[2]) for row in rows},
+    }
+
+def normalize_phone(phone):
+    """Reduce a phone number to its digits, dropping a +91 or 0 prefix, so a customer has one key"""
+    digits = re.sub(r'\D', '', str(phone or ''))
+    if (len(digits) == 12 and digits.startswith('91')) or (len(digits) == 11 and digits.startswith('0')):
+        digits = digits[-10:]
+    return digits
+
+def rebuild_customers(conn):
+    """Recompute the customer directory from orders, archives included (no commit)"""
+    customers = {}
+    # Oldest first, so the latest non-empty name wins as it does in insert_order
+    stores = [sqlite3.connect(path) for path in get_partitions(conn)] + [conn]
+    try:
+        for store in stores:
+            for name, phone, grand_total, order_date in store.execute(
+                "SELECT customer_name, customer_phone, grand_total, order_date FROM orders "
+                "WHERE customer_phone != '' ORDER BY order_date"
+            ):
+                phone = normalize_phone(phone)
+                if not phone:
+                    continue
+                customer = customers.get(phone)
+                if customer is None:
+                    customers[phone] = [name or '', 1, grand_total, order_date, order_date]
+                    continue
+                customer[1] += 1
+                customer[2] += grand_total
+                customer[3] = min(customer[3], order_date)
+                if order_date >= customer[4]:
+                    customer[4] = order_date
+                    customer[0] = name or customer[0]
+    finally:
+        for store in stores[:-1]:
+            store.close()
+
+    conn.execute("DELETE FROM customers")
+    conn.executemany(
+        "INSERT INTO customers (phone, name, visit_count, lifetime_spend, first_visit, last_visit) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(phone, *values) for phone, values in customers.items()]
+    )
+
+@instrumented
+def get_customer(phone):
+    """Get a customer by phone number in any format, or None"""
+    phone = normalize_phone(phone)
+    if not phone:
+        return None
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            f"SELECT {Customer.COLUMNS} FROM customers WHERE phone = ?", (phone,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return Customer(*row) if row else None
+
+# Shorter phone prefixes (after dropping +91 or 0) would match most of the directory
+PHONE_SEARCH_MIN_DIGITS = 3
+
+def phone_prefixes(query):
+    """Get the stored-key prefixes a typed phone prefix can stand for
+
+    Mirrors normalize_phone: a leading +91 is dropped, and a leading 0 or 91 may
+    be a prefix to drop or the start of the number itself, so both are kept.
+    Prefixes shorter than PHONE_SEARCH_MIN_DIGITS are left out.
+    """
+    digits = re.sub(r'\D', '', query)
+    if query.lstrip().startswith('+91'):
+        prefixes = [digits[2:]]
+    else:
+        prefixes = [digits]
+        if digits.startswith('0'):
+            prefixes.append(digits[1:])
+        elif digits.startswith('91'):
+            prefixes.append(digits[2:])
+        # A 10-digit number cannot be longer than 10 digits
+        prefixes = [prefix for prefix in prefixes if len(prefix) <= 10] or [normalize_phone(digits)]
+    return [prefix for prefix in prefixes if len(prefix) >= PHONE_SEARCH_MIN_DIGITS]
+
+@instrumented
+def search_customers(query, limit=8):
+    """Get customers whose phone or name starts with query, most frequent first
+
+    A query of digits (spaces, dashes and a +91 or 0 prefix allowed) matches
+    phone numbers, anything else matches names regardless of case. Both are
+    prefix range scans on an index.
+    """
+    query = str(query or '').strip()
+    if not query:
+        return []
+    if re.fullmatch(r'[\d\s()+-]+', query):
+        column = 'phone'
+        # ':' sorts right after '9'
+        ranges = [(prefix, prefix + ':') for prefix in phone_prefixes(query)]
+        if not ranges:
+            return []
+    else:
+        column = 'name'
+        ranges = [(query, query + '\U0010ffff')]
+    conn = get_connection()
+    try:
+        rows = conn.execute(f'''
+            SELECT {Customer.COLUMNS} FROM customers
+            WHERE {' OR '.join(f'({column} >= ? AND {column} < ?)' for _ in ranges)}
+            ORDER BY visit_count DESC, last_visit DESC
+            LIMIT ?
+        ''', [bound for bounds in ranges for bound in bounds] + [limit]).fetchall()
+    finally:
+        conn.close()
+    return [Customer(*row) for row in rows]
+
+@instrumented
+def fetch_order(order_number):
+    """Get a single order and its items as an Order record"""
+    conn = get_connection()
+    query = f"SELECT {Order.COLUMNS} FROM orders WHERE order_number = ?"
+    
+    row = conn.execute(query, (order_number,)).fetchone()
+    
+    # Older orders may have been moved to an archive partition
+    if row is None:
+        for path in get_partitions(conn):
+            archive_conn = attach(sqlite3.connect(path), path)
+            row = archive_conn.execute(query, (order_number,)).fetchone()
+            if row is not None:
+                conn.close()
+                conn = archive_conn
+                break
+            archive_conn.close()
+    
+    if row is None:
+        conn.close()
+        return None
+    
+    order = Order(*row)
+    order.items = [
+        OrderItem(*item) for item in conn.execute(
+            f"SELECT {OrderItem.COLUMNS} FROM order_items WHERE order_id = ? ORDER BY id",
+            (order.id,)
+        )
+    ]
+    conn.close()
+    return order
+
+def get_order_by_number(order_number):
+    """Get a single order and its items by order number"""
+    order = fetch_order(order_number)
+    return order.to_dict() if order is not None else None
+
+@instrumented
+def list_orders(date_from=None, date_to=None):
+    """Get Order records (without items) within date range, newest first"""
+    query = f"SELECT {Order.COLUMNS} FROM {{orders}} WHERE 1 = 1"
+    params = []
+    if date_from:
+        query += " AND DATE(order_date) >= ?"
+        params.append(date_from)
+    if date_to:
+        query += " AND DATE(order_date) <= ?"
+        params.append(date_to)
+    query += " ORDER BY order_date DESC"
+    
+    conn = get_connection()
+    sources = get_sources(conn, date_from, date_to)
+    orders = [
+        Order(*row)
+        for source, orders_table, _ in sources
+        for row in source.execute(query.format(orders=orders_table), params)
+    ]
+    close_sources(sources)
+    
+    if len(sources) > 1:
+        orders.sort(key=lambda order: order.order_date, reverse=True)
+    return orders
+
+@instrumented
+def get_orders(date_from=None, date_to=None, use_cache=False, db_path=None):
     """Get orders within date range"""
-    conn = sqlite3.connect('db/restaurant.db')
+    import pandas as pd
+    db_path = db_path or DB_PATH
+    conn = get_connection(db_path)
     
-    query = "SELECT * FROM orders"
+    if use_cache:
+        key = make_key(db_path, 'orders', date_from, date_to, get_orders_version(conn), get_report_generation(conn))
+        hit, cached = get_cached(key)
+        if hit:
+            conn.close()
+            return cached.copy()
+    
+    query = "SELECT * FROM {orders}"
     params = []
     
     if date_from and date_to:
@@ -169,58 +948,185 @@ def get_orders(date_from=None, date_to=None):
     
     query += " ORDER BY order_date DESC"
     
-    orders_df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
+    sources = get_sources(conn, date_from, date_to)
+    frames = [
+        pd.read_sql_query(query.format(orders=orders), source, params=params)
+        for source, orders, _ in sources
+    ]
+    close_sources(sources)
+    
+    orders_df = frames[0]
+    if len(frames) > 1:
+        orders_df = pd.concat(frames, ignore_index=True).sort_values(
+            'order_date', ascending=False
+        ).reset_index(drop=True)
+    
+    if use_cache:
+        put_cached(key, orders_df.copy())
     
     return orders_df
 
-def get_sales_summary(date_from, date_to):
-    """Get sales summary for a date range"""
-    conn = sqlite3.connect('db/restaurant.db')
-    
-    # Daily sales
-    daily_sales = pd.read_sql_query('''
-        SELECT 
-            DATE(order_date) as date,
-            COUNT(*) as total_orders,
-            SUM(grand_total) as total_sales,
-            AVG(grand_total) as avg_order_value
-        FROM orders 
-        WHERE DATE(order_date) BETWEEN ? AND ?
-        GROUP BY DATE(order_date)
-        ORDER BY date
-    ''', conn, params=[date_from, date_to])
-    
-    # Most sold items
-    most_sold = pd.read_sql_query('''
-        SELECT 
-            item_name,
-            category,
-            SUM(quantity) as total_quantity,
-            SUM(total_price) as total_revenue
-        FROM order_items oi
-        JOIN orders o ON oi.order_id = o.id
-        WHERE DATE(o.order_date) BETWEEN ? AND ?
-        GROUP BY item_name, category
-        ORDER BY total_quantity DESC
-        LIMIT 10
-    ''', conn, params=[date_from, date_to])
-    
-    # Payment method breakdown
-    payment_breakdown = pd.read_sql_query('''
-        SELECT 
-            payment_method,
-            COUNT(*) as order_count,
-            SUM(grand_total) as total_amount
-        FROM orders 
-        WHERE DATE(order_date) BETWEEN ? AND ?
-        GROUP BY payment_method
-    ''', conn, params=[date_from, date_to])
+@instrumented
+def get_sales_summary(date_from, date_to, use_cache=False, top_items=10, db_path=None):
+    """Get sales summary for a date range (top_items=None returns every item)"""
+    import pandas as pd
+    db_path = db_path or DB_PATH
+    conn = get_connection(db_path)
     
-    conn.close()
+    if use_cache:
+        key = make_key(
+            db_path, f'sales_summary:{top_items}', date_from, date_to,
+            get_orders_version(conn), get_report_generation(conn)
+        )
+        hit, cached = get_cached(key)
+        if hit:
+            conn.close()
+            return tuple(df.copy() for df in cached)
+    
+    sources = get_sources(conn, date_from, date_to)
+    # Top items are ranked in SQL only when there is nothing to merge
+    limit = f"LIMIT {int(top_items)}" if top_items and len(sources) == 1 else ""
+    daily_frames, most_sold_frames, payment_frames = [], [], []
+    
+    for source, orders, order_items in sources:
+        # Daily sales
+        daily_frames.append(pd.read_sql_query(f'''
+            SELECT 
+                DATE(order_date) as date,
+                COUNT(*) as total_orders,
+                SUM(grand_total) as total_sales,
+                AVG(grand_total) as avg_order_value
+            FROM {orders} 
+            WHERE DATE(order_date) BETWEEN ? AND ?
+            GROUP BY DATE(order_date)
+            ORDER BY date
+        ''', source, params=[date_from, date_to]))
+        
+        # Most sold items
+        most_sold_frames.append(pd.read_sql_query(f'''
+            SELECT 
+                item_name,
+                category,
+                SUM(quantity) as total_quantity,
+                SUM(total_price) as total_revenue
+            FROM {order_items} oi
+            JOIN {orders} o ON oi.order_id = o.id
+            WHERE DATE(o.order_date) BETWEEN ? AND ?
+            GROUP BY item_name, category
+            ORDER BY total_quantity DESC
+            {limit}
+        ''', source, params=[date_from, date_to]))
+        
+        # Payment method breakdown
+        payment_frames.append(pd.read_sql_query(f'''
+            SELECT 
+                payment_method,
+                COUNT(*) as order_count,
+                SUM(grand_total) as total_amount
+            FROM {orders} 
+            WHERE DATE(order_date) BETWEEN ? AND ?
+            GROUP BY payment_method
+        ''', source, params=[date_from, date_to]))
+    
+    close_sources(sources)
+    
+    daily_sales = combine_frames(
+        daily_frames, ['date'], ['total_orders', 'total_sales'],
+        averages={'avg_order_value': ('total_sales', 'total_orders')}, sort_by='date'
+    )
+    most_sold = combine_frames(
+        most_sold_frames, ['item_name', 'category'], ['total_quantity', 'total_revenue'],
+        sort_by='total_quantity', ascending=False, limit=top_items
+    )
+    payment_breakdown = combine_frames(
+        payment_frames, ['payment_method'], ['order_count', 'total_amount']
+    )
+    
+    if use_cache:
+        put_cached(key, (daily_sales.copy(), most_sold.copy(), payment_breakdown.copy()))
     
     return daily_sales, most_sold, payment_breakdown
 
+# SQL bucket for each chart grain over daily_counters.day; weeks start on Monday
+TREND_BUCKETS = {
+    'day': "day",
+    'week': "DATE(day, 'weekday 0', '-6 days')",
+    'month': "strftime('%Y-%m-01', day)",
+}
+
+@instrumented
+def get_sales_trend(date_from, date_to, grain='day'):
+    """Get orders and sales per day, week or month from the daily counters
+
+    Reads one row per day and payment method instead of every order. Archived
+    orders are covered: archiving leaves the counters in place, and
+    rebuild_daily_counters includes the archive partitions.
+    """
+    import pandas as pd
+    if grain not in TREND_BUCKETS:
+        raise ValueError(f"grain must be one of {list(TREND_BUCKETS)}")
+    conn = get_connection()
+    try:
+        trend = pd.read_sql_query(f'''
+            SELECT
+                {TREND_BUCKETS[grain]} as date,
+                SUM(order_count) as total_orders,
+                SUM(revenue) as total_sales
+            FROM daily_counters
+            WHERE day BETWEEN ? AND ?
+            GROUP BY 1
+            ORDER BY 1
+        ''', conn, params=[date_from, date_to])
+    finally:
+        conn.close()
+    return trend
+
+@instrumented
+def get_hourly_heatmap(date_from, date_to, use_cache=False, db_path=None):
+    """Get order count and revenue per weekday and hour for a date range"""
+    import pandas as pd
+    db_path = db_path or DB_PATH
+    conn = get_connection(db_path)
+    
+    if use_cache:
+        key = make_key(db_path, 'hourly_heatmap', date_from, date_to, get_orders_version(conn), get_report_generation(conn))
+        hit, cached = get_cached(key)
+        if hit:
+            conn.close()
+            return cached.copy()
+    
+    # Range predicate on the raw column so idx_orders_date_total is used;
+    # weekday follows strftime('%w'): 0 = Sunday
+    sources = get_sources(conn, date_from, date_to)
+    frames = [
+        pd.read_sql_query(f'''
+            SELECT 
+                CAST(strftime('%w', order_date) AS INTEGER) as weekday,
+                CAST(strftime('%H', order_date) AS INTEGER) as hour,
+                COUNT(*) as order_count,
+                SUM(grand_total) as total_sales,
+                AVG(grand_total) as avg_order_value
+            FROM {orders} 
+            WHERE order_date >= ? AND order_date < DATE(?, '+1 day')
+            GROUP BY weekday, hour
+            ORDER BY weekday, hour
+        ''', source, params=[date_from, date_to])
+        for source, orders, _ in sources
+    ]
+    close_sources(sources)
+    
+    heatmap = combine_frames(
+        frames, ['weekday', 'hour'], ['order_count', 'total_sales'],
+        averages={'avg_order_value': ('total_sales', 'order_count')},
+        sort_by=['weekday', 'hour']
+    )
+    
+    if use_cache:
+        put_cached(key, heatmap.copy())
+    
+    return heatmap
+
+@instrumented
 def add_sample_menu():
     """Add sample menu items for testing"""
     sample_items = [
@@ -258,7 +1164,7 @@ def add_sample_menu():
         ("Kulfi", "Desserts", 90, 5.0),
     ]
     
-    conn = sqlite3.connect('db/restaurant.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     for name, category, price, gst_rate in sample_items:
@@ -269,3 +1175,9 @@ def add_sample_menu():
     
     conn.commit()
     conn.close()
+
+# Export metrics when RESTAURANT_METRICS_PORT or RESTAURANT_METRICS_FILE is set
+start_metrics_exporter()
+
+# Checkpoint, analyze and vacuum in the background when RESTAURANT_MAINTENANCE=1
+start_maintenance_scheduler()
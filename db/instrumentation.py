@@ -0,0 +1,195 @@
+import functools
+import heapq
+import logging
+import os
+import sqlite3
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+# Calls slower than this are written to the slow-query log
+SLOW_QUERY_MS = float(os.environ.get('RESTAURANT_SLOW_QUERY_MS', '100'))
+
+# Capture EXPLAIN QUERY PLAN for slow calls (adds work only when a call is slow)
+EXPLAIN_SLOW_QUERIES = os.environ.get('RESTAURANT_EXPLAIN_QUERIES', '1') == '1'
+
+SLOW_QUERY_LOG = os.environ.get('RESTAURANT_SLOW_QUERY_LOG', 'logs/slow_queries.log')
+
+# Upper bounds (ms) of the latency histogram buckets
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf')]
+
+# Number of slowest calls kept in memory for the diagnostics page
+SLOWEST_KEPT = 50
+
+_stats = {}
+_slowest = []
+_listeners = []
+_lock = threading.Lock()
+_active = threading.local()
+_logger = None
+
+def _get_logger():
+    """Create the rotating slow-query logger on first use"""
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger('restaurant.slow_queries')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            directory = os.path.dirname(SLOW_QUERY_LOG)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=1_000_000, backupCount=3)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+        except OSError:
+            logger.addHandler(logging.NullHandler())
+        _logger = logger
+    return _logger
+
+def trace_statement(sql):
+    """sqlite3 trace callback collecting statements run by the active call"""
+    statements = getattr(_active, 'statements', None)
+    if statements is not None:
+        statements.append(sql)
+
+def attach(conn, db_path):
+    """Register the trace callback on a connection opened inside an instrumented call"""
+    if getattr(_active, 'statements', None) is not None:
+        _active.db_path = db_path
+        conn.set_trace_callback(trace_statement)
+    return conn
+
+def count_rows(result):
+    """Count rows in a db_utils return value"""
+    if hasattr(result, 'shape'):
+        return int(result.shape[0])
+    if isinstance(result, (tuple, list)):
+        return sum(count_rows(part) for part in result) if result and hasattr(result[0], 'shape') else len(result)
+    return 1 if result is not None else 0
+
+def explain_statements(db_path, statements):
+    """Get the query plan of each statement and whether it used an index"""
+    plans = []
+    conn = sqlite3.connect(db_path)
+    try:
+        for sql in statements:
+            if not sql.lstrip().upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')):
+                continue
+            try:
+                rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+            except sqlite3.Error:
+                continue
+            details = [row[-1] for row in rows]
+            full_scan = any(detail.startswith('SCAN') and 'INDEX' not in detail for detail in details)
+            plans.append({
+                'sql': ' '.join(sql.split()),
+                'plan': details,
+                'uses_index': any('INDEX' in detail or 'PRIMARY KEY' in detail for detail in details),
+                'full_scan': full_scan,
+            })
+    finally:
+        conn.close()
+    return plans
+
+def record(name, elapsed_ms, rows, statements, db_path, error=None):
+    """Add a call to the histograms and log it if it was slow or raised"""
+    with _lock:
+        stats = _stats.setdefault(name, {
+            'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+            'buckets': [0] * len(HISTOGRAM_BUCKETS),
+        })
+        stats['calls'] += 1
+        if error is not None:
+            stats['errors'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        stats['rows'] += rows
+        for idx, bound in enumerate(HISTOGRAM_BUCKETS):
+            if elapsed_ms <= bound:
+                stats['buckets'][idx] += 1
+                break
+
+    for listener in _listeners:
+        listener(name, elapsed_ms, rows, error)
+
+    if elapsed_ms < SLOW_QUERY_MS and error is None:
+        return
+
+    plans = explain_statements(db_path, statements) if EXPLAIN_SLOW_QUERIES and statements and db_path else []
+    entry = {
+        'function': name,
+        'elapsed_ms': round(elapsed_ms, 3),
+        'rows': rows,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'statements': [' '.join(sql.split()) for sql in statements],
+        'plans': plans,
+        'error': f"{type(error).__name__}: {error}" if error is not None else None,
+    }
+    if elapsed_ms >= SLOW_QUERY_MS:
+        with _lock:
+            if len(_slowest) < SLOWEST_KEPT:
+                heapq.heappush(_slowest, (elapsed_ms, id(entry), entry))
+            else:
+                heapq.heappushpop(_slowest, (elapsed_ms, id(entry), entry))
+
+    scans = [plan['sql'][:120] for plan in plans if plan['full_scan']]
+    _get_logger().info(
+        f"{name} {elapsed_ms:.1f}ms rows={rows}"
+        + (f" full_scan={scans}" if scans else "")
+        + (f" error={entry['error']!r}" if error is not None else "")
+    )
+
+def add_listener(callback):
+    """Call callback(name, elapsed_ms, rows, error) after every instrumented call
+
+    error is the exception the call raised, or None.
+    """
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+def instrumented(func):
+    """Time a db_utils function and capture the statements it runs"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Nested instrumented calls are counted once, by the outermost call
+        if getattr(_active, 'statements', None) is not None:
+            return func(*args, **kwargs)
+
+        _active.statements = []
+        _active.db_path = None
+        started = time.perf_counter()
+        result = error = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # Failed calls are recorded too, flagged with their error
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            statements = _active.statements
+            _active.statements = None
+            record(func.__name__, elapsed_ms, count_rows(result), statements, _active.db_path, error)
+    return wrapper
+
+def get_query_stats():
+    """Get per-function call statistics and histograms"""
+    with _lock:
+        return {
+            name: dict(stats, buckets=list(stats['buckets']),
+                       avg_ms=stats['total_ms'] / stats['calls'] if stats['calls'] else 0.0)
+            for name, stats in _stats.items()
+        }
+
+def get_slowest_calls():
+    """Get the slowest recorded calls, slowest first"""
+    with _lock:
+        return [entry for _, _, entry in sorted(_slowest, key=lambda item: item[0], reverse=True)]
+
+def reset_query_stats():
+    """Clear the in-memory statistics"""
+    with _lock:
+        _stats.clear()
+        _slowest.clear()
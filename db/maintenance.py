@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Scheduled upkeep for the operational database.
+During service hours only a passive WAL checkpoint runs, and only once the WAL
+passes a size threshold; passive checkpoints never wait on readers or writers.
+Outside service hours the WAL is truncated, query planner statistics are
+refreshed with ANALYZE / PRAGMA optimize, and free pages are returned to the
+file system with incremental vacuum. Every task logs the database stats before
+and after it ran, to logs/maintenance.log and the maintenance_log table.
+
+Run it from cron (python db/maintenance.py) or in-process with RESTAURANT_MAINTENANCE=1.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from logging.handlers import RotatingFileHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Run the background scheduler in this process
+MAINTENANCE_ENABLED = os.environ.get('RESTAURANT_MAINTENANCE', '0') == '1'
+MAINTENANCE_INTERVAL_SECONDS = float(os.environ.get('RESTAURANT_MAINTENANCE_INTERVAL', '300'))
+
+# Comma-separated HH:MM-HH:MM ranges of peak billing; a range may cross midnight
+SERVICE_HOURS = os.environ.get('RESTAURANT_SERVICE_HOURS', '11:00-23:30')
+
+# A WAL larger than this is checkpointed even during service
+WAL_CHECKPOINT_BYTES = int(float(os.environ.get('RESTAURANT_WAL_CHECKPOINT_MB', '16')) * 1024 * 1024)
+
+# Planner statistics are refreshed at most this often
+OPTIMIZE_INTERVAL_HOURS = float(os.environ.get('RESTAURANT_OPTIMIZE_INTERVAL_HOURS', '12'))
+
+# Free pages are reclaimed once they make up this share of the file
+VACUUM_FREE_FRACTION = float(os.environ.get('RESTAURANT_VACUUM_FREE_FRACTION', '0.1'))
+
+MAINTENANCE_LOG = os.environ.get('RESTAURANT_MAINTENANCE_LOG', 'logs/maintenance.log')
+
+# Maintenance gives up rather than queue behind terminals for longer than this
+BUSY_TIMEOUT_SECONDS = 2
+
+_logger = None
+_started = False
+_lock = threading.Lock()
+
+def _get_logger():
+    """Create the rotating maintenance logger on first use"""
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger('restaurant.maintenance')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            directory = os.path.dirname(MAINTENANCE_LOG)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(MAINTENANCE_LOG, maxBytes=1_000_000, backupCount=3)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+        except OSError:
+            logger.addHandler(logging.NullHandler())
+        _logger = logger
+    return _logger
+
+def parse_service_hours(spec):
+    """Parse 'HH:MM-HH:MM,...' into a list of (start, end) minutes after midnight"""
+    ranges = []
+    for part in filter(None, (part.strip() for part in spec.split(','))):
+        start, end = (
+            int(clock.split(':')[0]) * 60 + int(clock.split(':')[1])
+            for clock in part.split('-')
+        )
+        ranges.append((start, end))
+    return ranges
+
+def in_service(now=None, service_hours=None):
+    """Check whether now falls inside service hours"""
+    now = now or datetime.now()
+    minute = now.hour * 60 + now.minute
+    for start, end in parse_service_hours(SERVICE_HOURS if service_hours is None else service_hours):
+        if start <= end and start <= minute < end:
+            return True
+        if start > end and (minute >= start or minute < end):
+            return True
+    return False
+
+def create_log(conn):
+    """Create the maintenance history table in the operational database"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task TEXT NOT NULL,
+            started_at TIMESTAMP NOT NULL,
+            elapsed_ms REAL NOT NULL,
+            before_json TEXT NOT NULL,
+            after_json TEXT NOT NULL,
+            detail TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_maintenance_log_task
+        ON maintenance_log (task, started_at)
+    ''')
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def db_stats(conn, db_path):
+    """Get page, free-list and file size figures for a database"""
+    return {
+        'page_size': conn.execute("PRAGMA page_size").fetchone()[0],
+        'page_count': conn.execute("PRAGMA page_count").fetchone()[0],
+        'freelist_count': conn.execute("PRAGMA freelist_count").fetchone()[0],
+        'file_bytes': _file_size(db_path),
+        'wal_bytes': _file_size(db_path + '-wal'),
+    }
+
+def last_run(conn, task):
+    """Get when a task last ran, or None"""
+    started_at = conn.execute(
+        "SELECT MAX(started_at) FROM maintenance_log WHERE task = ?", (task,)
+    ).fetchone()[0]
+    return datetime.strptime(started_at, '%Y-%m-%d %H:%M:%S') if started_at else None
+
+def last_checkpoint_wal_bytes(conn):
+    """Get the WAL file size logged after the last checkpoint, or 0"""
+    row = conn.execute(
+        "SELECT after_json FROM maintenance_log WHERE task = 'checkpoint' ORDER BY id DESC LIMIT 1"
+    ).fetchone()
+    return json.loads(row[0])['wal_bytes'] if row else 0
+
+def checkpoint(conn, mode):
+    """Checkpoint the WAL; returns (busy, wal frames, frames checkpointed)"""
+    return tuple(conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+def analyze(conn):
+    """Refresh planner statistics; a database never analyzed gets a full ANALYZE"""
+    analyzed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone()
+    if not analyzed:
+        conn.execute("ANALYZE")
+        return 'ANALYZE'
+    # Caps the rows each re-analysis reads, so large tables stay quick
+    conn.execute("PRAGMA analysis_limit = 1000")
+    conn.execute("PRAGMA optimize")
+    return 'PRAGMA optimize'
+
+def reclaim(conn):
+    """Return free pages to the file system; returns what was done"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        # execute() would step the pragma once and free a single page;
+        # executescript() runs it to completion
+        conn.executescript("PRAGMA incremental_vacuum")
+        return 'incremental_vacuum'
+    # Databases created before init_database set auto_vacuum need one full VACUUM to switch
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return 'VACUUM (auto_vacuum now incremental)'
+
+def plan_tasks(conn, db_path, now, force=False):
+    """Choose the tasks due now as (task, callable) pairs"""
+    stats = db_stats(conn, db_path)
+    wal = conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    tasks = []
+
+    if in_service(now) and not force:
+        # A passive checkpoint never shrinks the -wal file; writers reuse it from
+        # the start instead. Only a file that grew since the last checkpoint
+        # holds frames that could not be reused
+        if wal and stats['wal_bytes'] > max(WAL_CHECKPOINT_BYTES, last_checkpoint_wal_bytes(conn)):
+            tasks.append(('checkpoint', lambda: checkpoint(conn, 'PASSIVE')))
+        return tasks
+
+    optimized = last_run(conn, 'optimize')
+    if force or optimized is None or now - optimized >= timedelta(hours=OPTIMIZE_INTERVAL_HOURS):
+        tasks.append(('optimize', lambda: analyze(conn)))
+
+    if stats['page_count'] and stats['freelist_count'] / stats['page_count'] >= VACUUM_FREE_FRACTION:
+        tasks.append(('vacuum', lambda: reclaim(conn)))
+
+    # Last, so pages written by the other tasks are folded back into the file too
+    if wal and (stats['wal_bytes'] > 0 or tasks):
+        tasks.append(('checkpoint', lambda: checkpoint(conn, 'TRUNCATE')))
+
+    return tasks
+
+def run_maintenance(db_path=None, now=None, force=False):
+    """Run the maintenance tasks due now and log their before/after stats
+
+    force runs every task regardless of service hours and intervals.
+    Returns a list of dicts with task, elapsed_ms, before, after and detail.
+    """
+    from db import db_utils
+
+    db_path = db_path or db_utils.DB_PATH
+    now = now or datetime.now()
+    if not os.path.exists(db_path):
+        return []
+
+    # Autocommit, since VACUUM cannot run inside a transaction
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+    results = []
+    try:
+        create_log(conn)
+        for task, run in plan_tasks(conn, db_path, now, force):
+            before = db_stats(conn, db_path)
+            started = time.perf_counter()
+            try:
+                detail = run()
+            except sqlite3.OperationalError as e:
+                # Busy or locked: the next round tries again
+                _get_logger().info(f"{db_path} {task} skipped: {e}")
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            after = db_stats(conn, db_path)
+            result = {'task': task, 'elapsed_ms': round(elapsed_ms, 1), 'before': before, 'after': after, 'detail': str(detail)}
+            conn.execute('''
+                INSERT INTO maintenance_log (task, started_at, elapsed_ms, before_json, after_json, detail)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (task, now.strftime('%Y-%m-%d %H:%M:%S'), result['elapsed_ms'],
+                  json.dumps(before), json.dumps(after), result['detail']))
+            _get_logger().info(
+                f"{db_path} {task} {result['elapsed_ms']}ms {result['detail']} "
+                f"pages {before['page_count']}->{after['page_count']} "
+                f"free {before['freelist_count']}->{after['freelist_count']} "
+                f"wal {before['wal_bytes']}->{after['wal_bytes']}"
+            )
+            results.append(result)
+
+        # The log rows just written sit in the WAL again. Fold them back as well,
+        # or while another connection keeps the WAL open the next off-hours round
+        # would find it non-empty and checkpoint (and log) again, all night
+        if (force or not in_service(now)) and any(result['task'] == 'checkpoint' for result in results):
+            try:
+                checkpoint(conn, 'TRUNCATE')
+            except sqlite3.OperationalError:
+                pass
+    finally:
+        conn.close()
+    return results
+
+def _maintenance_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            run_maintenance()
+        except Exception as e:
+            _get_logger().info(f"maintenance round failed: {e}")
+
+def start_maintenance_scheduler(interval=None):
+    """Start the background maintenance thread once per process when enabled"""
+    global _started
+    with _lock:
+        if _started or not MAINTENANCE_ENABLED:
+            return
+        _started = True
+    threading.Thread(
+        target=_maintenance_loop, args=(interval or MAINTENANCE_INTERVAL_SECONDS,),
+        name='db-maintenance', daemon=True
+    ).start()
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkpoint, analyze and vacuum the restaurant database")
+    parser.add_argument("--db", help="Operational database (default: db/restaurant.db)")
+    parser.add_argument("--force", action="store_true", help="Run every task now, even during service hours")
+    args = parser.parse_args()
+
+    if in_service() and not args.force:
+        print(f"🍽️ Service hours ({SERVICE_HOURS}): only an oversized WAL is checkpointed")
+    results = run_maintenance(args.db, force=args.force)
+    if not results:
+        print("✅ Nothing to do")
+    for result in results:
+        before, after = result['before'], result['after']
+        print(
+            f"🧹 {result['task']}: {result['detail']} in {result['elapsed_ms']}ms "
+            f"(file {before['file_bytes'] / 1024:.0f} → {after['file_bytes'] / 1024:.0f} KB, "
+            f"free pages {before['freelist_count']} → {after['freelist_count']}, "
+            f"WAL {before['wal_bytes'] / 1024:.0f} → {after['wal_bytes'] / 1024:.0f} KB)"
+        )
+
+if __name__ == "__main__":
+    main()
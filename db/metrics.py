@@ -0,0 +1,164 @@
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from db.instrumentation import add_listener
+from db.report_cache import CACHE_SIZES, get_cache_stats
+
+# Serve Prometheus text format on this local port when set
+METRICS_PORT = os.environ.get('RESTAURANT_METRICS_PORT')
+
+# Periodically write the same text to this file when set
+METRICS_FILE = os.environ.get('RESTAURANT_METRICS_FILE')
+METRICS_FLUSH_SECONDS = float(os.environ.get('RESTAURANT_METRICS_FLUSH_SECONDS', '15'))
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# Functions whose timings count as report generation
+REPORT_FUNCTIONS = {'get_sales_summary', 'get_hourly_heatmap', 'get_orders'}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_started = False
+
+def inc_counter(name, labels=(), amount=1):
+    """Increment a counter; labels is a tuple of (key, value) pairs"""
+    key = (name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name, value, labels=()):
+    """Add an observation (seconds) to a histogram"""
+    key = (name, labels)
+    idx = bisect.bisect_left(LATENCY_BUCKETS, value)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+        histogram[0][idx] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+def _record_db_call(name, elapsed_ms, rows, error=None):
+    """Instrumentation listener turning db_utils calls into metrics"""
+    seconds = elapsed_ms / 1000
+    observe('restaurant_db_call_duration_seconds', seconds, (('function', name),))
+    if error is not None:
+        inc_counter('restaurant_db_call_errors_total', (('function', name),))
+    elif name == 'save_order':
+        inc_counter('restaurant_orders_saved_total')
+        observe('restaurant_save_order_duration_seconds', seconds)
+    elif name in REPORT_FUNCTIONS:
+        observe('restaurant_report_duration_seconds', seconds, (('report', name),))
+
+add_listener(_record_db_call)
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def render_metrics():
+    """Render every metric in Prometheus text exposition format"""
+    from db.db_utils import DB_PATH
+
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: (list(value[0]), value[1], value[2]) for key, value in _histograms.items()}
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {name} counter")
+        for (metric, labels), value in counters.items():
+            if metric == name:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), (buckets, total, count) in histograms.items():
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + ['+Inf'], buckets):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    caches = {name: get_cache_stats(name) for name in CACHE_SIZES}
+    for metric, field, kind in (
+        ('restaurant_cache_hits_total', 'hits', 'counter'),
+        ('restaurant_cache_misses_total', 'misses', 'counter'),
+        ('restaurant_cache_entries', 'size', 'gauge'),
+    ):
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, cache in caches.items():
+            lines.append(f'{metric}{{cache="{name}"}} {cache[field]}')
+
+    lines.append("# TYPE restaurant_db_file_bytes gauge")
+    lines.append(f"restaurant_db_file_bytes {_file_size(DB_PATH)}")
+    lines.append("# TYPE restaurant_db_wal_bytes gauge")
+    lines.append(f"restaurant_db_wal_bytes {_file_size(DB_PATH + '-wal')}")
+
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = render_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def _flush_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(render_metrics())
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+def start_metrics_exporter(port=None, path=None):
+    """Start the HTTP endpoint and/or file flusher once per process"""
+    global _started
+    port = port or METRICS_PORT
+    path = path or METRICS_FILE
+    with _lock:
+        if _started or not (port or path):
+            return
+        _started = True
+
+    if port:
+        try:
+            server = ThreadingHTTPServer(('127.0.0.1', int(port)), _MetricsHandler)
+            threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        except OSError:
+            # Another process (e.g. a second Streamlit worker) already serves the port
+            pass
+
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        threading.Thread(target=_flush_loop, args=(path, METRICS_FLUSH_SECONDS), name='metrics-file', daemon=True).start()
@@ -0,0 +1,170 @@
+"""
+Domain records shared by db_utils, the calculator, the pages and the API.
+They use __slots__ so rows load without building DataFrames or per-row dicts,
+and convert their fields once at construction instead of at every step.
+"""
+
+import math
+
+class Record:
+    """Base for slot-based records"""
+    __slots__ = ()
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    # Records compare by value but are mutable (carts change quantities in
+    # place), so they are deliberately unhashable
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class MenuItem(Record):
+    """A row of the menu table"""
+    __slots__ = ('id', 'name', 'category', 'price', 'gst_rate', 'available')
+
+    # Column order used when selecting menu rows
+    COLUMNS = 'id, name, category, price, gst_rate, available'
+
+    def __init__(self, id, name, category, price, gst_rate=5.0, available=True):
+        self.id = int(id)
+        self.name = str(name)
+        self.category = str(category)
+        self.price = float(price)
+        self.gst_rate = float(gst_rate)
+        self.available = available
+
+class OrderItem(Record):
+    """A line item: a cart entry, or a row of order_items (id and gst_rate unknown)"""
+    __slots__ = ('id', 'name', 'category', 'price', 'gst_rate', 'quantity')
+
+    # Column order used when selecting order_items rows
+    COLUMNS = 'item_name, category, quantity, unit_price'
+
+    def __init__(self, name, category, quantity, price, id=None, gst_rate=None):
+        if not name:
+            raise ValueError("Order item needs a name")
+        self.name = str(name)
+        self.category = str(category or '')
+        self.quantity = int(quantity)
+        self.price = float(price)
+        if self.quantity <= 0:
+            raise ValueError(f"Order item {self.name} needs a positive quantity")
+        if not math.isfinite(self.price) or self.price < 0:
+            raise ValueError(f"Order item {self.name} has an invalid price")
+        self.id = int(id) if id is not None else None
+        self.gst_rate = float(gst_rate) if gst_rate is not None else None
+
+    @classmethod
+    def from_menu_item(cls, menu_item, quantity):
+        return cls(menu_item.name, menu_item.category, quantity, menu_item.price,
+                   id=menu_item.id, gst_rate=menu_item.gst_rate)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build an item from the dict form stored in items_json and journals"""
+        return cls(data['name'], data.get('category', ''), data['quantity'], data['price'],
+                   id=data.get('id'), gst_rate=data.get('gst_rate'))
+
+    @property
+    def total_price(self):
+        return self.price * self.quantity
+
+    def to_row(self):
+        """Get the item in order_items column names"""
+        return {
+            'item_name': self.name,
+            'category': self.category,
+            'quantity': self.quantity,
+            'unit_price': self.price,
+            'total_price': self.total_price
+        }
+
+class Order(Record):
+    """An order: a row of the orders table, or a new order with its items"""
+    __slots__ = (
+        'id', 'order_number', 'service_mode', 'customer_name', 'customer_phone',
+        'table_number', 'subtotal', 'gst_amount', 'discount_amount', 'grand_total',
+        'payment_method', 'order_status', 'order_date', 'items_json', 'items'
+    )
+
+    # Column order used when selecting order rows
+    COLUMNS = (
+        'id, order_number, service_mode, customer_name, customer_phone, table_number, '
+        'subtotal, gst_amount, discount_amount, grand_total, payment_method, '
+        'order_status, order_date, items_json'
+    )
+
+    # Fields of the order dict used by JSON exports, journals and the API
+    DATA_FIELDS = (
+        'order_number', 'service_mode', 'customer_name', 'customer_phone', 'table_number',
+        'subtotal', 'gst_amount', 'discount_amount', 'grand_total', 'payment_method',
+        'order_status', 'order_date'
+    )
+
+    def __init__(self, id=None, order_number=None, service_mode=None, customer_name=None,
+                 customer_phone=None, table_number=None, subtotal=0, gst_amount=0,
+                 discount_amount=0, grand_total=0, payment_method=None,
+                 order_status='Paid', order_date=None, items_json=None, items=None):
+        if not order_number or not service_mode or not payment_method:
+            raise ValueError("Order needs an order number, service mode and payment method")
+        self.id = int(id) if id is not None else None
+        self.order_number = str(order_number)
+        self.service_mode = str(service_mode)
+        self.customer_name = customer_name
+        self.customer_phone = customer_phone
+        self.table_number = table_number
+        self.subtotal = float(subtotal)
+        self.gst_amount = float(gst_amount)
+        self.discount_amount = float(discount_amount or 0)
+        self.grand_total = float(grand_total)
+        self.payment_method = str(payment_method)
+        self.order_status = order_status
+        self.order_date = order_date
+        self.items_json = items_json
+        self.items = as_order_items(items) if items is not None else []
+
+    @classmethod
+    def from_dict(cls, data, items=None):
+        """Build an order from an order dict, ignoring unknown keys"""
+        fields = {name: data[name] for name in cls.__slots__ if name in data and name != 'items'}
+        return cls(**fields, items=items)
+
+    def to_data(self):
+        """Get the order fields as the plain order dict"""
+        return {name: getattr(self, name) for name in self.DATA_FIELDS}
+
+    def to_dict(self):
+        data = super().to_dict()
+        data['items'] = [item.to_row() for item in self.items]
+        return data
+
+class Customer(Record):
+    """A row of the customers directory, keyed by normalized phone number"""
+    __slots__ = ('phone', 'name', 'visit_count', 'lifetime_spend', 'first_visit', 'last_visit')
+
+    # Column order used when selecting customer rows
+    COLUMNS = 'phone, name, visit_count, lifetime_spend, first_visit, last_visit'
+
+    def __init__(self, phone, name='', visit_count=0, lifetime_spend=0, first_visit=None, last_visit=None):
+        self.phone = str(phone)
+        self.name = str(name or '')
+        self.visit_count = int(visit_count)
+        self.lifetime_spend = float(lifetime_spend)
+        self.first_visit = first_visit
+        self.last_visit = last_visit
+
+def as_order(order):
+    """Accept an Order or an order dict (from JSON, journals or the API)"""
+    return order if isinstance(order, Order) else Order.from_dict(order)
+
+def as_order_items(items):
+    """Accept OrderItems or item dicts (from JSON, journals or the API)"""
+    return [item if isinstance(item, OrderItem) else OrderItem.from_dict(item) for item in items]
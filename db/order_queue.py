@@ -0,0 +1,144 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from db import db_utils
+from db.instrumentation import record
+from db.models import as_order, as_order_items
+
+# Commit a batch once it has this many orders...
+BATCH_SIZE = int(os.environ.get('RESTAURANT_ORDER_BATCH_SIZE', '50'))
+
+# ...or once the oldest queued order has waited this long
+BATCH_WAIT_MS = float(os.environ.get('RESTAURANT_ORDER_BATCH_WAIT_MS', '5'))
+
+# Orders waiting beyond this make submit_order block (backpressure)
+QUEUE_LIMIT = int(os.environ.get('RESTAURANT_ORDER_QUEUE_LIMIT', '1000'))
+
+class OrderQueueFull(Exception):
+    """Raised when the writer cannot keep up and the queue stays full"""
+
+class PendingOrder:
+    """An order waiting for the writer; wait() returns its id once committed"""
+
+    def __init__(self, order_data, order_items):
+        # Converted here so a malformed order fails in the caller, not in the writer's batch
+        self.order_data = as_order(order_data)
+        self.order_items = as_order_items(order_items)
+        self.order_id = None
+        self.error = None
+        self.submitted = time.perf_counter()
+        self._done = threading.Event()
+
+    def set_result(self, order_id=None, error=None):
+        self.order_id = order_id
+        self.error = error
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Block until the order is durably committed and return its id"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Order {self.order_data.order_number} was not committed in time")
+        if self.error is not None:
+            raise self.error
+        return self.order_id
+
+class OrderWriter:
+    """Single background thread that group-commits queued orders"""
+
+    def __init__(self, db_path, batch_size=BATCH_SIZE, batch_wait_ms=BATCH_WAIT_MS, queue_limit=QUEUE_LIMIT):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self._queue = queue.Queue(maxsize=queue_limit)
+        self._thread = threading.Thread(target=self._run, name='order-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, order_data, order_items, timeout=5.0):
+        """Queue an order, blocking up to timeout seconds if the queue is full"""
+        pending = PendingOrder(order_data, order_items)
+        try:
+            self._queue.put(pending, timeout=timeout)
+        except queue.Full:
+            raise OrderQueueFull(f"{self._queue.qsize()} orders are waiting to be saved")
+        return pending
+
+    def pending(self):
+        """Number of orders waiting to be committed"""
+        return self._queue.qsize()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def _collect_batch(self):
+        """Wait for one order, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = None
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            results = []
+            try:
+                # Reconnect lazily so an unreachable database fails batches instead of the thread
+                if conn is None:
+                    conn = self._connect()
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                for pending in batch:
+                    # A savepoint per order so one bad order does not fail the batch
+                    cursor.execute("SAVEPOINT order_insert")
+                    try:
+                        order_id = db_utils.insert_order(cursor, pending.order_data, pending.order_items)
+                        cursor.execute("RELEASE order_insert")
+                        results.append((pending, order_id, None))
+                    except sqlite3.Error as e:
+                        cursor.execute("ROLLBACK TO order_insert")
+                        cursor.execute("RELEASE order_insert")
+                        results.append((pending, None, e))
+                conn.commit()
+            except Exception as e:
+                if conn is not None:
+                    try:
+                        conn.rollback()
+                    except sqlite3.Error:
+                        conn.close()
+                        conn = None
+                for pending in batch:
+                    pending.set_result(error=e)
+                continue
+
+            record('order_batch_commit', (time.perf_counter() - started) * 1000, len(batch), [], None)
+            for pending, order_id, error in results:
+                pending.set_result(order_id, error)
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_order_writer():
+    """Get the writer for the current database, starting it on first use"""
+    with _writers_lock:
+        writer = _writers.get(db_utils.DB_PATH)
+        if writer is None:
+            writer = _writers[db_utils.DB_PATH] = OrderWriter(db_utils.DB_PATH)
+        return writer
+
+def submit_order(order_data, order_items, timeout=10.0):
+    """Queue an order for the batching writer and wait for its durable commit"""
+    started = time.perf_counter()
+    order_id = get_order_writer().submit(order_data, order_items, timeout=timeout).wait(timeout)
+    record('save_order', (time.perf_counter() - started) * 1000, 1, [], None)
+    return order_id
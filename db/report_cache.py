@@ -0,0 +1,64 @@
+from collections import OrderedDict
+from datetime import datetime
+import threading
+
+# Maximum number of report results kept in memory
+REPORT_CACHE_SIZE = 64
+
+# Chart figures are kept apart, so their JSON never evicts report results
+FIGURE_CACHE_SIZE = 32
+
+# Entries each named cache keeps before evicting the least recently used
+CACHE_SIZES = {'report': REPORT_CACHE_SIZE, 'figure': FIGURE_CACHE_SIZE}
+
+_caches = {name: OrderedDict() for name in CACHE_SIZES}
+_lock = threading.Lock()
+_stats = {name: {'hits': 0, 'misses': 0} for name in CACHE_SIZES}
+
+def is_live_range(date_to):
+    """Check if a date range can still receive new orders"""
+    # order_date defaults to CURRENT_TIMESTAMP (UTC), so use the earlier of the
+    # local and UTC dates to decide whether the range has closed
+    today = min(datetime.now().strftime('%Y-%m-%d'), datetime.utcnow().strftime('%Y-%m-%d'))
+    return date_to is None or str(date_to) >= today
+
+def make_key(db_path, report_type, date_from, date_to, data_version, generation=0):
+    """Build a cache key; closed ranges ignore the data version
+
+    generation is the database's persisted report generation, bumped whenever
+    past orders change, so every process drops its closed-range entries.
+    """
+    if not is_live_range(date_to):
+        data_version = None
+    return (db_path, report_type, str(date_from), str(date_to), data_version, generation)
+
+def get_cached(key, cache='report'):
+    """Return (True, value) on a cache hit, (False, None) otherwise"""
+    entries = _caches[cache]
+    with _lock:
+        if key in entries:
+            entries.move_to_end(key)
+            _stats[cache]['hits'] += 1
+            return True, entries[key]
+        _stats[cache]['misses'] += 1
+    return False, None
+
+def put_cached(key, value, cache='report'):
+    """Store a result, evicting the least recently used entries"""
+    entries = _caches[cache]
+    with _lock:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > CACHE_SIZES[cache]:
+            entries.popitem(last=False)
+
+def clear_report_cache():
+    """Drop every cached report and figure"""
+    with _lock:
+        for entries in _caches.values():
+            entries.clear()
+
+def get_cache_stats(cache='report'):
+    """Get hit/miss counters and the current number of entries of one cache"""
+    with _lock:
+        return dict(_stats[cache], size=len(_caches[cache]))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Offline-first terminal journal.
+Orders that cannot reach the central database are appended to a local SQLite
+journal and later synced to the central store in resumable batches, using the
+order number as the idempotency key.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import db_utils
+from db.models import as_order, as_order_items
+from db.order_queue import submit_order, OrderQueueFull
+
+# Local journal file for this terminal (and outlet, when one is configured)
+JOURNAL_PATH = os.environ.get(
+    'RESTAURANT_JOURNAL_PATH',
+    os.path.join('db', f"journal_{db_utils.OUTLET_ID + '_' if db_utils.OUTLET_ID else ''}{socket.gethostname()}.db")
+)
+
+SYNC_BATCH_SIZE = 500
+
+SUMMARY_KEYS = {'synced': 'synced', 'duplicate': 'duplicates', 'conflict': 'conflicts'}
+
+def get_journal_connection(journal_path=None):
+    """Open the journal, creating its tables on first use"""
+    conn = sqlite3.connect(journal_path or JOURNAL_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS journal (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_number TEXT UNIQUE NOT NULL,
+            order_json TEXT NOT NULL,
+            items_json TEXT NOT NULL,
+            recorded_at TEXT NOT NULL,
+            sync_status TEXT NOT NULL DEFAULT 'pending',
+            synced_at TEXT
+        )
+    ''')
+    # Only unsynced rows are ever scanned by sync
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_journal_pending
+        ON journal (seq) WHERE sync_status = 'pending'
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_conflicts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_number TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            detected_at TEXT NOT NULL
+        )
+    ''')
+    return conn
+
+def journal_order(order_data, order_items, journal_path=None):
+    """Append an order to the local journal"""
+    order = as_order(order_data)
+    conn = get_journal_connection(journal_path)
+    try:
+        conn.execute('''
+            INSERT INTO journal (order_number, order_json, items_json, recorded_at)
+            VALUES (?, ?, ?, ?)
+        ''', (
+            order.order_number, json.dumps(order.to_data()),
+            json.dumps([item.to_dict() for item in as_order_items(order_items)]),
+            # Same convention as orders.order_date (CURRENT_TIMESTAMP is UTC)
+            datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        ))
+        conn.commit()
+    finally:
+        conn.close()
+
+def count_pending(journal_path=None):
+    """Number of journaled orders not yet synced"""
+    if not os.path.exists(journal_path or JOURNAL_PATH):
+        return 0
+    conn = get_journal_connection(journal_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM journal WHERE sync_status = 'pending'").fetchone()[0]
+    finally:
+        conn.close()
+
+def save_order_offline_first(order_data, order_items):
+    """Save to the central database, falling back to the local journal
+
+    Returns (order_id, journaled); order_id is None when the order was journaled.
+    """
+    try:
+        order_id = submit_order(order_data, order_items)
+    except sqlite3.IntegrityError:
+        # The database answered; the order itself is invalid
+        raise
+    except (sqlite3.OperationalError, sqlite3.DatabaseError, OSError, TimeoutError, OrderQueueFull):
+        journal_order(order_data, order_items)
+        return None, True
+
+    # The central database is reachable again, so push any backlog
+    if count_pending():
+        try:
+            sync_journal()
+        except (sqlite3.Error, OSError):
+            pass
+
+    return order_id, False
+
+def _same_order(existing, order_data):
+    """Check whether a central order matches a journaled one"""
+    return (
+        round(existing[0], 2) == round(float(order_data['grand_total']), 2)
+        and existing[1] == order_data['payment_method']
+    )
+
+def sync_journal(journal_path=None, central_path=None, batch_size=SYNC_BATCH_SIZE):
+    """Upload pending journal entries to the central database in batches
+
+    Each batch is one central transaction. Orders already present with the same
+    totals are treated as synced, so an interrupted sync can simply be re-run.
+    Returns counts of synced, duplicate and conflicting orders and those remaining.
+    """
+    central_path = central_path or db_utils.DB_PATH
+    journal = get_journal_connection(journal_path)
+    central = sqlite3.connect(central_path, timeout=30)
+    summary = {'synced': 0, 'duplicates': 0, 'conflicts': 0, 'remaining': 0}
+    last_seq = 0
+
+    try:
+        while True:
+            rows = journal.execute('''
+                SELECT seq, order_number, order_json, items_json, recorded_at
+                FROM journal WHERE sync_status = 'pending' AND seq > ?
+                ORDER BY seq LIMIT ?
+            ''', (last_seq, batch_size)).fetchall()
+            if not rows:
+                break
+            last_seq = rows[-1][0]
+
+            outcomes = []
+            cursor = central.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                for seq, order_number, order_json, items_json, recorded_at in rows:
+                    order_data = json.loads(order_json)
+                    existing = cursor.execute(
+                        "SELECT grand_total, payment_method FROM orders WHERE order_number = ?",
+                        (order_number,)
+                    ).fetchone()
+                    if existing is None:
+                        db_utils.insert_order(cursor, order_data, json.loads(items_json), order_date=recorded_at)
+                        outcomes.append((seq, order_number, 'synced', None))
+                    elif _same_order(existing, order_data):
+                        outcomes.append((seq, order_number, 'duplicate', None))
+                    else:
+                        outcomes.append((
+                            seq, order_number, 'conflict',
+                            f"central order has total {existing[0]:.2f} via {existing[1]}, "
+                            f"journal has {float(order_data['grand_total']):.2f} via {order_data['payment_method']}"
+                        ))
+                # Synced orders keep their past order dates, which cached closed-range
+                # reports in every process would otherwise miss
+                if any(status == 'synced' for _, _, status, _ in outcomes):
+                    db_utils.bump_report_generation(cursor)
+                central.commit()
+            except Exception:
+                central.rollback()
+                raise
+
+            # Mark progress only after the central commit; a crash in between is
+            # resolved on the next run by the duplicate check above
+            now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+            journal.executemany(
+                "UPDATE journal SET sync_status = ?, synced_at = ? WHERE seq = ?",
+                [('conflict' if status == 'conflict' else 'synced', now, seq) for seq, _, status, _ in outcomes]
+            )
+            journal.executemany(
+                "INSERT INTO sync_conflicts (order_number, reason, detected_at) VALUES (?, ?, ?)",
+                [(order_number, reason, now) for _, order_number, status, reason in outcomes if status == 'conflict']
+            )
+            journal.commit()
+
+            for _, _, status, _ in outcomes:
+                summary[SUMMARY_KEYS[status]] += 1
+
+        summary['remaining'] = journal.execute(
+            "SELECT COUNT(*) FROM journal WHERE sync_status = 'pending'"
+        ).fetchone()[0]
+    finally:
+        central.close()
+        journal.close()
+
+    return summary
+
+def get_sync_conflicts(journal_path=None):
+    """List conflicts recorded during sync"""
+    conn = get_journal_connection(journal_path)
+    try:
+        return conn.execute(
+            "SELECT order_number, reason, detected_at FROM sync_conflicts ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync this terminal's offline order journal")
+    parser.add_argument("command", choices=['sync', 'status', 'conflicts'])
+    parser.add_argument("--journal", default=JOURNAL_PATH, help="Local journal file")
+    parser.add_argument("--central", default=db_utils.DB_PATH, help="Central database file")
+    args = parser.parse_args()
+
+    if args.command == 'sync':
+        summary = sync_journal(args.journal, args.central)
+        print(f"✅ Synced {summary['synced']}, duplicates {summary['duplicates']}, "
+              f"conflicts {summary['conflicts']}, remaining {summary['remaining']}")
+    elif args.command == 'status':
+        print(f"📦 {count_pending(args.journal)} orders waiting to sync in {args.journal}")
+    else:
+        for order_number, reason, detected_at in get_sync_conflicts(args.journal):
+            print(f"⚠️  {detected_at} {order_number}: {reason}")
+
+if __name__ == "__main__":
+    main()
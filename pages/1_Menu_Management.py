@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
 from db.db_utils import get_menu_items, add_menu_item, update_menu_item, delete_menu_item
+from utils.profiler import start_page_profile, profile_mark, finish_page_profile
 
 st.set_page_config(page_title="Menu Management", page_icon="📋", layout="wide")
+start_page_profile("Menu Management")
 
 # Custom CSS
 st.markdown("""
@@ -43,6 +45,8 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
+    profile_mark("Sidebar")
+    
     # Sidebar for adding new items
     with st.sidebar:
         st.markdown("### Add New Menu Item")
@@ -69,6 +73,8 @@ def main():
                 else:
                     st.error("Please provide valid item name and price")
     
+    profile_mark("Main menu display")
+    
     # Main menu display
     try:
         menu_df = get_menu_items()
@@ -123,6 +129,8 @@ def main():
                             st.session_state.confirm_delete = item['id']
                             st.warning("Click delete again to confirm")
         
+        profile_mark("Edit item modal")
+        
         # Edit item modal
         if 'edit_item_id' in st.session_state:
             item_to_edit = menu_df[menu_df['id'] == st.session_state.edit_item_id].iloc[0]
@@ -163,6 +171,8 @@ def main():
                         st.session_state.pop('edit_item_id', None)
                         st.rerun()
         
+        profile_mark("Menu summary")
+        
         # Menu summary
         st.markdown("### Menu Summary")
         col1, col2, col3, col4 = st.columns(4)
@@ -181,6 +191,8 @@ def main():
             avg_price = menu_df['price'].mean()
             st.metric("Average Price", f"₹{avg_price:.2f}")
         
+        profile_mark("Export menu")
+        
         # Export menu
         st.markdown("### Export Menu")
         col1, col2 = st.columns(2)
@@ -209,4 +221,7 @@ def main():
         st.error(f"Error loading menu: {str(e)}")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        finish_page_profile()
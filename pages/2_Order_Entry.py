@@ -1,11 +1,24 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 import json
-from db.db_utils import get_menu_items, save_order, generate_order_number
+import sqlite3
+from db.db_utils import (
+    list_menu_items, generate_order_number, save_order, TabChanged,
+    add_tab_item, get_tab, list_open_tabs, get_customer, search_customers
+)
+from db.models import Order, OrderItem
+from db.terminal_journal import save_order_offline_first
 from utils.calculator import calculate_order_total, validate_order, generate_bill_text
+from utils.profiler import start_page_profile, profile_mark, finish_page_profile
 
 st.set_page_config(page_title="Order Entry", page_icon="🛒", layout="wide")
+start_page_profile("Order Entry")
+
+# Customer lookup starts once this many characters are typed
+CUSTOMER_SEARCH_MIN_CHARS = 3
+
+# Errors meaning the main database (and the shared tabs in it) cannot be reached
+DB_UNAVAILABLE = (sqlite3.OperationalError, sqlite3.DatabaseError)
 
 # Custom CSS
 st.markdown("""
@@ -53,6 +66,12 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def pick_customer(matches):
+    """Fill the customer fields from the regular picked in the lookup"""
+    customer = matches.get(st.session_state.customer_match)
+    if customer:
+        st.session_state.customer_info.update(name=customer.name, phone=customer.phone)
+
 def main():
     st.markdown("""
     <div class="main-header">
@@ -77,44 +96,90 @@ def main():
     # Display current service mode
     st.success(f"Current Service Mode: **{st.session_state.service_mode}**")
     
+    profile_mark("Open tab")
+    
+    # A dine-in table's order lives in a shared tab, so it survives a refresh
+    # and any terminal can add to it; otherwise the cart stays in this session.
+    # When the main database is unreachable the table is billed from a local
+    # cart, which is journaled like any other offline order
+    tab_table = ''
+    tab_version = None
+    tabs_available = True
+    if st.session_state.service_mode == "Dine-In":
+        try:
+            open_tabs = list_open_tabs()
+        except DB_UNAVAILABLE:
+            open_tabs, tabs_available = [], False
+        if open_tabs:
+            st.caption("Open tables: " + ", ".join(
+                f"{tab['table_number']} (₹{tab['subtotal']:.2f})" for tab in open_tabs
+            ))
+        tab_table = st.text_input(
+            "Table Number", 
+            value=st.session_state.customer_info.get('table', ''),
+            placeholder="Enter table number to open or continue its tab"
+        ).strip()
+        st.session_state.customer_info['table'] = tab_table
+    
+    if tab_table and tabs_available:
+        try:
+            # Items picked before the table was entered move onto its tab,
+            # one at a time so a failure leaves none on both
+            while st.session_state.current_order:
+                add_tab_item(tab_table, st.session_state.current_order[0])
+                st.session_state.current_order.pop(0)
+            cart, tab_version = get_tab(tab_table)
+        except DB_UNAVAILABLE:
+            tabs_available = False
+    
+    use_tab = bool(tab_table) and tabs_available
+    if not use_tab:
+        cart = st.session_state.current_order
+    if not tabs_available:
+        st.warning("Shared table tabs are unavailable. This order is kept on this terminal and will be saved offline if needed.")
+    
     col1, col2 = st.columns([2, 1])
     
+    profile_mark("Menu items")
+    
     # Left column - Menu items
     with col1:
         st.markdown("### 📋 Menu Items")
         
         try:
-            menu_df = get_menu_items()
+            # Plain records: this page never needs a DataFrame
+            menu_items = list_menu_items()
             
-            if menu_df is None or len(menu_df) == 0:
+            if not menu_items:
                 st.warning("No menu items available. Please add items in Menu Management.")
                 return
             
             # Category filter
-            categories = ['All'] + sorted(menu_df['category'].unique().tolist())
+            categories = ['All'] + sorted({item.category for item in menu_items})
             selected_category = st.selectbox("Filter by Category", categories)
             
             # Filter menu items
             if selected_category != 'All':
-                filtered_menu = menu_df[menu_df['category'] == selected_category].copy()
+                filtered_menu = [item for item in menu_items if item.category == selected_category]
             else:
-                filtered_menu = menu_df.copy()
+                filtered_menu = menu_items
             
             # Search functionality
             search_term = st.text_input("🔍 Search items", placeholder="Type to search...")
             if search_term:
-                filtered_menu = filtered_menu[
-                    filtered_menu['name'].astype(str).str.contains(search_term, case=False, na=False)
-                ]
+                search_lower = search_term.lower()
+                filtered_menu = [item for item in filtered_menu if search_lower in str(item.name).lower()]
+            
+            profile_mark("Display menu items")
             
             # Display menu items
             if len(filtered_menu) > 0:
-                for _, item in filtered_menu.iterrows():
+                for item in filtered_menu:
                     st.markdown(f"""
                     <div class="menu-item">
-                        <h4>{item['name']}</h4>
-                        <p><strong>Category:</strong> {item['category']}</p>
-                        <p><strong>Price:</strong> ₹{item['price']:.2f} (+ GST {item['gst_rate']:.1f}%)</p>
+                        <h4>{item.name}</h4>
+                        <p><strong>Category:</strong> {item.category}</p>
+                        <p><strong>Price:</strong> ₹{item.price:.2f} (+ GST {item.gst_rate:.1f}%)</p>
                     </div>
                     """, unsafe_allow_html=True)
                     
@@ -126,33 +191,29 @@ def main():
                             min_value=0, 
                             max_value=50, 
                             value=0, 
-                            key=f"qty_{item['id']}"
+                            key=f"qty_{item.id}"
                         )
                     
                     with col_b:
-                        if st.button(f"➕ Add to Order", key=f"add_{item['id']}"):
+                        if st.button(f"➕ Add to Order", key=f"add_{item.id}"):
                             if quantity > 0:
+                                if use_tab:
+                                    add_tab_item(tab_table, OrderItem.from_menu_item(item, quantity))
+                                    st.rerun()
+                                
                                 # Check if item already exists in order
                                 existing_item_index = None
                                 for idx, order_item in enumerate(st.session_state.current_order):
-                                    if int(order_item['id']) == int(item['id']):
+                                    if order_item.id == item.id:
                                         existing_item_index = idx
                                         break
                                 
                                 if existing_item_index is not None:
-                                    st.session_state.current_order[existing_item_index]['quantity'] += quantity
-                                    st.success(f"Updated {item['name']} quantity to {st.session_state.current_order[existing_item_index]['quantity']}")
+                                    st.session_state.current_order[existing_item_index].quantity += quantity
+                                    st.success(f"Updated {item.name} quantity to {st.session_state.current_order[existing_item_index].quantity}")
                                 else:
-                                    new_item = {
-                                        'id': int(item['id']),
-                                        'name': str(item['name']),
-                                        'category': str(item['category']),
-                                        'price': float(item['price']),
-                                        'gst_rate': float(item['gst_rate']),
-                                        'quantity': int(quantity)
-                                    }
-                                    st.session_state.current_order.append(new_item)
-                                    st.success(f"Added {quantity} x {item['name']} to order")
+                                    st.session_state.current_order.append(OrderItem.from_menu_item(item, quantity))
+                                    st.success(f"Added {quantity} x {item.name} to order")
                                 
                                 st.rerun()
                             else:
@@ -161,23 +222,24 @@ def main():
         except Exception as e:
             st.error(f"Error loading menu: {str(e)}")
     
+    profile_mark("Current order")
+    
     # Right column - Current order
     with col2:
         st.markdown("### 🛒 Current Order")
         
-        if st.session_state.current_order and len(st.session_state.current_order) > 0:
+        if cart:
+            if use_tab:
+                st.caption(f"Tab for table {tab_table}")
+            
             # Display order items
-            for idx, item in enumerate(st.session_state.current_order):
+            for idx, item in enumerate(cart):
                 try:
-                    item_name = str(item.get('name', 'Unknown Item'))
-                    item_quantity = int(item.get('quantity', 0))
-                    item_price = float(item.get('price', 0))
-                    
                     st.markdown(f"""
                     <div class="cart-item">
-                        <h5>{item_name}</h5>
-                        <p>Qty: {item_quantity} x ₹{item_price:.2f}</p>
-                        <p><strong>Total: ₹{item_price * item_quantity:.2f}</strong></p>
+                        <h5>{item.name}</h5>
+                        <p>Qty: {item.quantity} x ₹{item.price:.2f}</p>
+                        <p><strong>Total: ₹{item.total_price:.2f}</strong></p>
                     </div>
                     """, unsafe_allow_html=True)
                     
@@ -185,7 +247,10 @@ def main():
                     
                     with col_x:
                         if st.button("🗑️", key=f"remove_{idx}", help="Remove item"):
-                            st.session_state.current_order.pop(idx)
+                            if use_tab:
+                                add_tab_item(tab_table, item, -item.quantity)
+                            else:
+                                st.session_state.current_order.pop(idx)
                             st.rerun()
                     
                     with col_y:
@@ -193,32 +258,62 @@ def main():
                             "Qty", 
                             min_value=1, 
                             max_value=50, 
-                            value=item_quantity, 
-                            key=f"update_qty_{idx}"
+                            value=item.quantity, 
+                            key=f"update_qty_{idx}_{item.id}_{item.quantity}"
                         )
-                        if new_qty != item_quantity:
-                            st.session_state.current_order[idx]['quantity'] = new_qty
+                        if new_qty != item.quantity:
+                            if use_tab:
+                                add_tab_item(tab_table, item, new_qty - item.quantity)
+                            else:
+                                item.quantity = int(new_qty)
                             st.rerun()
                             
                 except Exception as e:
                     st.error(f"Error displaying cart item {idx}: {str(e)}")
             
+            profile_mark("Order calculations")
+            
             # Order calculations
-            calculations = calculate_order_total(st.session_state.current_order)
+            calculations = calculate_order_total(cart)
             
             st.markdown(f"""
             <div class="order-summary">
                 <h4>Order Summary</h4>
-                <p>Items: {len(st.session_state.current_order)}</p>
+                <p>Items: {len(cart)}</p>
                 <p>Subtotal: ₹{calculations['subtotal']:.2f}</p>
                 <p>GST (5%): ₹{calculations['gst_amount']:.2f}</p>
                 <p><strong>Grand Total: ₹{calculations['grand_total']:.2f}</strong></p>
             </div>
             """, unsafe_allow_html=True)
             
+            profile_mark("Customer information")
+            
             # Customer information
             st.markdown("### 👤 Customer Information")
             
+            lookup = st.text_input(
+                "🔍 Find Regular",
+                key="customer_lookup",
+                placeholder="Type 3+ digits of the phone number or letters of the name"
+            ).strip()
+            if len(lookup) >= CUSTOMER_SEARCH_MIN_CHARS:
+                try:
+                    matches = {customer.phone: customer for customer in search_customers(lookup)}
+                except DB_UNAVAILABLE:
+                    matches = {}
+                if matches:
+                    st.selectbox(
+                        "Matching customers",
+                        [''] + list(matches),
+                        key="customer_match",
+                        format_func=lambda phone: "Select a customer" if not phone else
+                            f"{matches[phone].name or 'Unnamed'} · {phone} · {matches[phone].visit_count} visits",
+                        on_change=pick_customer,
+                        args=(matches,)
+                    )
+                else:
+                    st.caption("No regular found")
+            
             customer_name = st.text_input(
                 "Customer Name", 
                 value=st.session_state.customer_info.get('name', ''),
@@ -231,20 +326,21 @@ def main():
                 placeholder="Enter phone number"
             )
             
-            # Table number for dine-in
-            table_number = ""
-            if st.session_state.service_mode == "Dine-In":
-                table_number = st.text_input(
-                    "Table Number", 
-                    value=st.session_state.customer_info.get('table', ''),
-                    placeholder="Enter table number"
+            try:
+                regular = get_customer(customer_phone) if customer_phone.strip() else None
+            except DB_UNAVAILABLE:
+                regular = None
+            if regular:
+                st.caption(
+                    f"⭐ Regular: {regular.visit_count} visits · ₹{regular.lifetime_spend:.2f} spent · "
+                    f"last visit {str(regular.last_visit)[:10]}"
                 )
             
             # Discount
             discount_percent = st.slider("Discount (%)", 0, 50, 0)
             
             if discount_percent > 0:
-                calculations = calculate_order_total(st.session_state.current_order, discount_percent)
+                calculations = calculate_order_total(cart, discount_percent)
                 st.info(f"Discount applied: ₹{calculations['discount_amount']:.2f}")
                 st.info(f"New Total: ₹{calculations['grand_total']:.2f}")
             
@@ -260,10 +356,12 @@ def main():
                 ["Cash", "Card", "UPI", "Net Banking"]
             )
             
+            profile_mark("Process order")
+            
             # Process order
             if st.button("🧾 Generate Bill", use_container_width=True, type="primary"):
                 # Validate order
-                is_valid, message = validate_order(st.session_state.current_order)
+                is_valid, message = validate_order(cart)
                 
                 if not is_valid:
                     st.error(message)
@@ -274,36 +372,46 @@ def main():
                     order_number = generate_order_number()
                     order_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                     
-                    order_data = {
-                        'order_number': order_number,
-                        'service_mode': st.session_state.service_mode,
-                        'customer_name': customer_name,
-                        'customer_phone': customer_phone,
-                        'table_number': table_number,
-                        'subtotal': calculations['subtotal'],
-                        'gst_amount': calculations['gst_amount'],
-                        'discount_amount': calculations['discount_amount'],
-                        'grand_total': calculations['grand_total'],
-                        'payment_method': payment_method,
-                        'order_status': 'Completed',
-                        'order_date': order_date
-                    }
+                    order = Order(
+                        order_number=order_number,
+                        service_mode=st.session_state.service_mode,
+                        customer_name=customer_name,
+                        customer_phone=customer_phone,
+                        table_number=tab_table,
+                        subtotal=calculations['subtotal'],
+                        gst_amount=calculations['gst_amount'],
+                        discount_amount=calculations['discount_amount'],
+                        grand_total=calculations['grand_total'],
+                        payment_method=payment_method,
+                        order_status='Placed',
+                        order_date=order_date
+                    )
                     
-                    # Save to database
-                    order_id = save_order(order_data, st.session_state.current_order)
+                    # Save to database; a tab is billed and closed in the same transaction
+                    if use_tab:
+                        try:
+                            order_id, journaled = save_order(order, cart, tab_version=tab_version), False
+                        except TabChanged:
+                            st.warning(f"Table {tab_table} was updated on another terminal. Please review the order and generate the bill again.")
+                            return
+                    else:
+                        order_id, journaled = save_order_offline_first(order, cart)
                     
                     # Update customer info in session
                     st.session_state.customer_info = {
                         'name': customer_name,
                         'phone': customer_phone,
-                        'table': table_number
+                        'table': tab_table
                     }
                     
                     # Generate bill text
-                    bill_text = generate_bill_text(order_data, st.session_state.current_order, calculations)
+                    bill_text = generate_bill_text(order, cart, calculations)
                     
                     # Display success and bill
-                    st.success(f"Order {order_number} completed successfully!")
+                    if journaled:
+                        st.warning(f"Order {order_number} saved offline on this terminal. It will sync when the main database is reachable.")
+                    else:
+                        st.success(f"Order {order_number} completed successfully!")
                     
                     # Show bill
                     st.markdown("### 🧾 Generated Bill")
@@ -319,8 +427,8 @@ def main():
                     
                     # Export as JSON
                     order_json = {
-                        'order_data': order_data,
-                        'order_items': st.session_state.current_order,
+                        'order_data': order.to_data(),
+                        'order_items': [item.to_dict() for item in cart],
                         'calculations': calculations
                     }
                     
@@ -348,4 +456,7 @@ def main():
                 st.switch_page("app.py")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        finish_page_profile()
@@ -2,10 +2,20 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import json
-from db.db_utils import get_orders
+import os
+from db.db_utils import (
+    get_orders, get_new_orders, get_orders_high_water, get_order_events, get_last_event_id,
+    set_order_status, ORDER_STATUSES
+)
+from db.change_feed import has_changed
 from utils.calculator import generate_bill_text
+from utils.profiler import start_page_profile, profile_mark, finish_page_profile
 
 st.set_page_config(page_title="Bills History", page_icon="📄", layout="wide")
+start_page_profile("Bills History")
+
+# How often live updates check for new orders (seconds); a check reads no table
+LIVE_REFRESH_SECONDS = float(os.environ.get('RESTAURANT_LIVE_REFRESH', '5'))
 
 # Custom CSS
 st.markdown("""
@@ -38,6 +48,50 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def load_bills(date_from, date_to):
+    """Get the range's orders, reading only orders and status changes new since the last run"""
+    state = st.session_state
+    cached = state.get('bills_cache')
+    
+    if cached is None or cached['range'] != (date_from, date_to):
+        # Marks are taken before the full read so nothing saved meanwhile is missed
+        has_changed(state, 'bills')
+        cached = state.bills_cache = {
+            'range': (date_from, date_to),
+            'high_water': get_orders_high_water(),
+            'event_id': get_last_event_id(),
+        }
+        cached['orders'] = get_orders(date_from=date_from, date_to=date_to)
+        return cached['orders']
+    
+    if not has_changed(state, 'bills'):
+        return cached['orders']
+    
+    orders_df = cached['orders']
+    new_orders, cached['high_water'] = get_new_orders(cached['high_water'], date_from, date_to)
+    if orders_df.empty:
+        orders_df = new_orders
+    elif not new_orders.empty:
+        orders_df = pd.concat([new_orders, orders_df], ignore_index=True).sort_values(
+            'order_date', ascending=False, kind='stable'
+        ).reset_index(drop=True)
+    
+    events = get_order_events(cached['event_id'])
+    while events:
+        for event in events:
+            orders_df.loc[orders_df['id'] == event['order_id'], 'order_status'] = event['status']
+            cached['event_id'] = event['id']
+        events = get_order_events(cached['event_id'])
+    
+    cached['orders'] = orders_df
+    return orders_df
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def watch_bills():
+    """Rerun the page when orders change; the check itself reads no table"""
+    if has_changed(st.session_state, 'bills', remember=False):
+        st.rerun()
+
 def main():
     st.markdown("""
     <div class="main-header">
@@ -46,6 +100,8 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
+    profile_mark("Date range selector")
+    
     # Date range selector
     col1, col2, col3 = st.columns(3)
     
@@ -64,6 +120,7 @@ def main():
     with col3:
         if st.button("📊 Load Bills", type="primary"):
             st.session_state.load_bills = True
+        live_updates = st.checkbox("🔴 Live updates", help="Show new bills as they are saved")
     
     # Quick date filters
     st.markdown("**Quick Filters:**")
@@ -98,6 +155,8 @@ def main():
             st.session_state.date_to = today
             st.session_state.load_bills = True
     
+    profile_mark("Load and display bills")
+    
     # Load and display bills
     if st.session_state.get('load_bills') or st.button("🔄 Refresh"):
         try:
@@ -105,16 +164,18 @@ def main():
             from_date = st.session_state.get('date_from', date_from)
             to_date = st.session_state.get('date_to', date_to)
             
-            # Load orders
-            orders_df = get_orders(
-                date_from=from_date.strftime('%Y-%m-%d'),
-                date_to=to_date.strftime('%Y-%m-%d')
-            )
+            # Load orders; later runs only add what changed
+            orders_df = load_bills(from_date.strftime('%Y-%m-%d'), to_date.strftime('%Y-%m-%d'))
+            
+            if live_updates:
+                watch_bills()
             
             if orders_df.empty:
                 st.warning("No bills found for the selected date range.")
                 return
             
+            profile_mark("Summary statistics")
+            
             # Summary statistics
             st.markdown("### 📊 Summary")
             
@@ -194,6 +255,8 @@ def main():
                     </div>
                     """, unsafe_allow_html=True)
             
+            profile_mark("Bills list")
+            
             # Bills list
             st.markdown("### 📄 Bills List")
             
@@ -221,6 +284,8 @@ def main():
             else:
                 page_orders = filtered_orders
             
+            profile_mark("Display orders")
+            
             # Display orders
             for _, order in page_orders.iterrows():
                 items_data = json.loads(str(order['items_json'])) if order['items_json'] else []
@@ -306,6 +371,8 @@ def main():
                         # Generate WhatsApp message (for future implementation)
                         st.info("WhatsApp integration coming soon!")
             
+            profile_mark("Export all filtered orders")
+            
             # Export all filtered orders
             st.markdown("### 📥 Export Data")
             
@@ -332,6 +399,8 @@ def main():
         except Exception as e:
             st.error(f"Error loading bills: {str(e)}")
     
+    profile_mark("Order details modal")
+    
     # Order details modal
     if 'selected_order' in st.session_state:
         try:
@@ -387,6 +456,25 @@ def main():
             with col4:
                 st.metric("Grand Total", f"₹{selected_order['grand_total']:.2f}")
             
+            # Order lifecycle
+            col1, col2 = st.columns([3, 1])
+            
+            with col1:
+                current_status = selected_order['order_status']
+                new_status = st.selectbox(
+                    "Order Status",
+                    ORDER_STATUSES,
+                    index=ORDER_STATUSES.index(current_status) if current_status in ORDER_STATUSES else len(ORDER_STATUSES) - 1
+                )
+            
+            with col2:
+                st.write("")
+                if st.button("💾 Update Status") and new_status != current_status:
+                    if set_order_status(selected_order['id'], new_status):
+                        st.success(f"Order {selected_order['order_number']} is now {new_status}")
+                    else:
+                        st.warning("Archived orders cannot be updated")
+            
             if st.button("❌ Close Details"):
                 st.session_state.pop('selected_order', None)
                 st.rerun()
@@ -396,4 +484,7 @@ def main():
             st.session_state.pop('selected_order', None)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        finish_page_profile()
@@ -3,9 +3,14 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from db.db_utils import get_sales_summary, get_orders
+from db.db_utils import get_sales_summary, get_sales_trend, get_orders, get_hourly_heatmap, list_outlets
+from db import analytics_store
+from db.consolidation import consolidate
+from utils.charts import choose_grain, rollup, downsample, trend_figure, GRAIN_LABELS
+from utils.profiler import start_page_profile, profile_mark, finish_page_profile
 
 st.set_page_config(page_title="Reports", page_icon="📊", layout="wide")
+start_page_profile("Reports")
 
 # Custom CSS
 st.markdown("""
@@ -45,6 +50,8 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
+    profile_mark("Date range selector")
+    
     # Date range selector
     col1, col2, col3 = st.columns(3)
     
@@ -91,6 +98,12 @@ def main():
                     st.session_state.date_to = datetime.now().date()
                 st.session_state.generate_reports = True
     
+    # Head office view across every outlet database
+    outlets = list_outlets()
+    chain_wide = False
+    if outlets:
+        chain_wide = st.checkbox(f"🏢 All Outlets ({len(outlets)} outlets)")
+    
     # Generate reports
     if st.session_state.get('generate_reports'):
         try:
@@ -98,16 +111,42 @@ def main():
             from_date = st.session_state.get('date_from', date_from)
             to_date = st.session_state.get('date_to', date_to)
             
-            # Get sales data
-            daily_sales, most_sold, payment_breakdown = get_sales_summary(
+            profile_mark("Sales summary query")
+            
+            # Long ranges are aggregated in the columnar analytics store when enabled
+            use_analytics = not chain_wide and analytics_store.use_analytics(
                 from_date.strftime('%Y-%m-%d'),
                 to_date.strftime('%Y-%m-%d')
             )
             
+            # Get sales data
+            if chain_wide:
+                chain_report = consolidate(
+                    from_date.strftime('%Y-%m-%d'),
+                    to_date.strftime('%Y-%m-%d'),
+                    outlets
+                )
+                daily_sales = chain_report['daily_sales']
+                most_sold = chain_report['most_sold']
+                payment_breakdown = chain_report['payment_breakdown']
+            elif use_analytics:
+                daily_sales, most_sold, payment_breakdown = analytics_store.get_sales_summary(
+                    from_date.strftime('%Y-%m-%d'),
+                    to_date.strftime('%Y-%m-%d')
+                )
+            else:
+                daily_sales, most_sold, payment_breakdown = get_sales_summary(
+                    from_date.strftime('%Y-%m-%d'),
+                    to_date.strftime('%Y-%m-%d'),
+                    use_cache=True
+                )
+            
             if daily_sales.empty:
                 st.warning("No sales data found for the selected date range.")
                 return
             
+            profile_mark("Key metrics")
+            
             # Key metrics
             st.markdown("### 📈 Key Performance Metrics")
             
@@ -150,41 +189,92 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
             
-            # Daily sales trend
-            st.markdown("### 📈 Daily Sales Trend")
+            profile_mark("Sales trend")
             
-            if len(daily_sales) > 1:
-                fig_sales = px.line(
-                    daily_sales, 
-                    x='date', 
-                    y='total_sales',
-                    title='Daily Sales Revenue',
-                    color_discrete_sequence=['#FFD700']
-                )
-                fig_sales.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font_color='white'
-                )
-                st.plotly_chart(fig_sales, use_container_width=True)
+            # Long ranges are charted by week or month, aggregated in SQL from the daily counters
+            grain_choice = st.selectbox("Chart Grain", ["Auto", "Day", "Week", "Month"])
+            grain = choose_grain(from_date, to_date) if grain_choice == "Auto" else grain_choice.lower()
+            if chain_wide or use_analytics:
+                trend = rollup(daily_sales, grain)
+            else:
+                trend = get_sales_trend(from_date.strftime('%Y-%m-%d'), to_date.strftime('%Y-%m-%d'), grain)
+            grain_label = GRAIN_LABELS[grain]
+            
+            # Sales trend
+            st.markdown(f"### 📈 {grain_label} Sales Trend")
+            
+            if len(trend) > 1:
+                # Dense series are thinned to MAX_CHART_POINTS; figures are cached per data
+                sales_points = downsample(trend, 'total_sales')
+                st.plotly_chart(trend_figure(
+                    sales_points, 'date', 'total_sales', f'{grain_label} Sales Revenue', '#FFD700'
+                ), use_container_width=True)
+                
+                # Orders trend; bars only while every bucket is drawn
+                order_points = downsample(trend, 'total_orders')
+                st.plotly_chart(trend_figure(
+                    order_points, 'date', 'total_orders', f'{grain_label} Order Count', '#D4AF37',
+                    kind='bar' if len(order_points) == len(trend) else 'line'
+                ), use_container_width=True)
                 
-                # Orders trend
-                fig_orders = px.bar(
-                    daily_sales, 
-                    x='date', 
-                    y='total_orders',
-                    title='Daily Order Count',
+                if len(sales_points) < len(trend):
+                    st.caption(f"Showing {len(sales_points)} of {len(trend)} points; choose a coarser grain for every point.")
+            
+            else:
+                st.info("Need more data points to show trends. Select a longer date range.")
+            
+            # Outlet comparison
+            if chain_wide:
+                st.markdown("### 🏢 Outlet Comparison")
+                
+                fig_outlets = px.bar(
+                    chain_report['outlet_sales'],
+                    x='outlet',
+                    y='total_sales',
+                    hover_data=['total_orders'],
+                    title='Revenue by Outlet',
+                    labels={'outlet': 'Outlet', 'total_sales': 'Revenue'},
                     color_discrete_sequence=['#D4AF37']
                 )
-                fig_orders.update_layout(
+                fig_outlets.update_xaxes(type='category')
+                fig_outlets.update_layout(
                     plot_bgcolor='rgba(0,0,0,0)',
                     paper_bgcolor='rgba(0,0,0,0)',
                     font_color='white'
                 )
-                st.plotly_chart(fig_orders, use_container_width=True)
+                st.plotly_chart(fig_outlets, use_container_width=True)
             
-            else:
-                st.info("Need more data points to show trends. Select a longer date range.")
+            # Year-over-year comparison
+            if use_analytics:
+                yoy = analytics_store.get_year_over_year(
+                    from_date.strftime('%Y-%m-%d'),
+                    to_date.strftime('%Y-%m-%d')
+                )
+                
+                if not yoy.empty:
+                    st.markdown("### 📅 Year-over-Year")
+                    
+                    # Align both periods on month offset within the range
+                    yoy['month_index'] = yoy.groupby('period').cumcount() + 1
+                    fig_yoy = px.bar(
+                        yoy,
+                        x='month_index',
+                        y='total_sales',
+                        color='period',
+                        barmode='group',
+                        hover_data=['month', 'total_orders'],
+                        title='Monthly Revenue vs Same Period Last Year',
+                        labels={'month_index': 'Month of Range', 'total_sales': 'Revenue'},
+                        color_discrete_sequence=['#8E24AA', '#FFD700']
+                    )
+                    fig_yoy.update_layout(
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font_color='white'
+                    )
+                    st.plotly_chart(fig_yoy, use_container_width=True)
+            
+            profile_mark("Top selling items")
             
             # Top selling items
             st.markdown("### 🏆 Top Selling Items")
@@ -233,6 +323,8 @@ def main():
                     use_container_width=True
                 )
             
+            profile_mark("Payment method analysis")
+            
             # Payment method analysis
             st.markdown("### 💳 Payment Method Analysis")
             
@@ -270,23 +362,42 @@ def main():
                     )
                     st.plotly_chart(fig_payment_orders, use_container_width=True)
             
+            profile_mark("Service mode analysis")
+            
             # Service mode analysis
             st.markdown("### 🍽️ Service Mode Analysis")
             
-            orders_df = get_orders(
-                from_date.strftime('%Y-%m-%d'),
-                to_date.strftime('%Y-%m-%d')
-            )
-            
-            if not orders_df.empty:
-                service_summary = orders_df.groupby('service_mode').agg({
-                    'id': 'count',
-                    'grand_total': ['sum', 'mean']
-                }).round(2)
-                
-                service_summary.columns = ['Order Count', 'Total Revenue', 'Avg Order Value']
-                service_summary = service_summary.reset_index()
+            if chain_wide:
+                service_summary = chain_report['service_modes'].rename(columns={
+                    'order_count': 'Order Count',
+                    'total_sales': 'Total Revenue'
+                })
+                service_summary['Avg Order Value'] = (
+                    service_summary['Total Revenue'] / service_summary['Order Count']
+                ).round(2)
+            elif use_analytics:
+                service_summary = analytics_store.get_service_summary(
+                    from_date.strftime('%Y-%m-%d'),
+                    to_date.strftime('%Y-%m-%d')
+                )
+            else:
+                orders_df = get_orders(
+                    from_date.strftime('%Y-%m-%d'),
+                    to_date.strftime('%Y-%m-%d'),
+                    use_cache=True
+                )
+                service_summary = pd.DataFrame()
                 
+                if not orders_df.empty:
+                    service_summary = orders_df.groupby('service_mode').agg({
+                        'id': 'count',
+                        'grand_total': ['sum', 'mean']
+                    }).round(2)
+                    
+                    service_summary.columns = ['Order Count', 'Total Revenue', 'Avg Order Value']
+                    service_summary = service_summary.reset_index()
+            
+            if not service_summary.empty:
                 col1, col2 = st.columns(2)
                 
                 with col1:
@@ -308,31 +419,77 @@ def main():
                     st.markdown("#### 📊 Service Mode Summary")
                     st.dataframe(service_summary, use_container_width=True)
             
-            # Hourly analysis (if same day data)
-            if from_date == to_date:
-                st.markdown("### 🕐 Hourly Sales Pattern")
-                
-                orders_df['hour'] = pd.to_datetime(orders_df['order_date']).dt.hour
-                hourly_sales = orders_df.groupby('hour').agg({
-                    'id': 'count',
-                    'grand_total': 'sum'
+            profile_mark("Hourly analysis")
+            
+            # Hourly analysis (aggregated in SQL for any date range)
+            st.markdown("### 🕐 Hourly Sales Pattern")
+            
+            if chain_wide:
+                heatmap_data = chain_report['heatmap']
+            elif use_analytics:
+                heatmap_data = analytics_store.get_hourly_heatmap(
+                    from_date.strftime('%Y-%m-%d'),
+                    to_date.strftime('%Y-%m-%d')
+                )
+            else:
+                heatmap_data = get_hourly_heatmap(
+                    from_date.strftime('%Y-%m-%d'),
+                    to_date.strftime('%Y-%m-%d'),
+                    use_cache=True
+                )
+            
+            if not heatmap_data.empty:
+                hourly_sales = heatmap_data.groupby('hour').agg({
+                    'order_count': 'sum',
+                    'total_sales': 'sum'
                 }).reset_index()
-                hourly_sales.columns = ['hour', 'order_count', 'total_sales']
                 
-                if not hourly_sales.empty:
-                    fig_hourly = px.bar(
-                        hourly_sales,
-                        x='hour',
-                        y='total_sales',
-                        title='Hourly Sales Distribution',
-                        color_discrete_sequence=['#6A1B9A']
-                    )
-                    fig_hourly.update_layout(
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font_color='white'
-                    )
-                    st.plotly_chart(fig_hourly, use_container_width=True)
+                fig_hourly = px.bar(
+                    hourly_sales,
+                    x='hour',
+                    y='total_sales',
+                    title='Hourly Sales Distribution',
+                    color_discrete_sequence=['#6A1B9A']
+                )
+                fig_hourly.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font_color='white'
+                )
+                st.plotly_chart(fig_hourly, use_container_width=True)
+                
+                # Day-of-week x hour heatmap
+                heatmap_metric = st.selectbox(
+                    "Heatmap Metric",
+                    ["Order Count", "Revenue", "Avg Order Value"]
+                )
+                metric_column = {
+                    "Order Count": 'order_count',
+                    "Revenue": 'total_sales',
+                    "Avg Order Value": 'avg_order_value'
+                }[heatmap_metric]
+                
+                weekday_names = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+                heatmap_grid = heatmap_data.pivot(
+                    index='weekday', columns='hour', values=metric_column
+                ).reindex(index=range(7), columns=range(24)).fillna(0)
+                
+                fig_heatmap = go.Figure(data=go.Heatmap(
+                    z=heatmap_grid.values,
+                    x=list(range(24)),
+                    y=weekday_names,
+                    colorscale=[[0, '#2D1B3D'], [0.5, '#AD1457'], [1, '#FFD700']]
+                ))
+                fig_heatmap.update_layout(
+                    title=f'{heatmap_metric} by Day of Week and Hour',
+                    xaxis_title='Hour',
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font_color='white'
+                )
+                st.plotly_chart(fig_heatmap, use_container_width=True)
+            
+            profile_mark("Export reports")
             
             # Export reports
             st.markdown("### 📥 Export Reports")
@@ -369,6 +526,8 @@ def main():
                         mime="text/csv"
                     )
             
+            profile_mark("Business insights")
+            
             # Business insights
             st.markdown("### 💡 Business Insights")
             
@@ -403,4 +562,7 @@ def main():
             st.error(f"Error generating reports: {str(e)}")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        finish_page_profile()
@@ -0,0 +1,136 @@
+import streamlit as st
+import os
+from db.db_utils import (
+    get_tickets, get_order_events, get_last_event_id, set_order_status,
+    ORDER_STATUSES, KITCHEN_STATUSES
+)
+from db.change_feed import has_changed
+from utils.profiler import start_page_profile, profile_mark, finish_page_profile
+
+st.set_page_config(page_title="Kitchen Display", page_icon="👨‍🍳", layout="wide")
+start_page_profile("Kitchen Display")
+
+# How often the board checks for changes (seconds); a check reads no table
+KITCHEN_REFRESH_SECONDS = float(os.environ.get('RESTAURANT_KITCHEN_REFRESH', '1'))
+
+# Custom CSS
+st.markdown("""
+<style>
+    .main-header {
+        background: linear-gradient(90deg, #4A148C, #7B1FA2, #AD1457);
+        padding: 2rem;
+        border-radius: 10px;
+        text-align: center;
+        color: #FFD700;
+        margin-bottom: 2rem;
+    }
+
+    .ticket-card {
+        background: linear-gradient(135deg, #6A1B9A, #8E24AA);
+        padding: 1rem;
+        border-radius: 10px;
+        margin: 0.5rem 0;
+        color: white;
+        border-left: 4px solid #FFD700;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+STATUS_ICONS = {'Placed': '🆕', 'Preparing': '🔥', 'Ready': '✅'}
+BUMP_LABELS = {'Placed': "🔥 Start", 'Preparing': "✅ Ready", 'Ready': "🍽️ Served"}
+
+def sync_tickets():
+    """Bring the session's tickets up to date, reading only new events"""
+    state = st.session_state
+
+    if 'kitchen_tickets' not in state:
+        # Version and event id first, so nothing committed meanwhile is missed
+        has_changed(state, 'kitchen')
+        state.kitchen_event_id = get_last_event_id()
+        state.kitchen_tickets = {ticket.id: ticket for ticket in get_tickets()}
+        return
+
+    if not has_changed(state, 'kitchen'):
+        return
+
+    tickets = state.kitchen_tickets
+    new_ids = set()
+    events = get_order_events(state.kitchen_event_id)
+    while events:
+        for event in events:
+            order_id = event['order_id']
+            if event['status'] not in KITCHEN_STATUSES:
+                tickets.pop(order_id, None)
+                new_ids.discard(order_id)
+            elif order_id in tickets:
+                tickets[order_id].order_status = event['status']
+            else:
+                new_ids.add(order_id)
+            state.kitchen_event_id = event['id']
+        events = get_order_events(state.kitchen_event_id)
+
+    if new_ids:
+        for ticket in get_tickets(new_ids):
+            if ticket.order_status in KITCHEN_STATUSES:
+                tickets[ticket.id] = ticket
+
+def bump_ticket(order_id, status):
+    """Move a ticket to its next status (button callback, runs before the rerun)"""
+    next_status = ORDER_STATUSES[ORDER_STATUSES.index(status) + 1]
+    set_order_status(order_id, next_status)
+    # Shown straight away; the matching event is applied again harmlessly
+    tickets = st.session_state.kitchen_tickets
+    if next_status in KITCHEN_STATUSES and order_id in tickets:
+        tickets[order_id].order_status = next_status
+    else:
+        tickets.pop(order_id, None)
+
+def render_ticket(ticket):
+    table = f" · Table {ticket.table_number}" if ticket.table_number else ''
+    items_html = ''.join(f"<li>{item.quantity} × {item.name}</li>" for item in ticket.items)
+    st.markdown(f"""
+    <div class="ticket-card">
+        <h4>{ticket.order_number}</h4>
+        <p>{ticket.service_mode}{table} · {str(ticket.order_date)[11:16]}</p>
+        <ul>{items_html}</ul>
+    </div>
+    """, unsafe_allow_html=True)
+
+    st.button(
+        BUMP_LABELS[ticket.order_status], key=f"bump_{ticket.id}", use_container_width=True,
+        on_click=bump_ticket, args=(ticket.id, ticket.order_status)
+    )
+
+@st.fragment(run_every=KITCHEN_REFRESH_SECONDS)
+def kitchen_board():
+    sync_tickets()
+    tickets = list(st.session_state.kitchen_tickets.values())
+
+    columns = st.columns(len(KITCHEN_STATUSES))
+    for column, status in zip(columns, KITCHEN_STATUSES):
+        with column:
+            in_status = [ticket for ticket in tickets if ticket.order_status == status]
+            st.markdown(f"### {STATUS_ICONS[status]} {status} ({len(in_status)})")
+            for ticket in in_status:
+                render_ticket(ticket)
+
+def main():
+    st.markdown("""
+    <div class="main-header">
+        <h1>👨‍🍳 Kitchen Display</h1>
+        <p>Live order tickets from every terminal</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    profile_mark("Kitchen board")
+
+    try:
+        kitchen_board()
+    except Exception as e:
+        st.error(f"Error loading tickets: {str(e)}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        finish_page_profile()
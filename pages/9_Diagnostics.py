@@ -0,0 +1,113 @@
+import streamlit as st
+import pandas as pd
+import os
+from db.instrumentation import (
+    get_query_stats, get_slowest_calls, reset_query_stats,
+    HISTOGRAM_BUCKETS, SLOW_QUERY_MS, SLOW_QUERY_LOG
+)
+
+st.set_page_config(page_title="Diagnostics", page_icon="🩺", layout="wide")
+
+# Custom CSS
+st.markdown("""
+<style>
+    .main-header {
+        background: linear-gradient(90deg, #4A148C, #7B1FA2, #AD1457);
+        padding: 2rem;
+        border-radius: 10px;
+        text-align: center;
+        color: #FFD700;
+        margin-bottom: 2rem;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+def diagnostics_enabled():
+    """Diagnostics are shown only with ?diagnostics=1 or RESTAURANT_DIAGNOSTICS=1"""
+    return (
+        st.query_params.get('diagnostics') == '1'
+        or os.environ.get('RESTAURANT_DIAGNOSTICS') == '1'
+    )
+
+def main():
+    if not diagnostics_enabled():
+        st.info("Diagnostics are disabled.")
+        return
+
+    st.markdown("""
+    <div class="main-header">
+        <h1>🩺 Query Diagnostics</h1>
+        <p>Timing, row counts and query plans for database calls</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    col1, col2 = st.columns([3, 1])
+
+    with col1:
+        st.caption(f"Slow-query threshold: {SLOW_QUERY_MS:.0f} ms · Log file: {SLOW_QUERY_LOG}")
+
+    with col2:
+        if st.button("🗑️ Reset Statistics"):
+            reset_query_stats()
+            st.rerun()
+
+    # Per-function statistics
+    st.markdown("### ⏱️ Call Statistics")
+
+    stats = get_query_stats()
+
+    if not stats:
+        st.info("No database calls recorded yet in this server process.")
+        return
+
+    stats_df = pd.DataFrame([
+        {
+            'function': name,
+            'calls': values['calls'],
+            'errors': values['errors'],
+            'avg_ms': round(values['avg_ms'], 3),
+            'max_ms': round(values['max_ms'], 3),
+            'total_ms': round(values['total_ms'], 1),
+            'avg_rows': round(values['rows'] / values['calls'], 1),
+        }
+        for name, values in stats.items()
+    ]).sort_values('total_ms', ascending=False)
+    st.dataframe(stats_df, use_container_width=True, hide_index=True)
+
+    # Latency histogram
+    st.markdown("### 📊 Latency Histogram")
+
+    selected_function = st.selectbox("Function", stats_df['function'].tolist())
+    bucket_labels = [f"≤{bound:g} ms" if bound != float('inf') else f">{HISTOGRAM_BUCKETS[-2]:g} ms" for bound in HISTOGRAM_BUCKETS]
+    histogram_df = pd.DataFrame({
+        'bucket': bucket_labels,
+        'calls': stats[selected_function]['buckets']
+    }).set_index('bucket')
+    st.bar_chart(histogram_df)
+
+    # Slowest calls with query plans
+    st.markdown("### 🐢 Slowest Calls")
+
+    slowest = get_slowest_calls()
+
+    if not slowest:
+        st.info(f"No calls slower than {SLOW_QUERY_MS:.0f} ms recorded.")
+        return
+
+    for entry in slowest:
+        index_status = "⚠️ full scan" if any(plan['full_scan'] for plan in entry['plans']) else "✅ indexed"
+        if not entry['plans']:
+            index_status = "plan not captured"
+
+        with st.expander(f"{entry['function']} — {entry['elapsed_ms']:.1f} ms, {entry['rows']} rows ({index_status}) at {entry['timestamp']}"):
+            if entry['error']:
+                st.error(entry['error'])
+            for plan in entry['plans']:
+                st.code(plan['sql'], language="sql")
+                st.text("\n".join(plan['plan']))
+            if not entry['plans']:
+                for sql in entry['statements']:
+                    st.code(sql, language="sql")
+
+if __name__ == "__main__":
+    main()
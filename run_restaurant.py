@@ -4,12 +4,26 @@ Royal Restaurant Billing System - Startup Script
 This script handles the initialization and startup of the restaurant billing system.
 """
 
+import argparse
+import itertools
+import json
 import os
+import site
 import sys
 import subprocess
 import sqlite3
+from importlib import metadata
 from pathlib import Path
 
+REQUIREMENTS = [
+    ("streamlit", "1.37.0"),
+    ("pandas", "2.0.0"),
+    ("plotly", "5.15.0"),
+]
+
+# Fingerprint of the environment from the last successful dependency check
+REQUIREMENTS_CACHE = Path('.streamlit') / 'requirements_check.json'
+
 def check_python_version():
     """Check if Python version is compatible"""
     if sys.version_info < (3, 7):
@@ -20,24 +34,76 @@ def check_python_version():
     else:
         print(f"✅ Python version: {sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}")
 
+def version_tuple(version):
+    """Turn a version like '2.3.1' or '1.48.0rc1' into a comparable tuple"""
+    parts = []
+    for part in version.split('.'):
+        digits = ''.join(itertools.takewhile(str.isdigit, part))
+        if not digits:
+            break
+        parts.append(int(digits))
+        if len(digits) != len(part):
+            break
+    return tuple(parts)
+
+def environment_fingerprint():
+    """Identify the interpreter, the requirements and the installed packages"""
+    # Installing or removing a package changes its site-packages directory's mtime
+    site_dirs = site.getsitepackages() + [site.getusersitepackages()]
+    return {
+        'python': sys.executable,
+        'requirements': [f"{name}>={minimum}" for name, minimum in REQUIREMENTS],
+        'site_packages': {path: os.stat(path).st_mtime for path in site_dirs if os.path.isdir(path)},
+    }
+
+def missing_requirements():
+    """Get requirement specs that are not installed at a new enough version"""
+    missing = []
+    for name, minimum in REQUIREMENTS:
+        try:
+            installed = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            installed = None
+        if installed is None or version_tuple(installed) < version_tuple(minimum):
+            missing.append(f"{name}>={minimum}")
+    return missing
+
 def install_requirements():
-    """Install required packages"""
-    print("📦 Installing required packages...")
-    requirements = [
-        "streamlit>=1.28.0",
-        "pandas>=2.0.0", 
-        "plotly>=5.15.0"
-    ]
+    """Install required packages that are missing or too old"""
+    fingerprint = environment_fingerprint()
+    try:
+        if json.loads(REQUIREMENTS_CACHE.read_text()) == fingerprint:
+            print("✅ Required packages verified (cached)")
+            return True
+    except (OSError, ValueError):
+        pass
     
-    for package in requirements:
+    missing = missing_requirements()
+    if missing:
+        print(f"📦 Installing required packages: {', '.join(missing)}")
         try:
-            subprocess.run([sys.executable, "-m", "pip", "install", package], 
+            subprocess.run([sys.executable, "-m", "pip", "install", *missing],
                          check=True, capture_output=True, text=True)
-            print(f"✅ Installed: {package}")
         except subprocess.CalledProcessError as e:
-            print(f"❌ Failed to install {package}: {e}")
-            print("Please install manually using: pip install", package)
+            print(f"❌ Failed to install packages: {e}")
+            print("Please install manually using: pip install", " ".join(missing))
+            return False
+        
+        still_missing = missing_requirements()
+        if still_missing:
+            print(f"❌ Packages still missing after install: {', '.join(still_missing)}")
             return False
+        for package in missing:
+            print(f"✅ Installed: {package}")
+        fingerprint = environment_fingerprint()
+    else:
+        print("✅ Required packages already installed")
+    
+    try:
+        REQUIREMENTS_CACHE.parent.mkdir(exist_ok=True)
+        REQUIREMENTS_CACHE.write_text(json.dumps(fingerprint))
+    except OSError:
+        pass
     
     return True
 
@@ -52,6 +118,11 @@ def create_directories():
 def check_database():
     """Check if database exists and is accessible"""
     db_path = 'db/restaurant.db'
+    # Same file naming as db_utils.outlet_db_path
+    outlet = os.environ.get('RESTAURANT_OUTLET', '').strip()
+    if outlet:
+        db_path = f"db/restaurant_outlet{outlet}.db"
+        print(f"🏪 Outlet: {outlet}")
     try:
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
@@ -100,6 +171,11 @@ def start_application():
 
 def main():
     """Main startup function"""
+    parser = argparse.ArgumentParser(description="Set up and start the Royal Restaurant Billing System")
+    parser.add_argument("--serve", action="store_true",
+                        help="Start the application without prompting (for start scripts and restarts)")
+    args = parser.parse_args()
+    
     print("🍽️  Royal Restaurant Billing System - Startup")
     print("=" * 50)
     
@@ -118,6 +194,11 @@ def main():
     check_database()
     
     print("\n✅ System initialization complete!")
+    
+    if args.serve:
+        start_application()
+        return
+    
     print("🎉 Ready to start the application!")
     
     # Ask user if they want to start
@@ -127,7 +208,7 @@ def main():
         start_application()
     else:
         print("\n📝 To start the application later, run:")
-        print("   python run_restaurant.py")
+        print("   python run_restaurant.py --serve")
         print("   OR")
         print("   streamlit run app.py --server.port 5000")
 
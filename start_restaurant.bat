@@ -20,21 +20,8 @@ if %ERRORLEVEL% NEQ 0 (
 echo Python found! Starting application...
 echo.
 
-:: Install requirements if needed
-echo Installing/checking required packages...
-pip install streamlit pandas plotly
-
-echo.
-echo Starting Royal Restaurant Billing System...
-echo.
-echo IMPORTANT:
-echo - The application will open in your browser at http://localhost:5000
-echo - Keep this window open while using the application
-echo - Press Ctrl+C to stop the application
-echo.
-
-:: Start the application
-streamlit run app.py --server.port 5000 --server.headless true
+:: Check packages (installs only what is missing) and start the application
+python run_restaurant.py --serve
 
 echo.
 echo Application stopped. Thank you for using Royal Restaurant Billing System!
@@ -22,21 +22,8 @@ fi
 echo "Python found! Starting application..."
 echo
 
-# Install requirements
-echo "Installing/checking required packages..."
-$PYTHON_CMD -m pip install streamlit pandas plotly
-
-echo
-echo "Starting Royal Restaurant Billing System..."
-echo
-echo "IMPORTANT:"
-echo "- The application will open in your browser at http://localhost:5000"
-echo "- Keep this terminal open while using the application"
-echo "- Press Ctrl+C to stop the application"
-echo
-
-# Start the application
-$PYTHON_CMD -m streamlit run app.py --server.port 5000 --server.headless true
+# Check packages (installs only what is missing) and start the application
+$PYTHON_CMD run_restaurant.py --serve
 
 echo
 echo "Application stopped. Thank you for using Royal Restaurant Billing System!"
\ No newline at end of file
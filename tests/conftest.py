@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import db_utils
+from db.models import Order, OrderItem
+from db.report_cache import clear_report_cache
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """An initialized database in a temporary folder, used by every db_utils helper"""
+    path = str(tmp_path / 'restaurant.db')
+    monkeypatch.setattr(db_utils, 'DB_PATH', path)
+    db_utils.init_database()
+    clear_report_cache()
+    return path
+
+@pytest.fixture
+def new_order():
+    """Build an (Order, [OrderItem]) pair for one item; fields override the defaults"""
+    def build(order_number, price=100.0, quantity=1, **fields):
+        items = [OrderItem('Paneer Tikka', 'Starters', quantity, price)]
+        subtotal = price * quantity
+        order = Order(**dict({
+            'order_number': order_number,
+            'service_mode': 'Takeaway',
+            'subtotal': subtotal,
+            'gst_amount': round(subtotal * 0.05, 2),
+            'grand_total': round(subtotal * 1.05, 2),
+            'payment_method': 'Cash',
+        }, **fields))
+        return order, items
+    return build
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import time
+from urllib.parse import quote
+
+import pytest
+
+from api import server
+from db import db_utils
+
+@pytest.fixture(autouse=True)
+def fresh_menu(monkeypatch):
+    """Reload the menu from each test's own database"""
+    monkeypatch.setitem(server._menu, 'loaded_at', float('-inf'))
+
+def request(raw):
+    """Send raw bytes through the connection handler and return the response bytes"""
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        sent = bytearray()
+
+        class Writer:
+            def write(self, data):
+                sent.extend(data)
+            async def drain(self):
+                pass
+            def close(self):
+                pass
+
+        await server.handle_connection(reader, Writer())
+        return bytes(sent)
+    return asyncio.run(run())
+
+def status_of(response):
+    return int(response.split(b' ', 2)[1])
+
+def body_of(response):
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+def dispatch(method, target, body=b''):
+    status, payload = asyncio.run(server.dispatch(method, target, body))
+    return status, json.loads(payload)
+
+@pytest.mark.parametrize('length', [b'abc', b'-5', b'1e3'])
+def test_invalid_content_length_is_rejected(db_path, length):
+    response = request(b'POST /api/cart/price HTTP/1.1\r\nContent-Length: ' + length + b'\r\n\r\n{}')
+    assert status_of(response) == 400
+    assert body_of(response) == {'error': "invalid Content-Length header"}
+    assert b'Connection: close' in response
+
+def test_oversized_body_is_rejected(db_path):
+    length = str(server.MAX_BODY_BYTES + 1).encode()
+    response = request(b'POST /api/cart/price HTTP/1.1\r\nContent-Length: ' + length + b'\r\n\r\n')
+    assert status_of(response) == 413
+
+def test_keep_alive_serves_several_requests(db_path):
+    response = request(b'GET /api/health HTTP/1.1\r\n\r\n' * 2)
+    assert response.count(b'HTTP/1.1 200') == 2
+
+def test_internal_errors_are_not_leaked(db_path, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("secret table layout")
+    monkeypatch.setattr(db_utils, 'list_open_tabs', fail)
+    status, payload = dispatch('GET', '/api/tabs')
+    assert status == 500
+    assert payload == {'error': "internal server error"}
+
+def test_percent_encoded_order_numbers(db_path, new_order):
+    order, items = new_order('ORD 1/A')
+    db_utils.save_order(order, items)
+
+    status, payload = dispatch('GET', '/api/orders/' + quote('ORD 1/A', safe=''))
+    assert status == 200
+    assert payload['order_number'] == 'ORD 1/A'
+
+    status, payload = dispatch('POST', '/api/orders/' + quote('ORD 1/A', safe='') + '/status', b'{"status": "Ready"}')
+    assert status == 200
+    assert db_utils.fetch_order('ORD 1/A').order_status == 'Ready'
+
+def test_unknown_order_is_404(db_path):
+    status, _ = dispatch('GET', '/api/orders/ORD404')
+    assert status == 404
+
+def test_percent_encoded_table_numbers(db_path):
+    db_utils.add_sample_menu()
+    status, payload = dispatch('POST', '/api/tabs/' + quote('T 1') + '/items', b'{"items": [{"id": 1, "quantity": 2}]}')
+    assert status == 200
+    assert payload['table_number'] == 'T 1'
+    assert dispatch('GET', '/api/tabs/T%201')[1]['items'][0]['quantity'] == 2
+
+@pytest.mark.parametrize('items', [[], [{'id': 1, 'quantity': 0}], [{'id': 1}], [{'id': 999, 'quantity': 1}]])
+def test_invalid_cart_items_are_rejected(db_path, items):
+    db_utils.add_sample_menu()
+    status, _ = dispatch('POST', '/api/cart/price', json.dumps({'items': items}).encode())
+    assert status == 400
+
+@pytest.mark.parametrize('wait', ['nan', 'inf', '-inf', 'abc'])
+def test_kitchen_wait_must_be_a_finite_number(db_path, wait):
+    status, _ = dispatch('GET', f'/api/kitchen/events?after=0&wait={wait}')
+    assert status == 400
+
+def test_kitchen_wait_is_clamped(db_path, monkeypatch):
+    monkeypatch.setattr(server, 'KITCHEN_WAIT_MAX', 0.2)
+    for wait in ('-5', '100'):
+        started = time.monotonic()
+        status, payload = dispatch('GET', f'/api/kitchen/events?after=0&wait={wait}')
+        assert status == 200
+        assert payload == {'events': [], 'last_event_id': 0}
+        assert time.monotonic() - started < 2
+
+def test_kitchen_events_return_new_changes(db_path, new_order):
+    order_id = db_utils.save_order(*new_order('K1', order_status='Placed'))
+    status, payload = dispatch('GET', '/api/kitchen/events?after=0&wait=1')
+    assert status == 200
+    assert [(event['order_id'], event['status']) for event in payload['events']] == [(order_id, 'Placed')]
+    assert payload['last_event_id'] == payload['events'][-1]['id']
@@ -0,0 +1,79 @@
+import logging
+import os
+import sqlite3
+
+import pytest
+
+from db import db_utils, archive
+
+OLD_DAYS = ['2020-03-10 12:00:00', '2020-03-20 19:30:00', '2020-04-02 13:15:00']
+
+@pytest.fixture
+def archived(db_path, tmp_path, new_order, monkeypatch):
+    """Three old orders and a recent one, with the old ones archived by month"""
+    conn = sqlite3.connect(db_path)
+    for idx, day in enumerate(OLD_DAYS):
+        db_utils.insert_order(conn.cursor(), *new_order(f"OLD{idx}"), order_date=day)
+    conn.commit()
+    conn.close()
+    db_utils.save_order(*new_order('NEW'))
+
+    # Relative archive folder, as with the default db/archive
+    monkeypatch.chdir(tmp_path)
+    moved = archive.archive_orders(db_path, horizon_days=180, archive_dir='archive')
+    return moved
+
+def table_count(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_old_orders_move_to_monthly_partitions(archived, db_path):
+    assert [(os.path.basename(path), count) for path, count in archived] == [
+        ('orders_2020_03.db', 2), ('orders_2020_04.db', 1)
+    ]
+    assert table_count(db_path, 'orders') == 1
+    assert table_count(db_path, 'order_items') == 1
+    # Each order's status history moves with it
+    assert table_count(db_path, 'order_events') == 1
+    assert [table_count(path, 'order_events') for path, _ in archived] == [2, 1]
+
+def test_rerun_moves_nothing(archived, db_path):
+    assert archive.archive_orders(db_path, horizon_days=180, archive_dir='archive') == []
+
+def test_reports_and_lookups_include_archived_orders(archived, db_path):
+    daily_sales, most_sold, _ = db_utils.get_sales_summary('2020-03-01', '2020-04-30')
+    assert daily_sales['total_orders'].sum() == 3
+    assert most_sold['total_quantity'].tolist() == [3]
+    assert len(db_utils.get_orders('2020-01-01', '2030-01-01')) == 4
+    assert db_utils.fetch_order('OLD1').order_date == OLD_DAYS[1]
+
+def test_manifest_paths_work_from_another_directory(archived, db_path, tmp_path, monkeypatch):
+    conn = sqlite3.connect(db_path)
+    paths = [path for (path,) in conn.execute("SELECT path FROM archive_partitions")]
+    conn.close()
+    assert all(os.path.isabs(path) for path in paths)
+
+    elsewhere = tmp_path / 'elsewhere'
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    assert db_utils.get_sales_summary('2020-03-01', '2020-04-30')[0]['total_orders'].sum() == 3
+
+def test_missing_partition_is_logged(archived, db_path, caplog):
+    os.remove(archived[0][0])
+    with caplog.at_level(logging.WARNING, logger='restaurant.archive'):
+        daily_sales = db_utils.get_sales_summary('2020-03-01', '2020-04-30')[0]
+    assert daily_sales['total_orders'].sum() == 1
+    assert 'orders_2020_03.db not found' in caplog.text
+
+def test_archiving_invalidates_cached_reports(db_path, tmp_path, new_order, monkeypatch):
+    conn = sqlite3.connect(db_path)
+    generation = db_utils.get_report_generation(conn)
+    db_utils.insert_order(conn.cursor(), *new_order('OLD0'), order_date=OLD_DAYS[0])
+    conn.commit()
+    monkeypatch.chdir(tmp_path)
+    archive.archive_orders(db_path, horizon_days=180, archive_dir='archive')
+    assert db_utils.get_report_generation(conn) > generation
+    conn.close()
@@ -0,0 +1,92 @@
+import os
+import sqlite3
+
+import pytest
+
+from db import db_utils, archive, backup
+
+def order_numbers(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT order_number FROM orders"))
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_restore_round_trip(db_path, tmp_path, new_order, compress):
+    backups = str(tmp_path / 'backups')
+    db_utils.save_order(*new_order('B1'))
+    snapshot = backup.backup_database(db_path, backups, compress=compress, keep=5)
+    assert snapshot['path'].endswith('.db.gz' if compress else '.db')
+    assert backup.verify_backup(snapshot['path']) == []
+
+    db_utils.save_order(*new_order('B2'))
+    safety = backup.restore_backup(snapshot['path'], db_path, backups)
+
+    assert order_numbers(db_path) == ['B1']
+    # The state replaced by the restore is kept
+    assert backup.verify_backup(safety) == []
+    assert os.path.dirname(safety) == os.path.join(backups, 'pre_restore')
+
+def test_back_to_back_snapshots_get_their_own_names(db_path, tmp_path):
+    backups = str(tmp_path / 'backups')
+    first = backup.backup_database(db_path, backups, compress=False, keep=5)['path']
+    second = backup.backup_database(db_path, backups, compress=False, keep=5)['path']
+    assert first != second
+    assert backup.list_backups(backups) == [second, first]
+
+def test_rotation_keeps_the_newest_across_name_formats(db_path, tmp_path):
+    backups = tmp_path / 'backups'
+    backups.mkdir()
+    # Named before snapshot names had microseconds
+    for name in ('restaurant_20240101_120000.db', 'restaurant_20240102_120000.db.gz'):
+        (backups / name).write_bytes(b'')
+
+    taken = backup.backup_database(db_path, str(backups), compress=False, keep=2)
+    assert os.path.exists(taken['path'])
+    assert [os.path.basename(path) for path in taken['removed']] == ['restaurant_20240101_120000.db']
+    assert backup.list_backups(str(backups))[1].endswith('restaurant_20240102_120000.db.gz')
+
+def test_snapshot_never_overwrites(db_path, tmp_path):
+    target = str(tmp_path / 'copy.db')
+    open(target, 'wb').close()
+    with pytest.raises(backup.BackupError):
+        backup._snapshot_file(db_path, target, False, -1, 0)
+
+def test_corrupt_snapshot_is_not_restored(db_path, tmp_path, new_order):
+    db_utils.save_order(*new_order('B1'))
+    corrupt = tmp_path / 'restaurant_20240101_120000_000000.db'
+    corrupt.write_bytes(b'not a database' * 100)
+
+    assert backup.verify_backup(str(corrupt)) != []
+    with pytest.raises(backup.BackupError):
+        backup.restore_backup(str(corrupt), db_path, str(tmp_path / 'backups'))
+    assert order_numbers(db_path) == ['B1']
+
+@pytest.fixture
+def archived_snapshot(db_path, tmp_path, new_order):
+    """A snapshot of a database with one archived order"""
+    conn = sqlite3.connect(db_path)
+    db_utils.insert_order(conn.cursor(), *new_order('OLD'), order_date='2020-03-10 12:00:00')
+    conn.commit()
+    conn.close()
+    (partition, _), = archive.archive_orders(db_path, horizon_days=180, archive_dir=str(tmp_path / 'archive'))
+    snapshot = backup.backup_database(db_path, str(tmp_path / 'backups'), compress=True, keep=5)
+    return snapshot, partition
+
+def test_archive_partitions_are_backed_up_and_restored(archived_snapshot, db_path):
+    snapshot, partition = archived_snapshot
+    assert snapshot['archives'] == 1
+    assert backup.verify_backup(snapshot['path']) == []
+
+    os.remove(partition)
+    backup.restore_backup(snapshot['path'], db_path)
+    assert order_numbers(partition) == ['OLD']
+    assert db_utils.fetch_order('OLD') is not None
+
+def test_restore_fails_without_a_partition_copy(archived_snapshot, db_path):
+    snapshot, _ = archived_snapshot
+    for copy in os.listdir(backup.archive_copies_dir(snapshot['path'])):
+        os.remove(os.path.join(backup.archive_copies_dir(snapshot['path']), copy))
+    with pytest.raises(backup.BackupError):
+        backup.restore_backup(snapshot['path'], db_path)
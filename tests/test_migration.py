@@ -0,0 +1,78 @@
+import sqlite3
+
+from db import db_utils, archive
+from db.models import Order
+
+def statuses(path, table='orders', column='order_status'):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted({row[0] for row in conn.execute(f"SELECT {column} FROM {table}")})
+    finally:
+        conn.close()
+
+def user_version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def report_generation(path):
+    conn = sqlite3.connect(path)
+    try:
+        return db_utils.get_report_generation(conn)
+    finally:
+        conn.close()
+
+def make_legacy(db_path, tmp_path, new_order):
+    """Mark every order 'Completed' as before the lifecycle, one of them archived"""
+    conn = sqlite3.connect(db_path)
+    db_utils.insert_order(conn.cursor(), *new_order('OLD'), order_date='2020-03-10 12:00:00')
+    conn.commit()
+    conn.close()
+    db_utils.save_order(*new_order('NEW'))
+    (partition, _), = archive.archive_orders(db_path, horizon_days=180, archive_dir=str(tmp_path / 'archive'))
+
+    for path in (db_path, partition):
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE orders SET order_status = 'Completed'")
+        conn.execute("UPDATE order_events SET status = 'Completed'")
+        conn.commit()
+        conn.close()
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+    return partition
+
+def test_new_orders_default_to_paid():
+    assert Order(order_number='X', service_mode='Takeaway', payment_method='Cash').order_status == 'Paid'
+
+def test_new_database_is_marked_migrated(db_path):
+    assert user_version(db_path) == 1
+
+def test_completed_orders_become_paid(db_path, tmp_path, new_order):
+    partition = make_legacy(db_path, tmp_path, new_order)
+    db_utils.init_database()
+
+    assert statuses(db_path) == ['Paid']
+    assert statuses(db_path, 'order_events', 'status') == ['Paid']
+    assert statuses(partition) == ['Paid']
+    assert statuses(partition, 'order_events', 'status') == ['Paid']
+    assert user_version(db_path) == 1
+    assert db_utils.fetch_order('OLD').order_status == 'Paid'
+
+def test_migration_runs_once(db_path, tmp_path, new_order):
+    make_legacy(db_path, tmp_path, new_order)
+    db_utils.init_database()
+    generation = report_generation(db_path)
+
+    # A status written after the migration is left alone on later starts
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE orders SET order_status = 'Completed' WHERE order_number = 'NEW'")
+    conn.commit()
+    conn.close()
+    db_utils.init_database()
+
+    assert statuses(db_path) == ['Completed']
+    assert report_generation(db_path) == generation
@@ -0,0 +1,62 @@
+import pytest
+
+from db import db_utils
+from db.models import OrderItem
+
+@pytest.fixture
+def tab(db_path):
+    """Table 5 with two items added from two terminals, and one taken off"""
+    tea = OrderItem('Masala Tea', 'Beverages', 2, 40.0, id=1, gst_rate=5.0)
+    samosa = OrderItem('Samosa', 'Starters', 3, 30.0, id=2, gst_rate=5.0)
+    db_utils.add_tab_item('5', tea)
+    db_utils.add_tab_item('5', samosa)
+    db_utils.add_tab_item('5', samosa, -1)
+    return tea, samosa
+
+def table_order(new_order, items):
+    order, _ = new_order('TAB5', service_mode='Dine-In', table_number='5')
+    return order, items
+
+def test_tab_lines_are_added_up(tab):
+    items, _ = db_utils.get_tab('5')
+    assert [(item.name, item.quantity) for item in items] == [('Masala Tea', 2), ('Samosa', 2)]
+    assert db_utils.list_open_tabs()[0]['subtotal'] == 140.0
+
+def test_billing_closes_the_tab(tab, new_order):
+    items, version = db_utils.get_tab('5')
+    db_utils.save_order(*table_order(new_order, items), tab_version=version)
+    assert db_utils.get_tab('5')[0] == []
+    assert db_utils.list_open_tabs() == []
+    assert len(db_utils.fetch_order('TAB5').items) == 2
+
+def test_billing_a_changed_tab_fails(tab, new_order):
+    tea, _ = tab
+    items, version = db_utils.get_tab('5')
+    # Another terminal adds a line after this one read the tab
+    db_utils.add_tab_item('5', tea, 1)
+
+    with pytest.raises(db_utils.TabChanged):
+        db_utils.save_order(*table_order(new_order, items), tab_version=version)
+    assert db_utils.fetch_order('TAB5') is None
+    items, new_version = db_utils.get_tab('5')
+    assert new_version != version
+    assert items[0].quantity == 3
+
+    db_utils.save_order(*table_order(new_order, items), tab_version=new_version)
+    assert db_utils.list_open_tabs() == []
+
+def test_tab_read_ignores_lines_after_its_version(tab, monkeypatch):
+    tea, _ = tab
+    read_version = db_utils._tab_version
+
+    def version_then_append(conn, table_number):
+        version = read_version(conn, table_number)
+        db_utils.add_tab_item(table_number, tea, 1)
+        return version
+
+    monkeypatch.setattr(db_utils, '_tab_version', version_then_append)
+    items, version = db_utils.get_tab('5')
+    # The line appended in between is in neither the items nor the version
+    assert items[0].quantity == 2
+    monkeypatch.setattr(db_utils, '_tab_version', read_version)
+    assert db_utils.get_tab('5')[1] > version
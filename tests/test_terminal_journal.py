@@ -0,0 +1,63 @@
+import sqlite3
+
+from db import db_utils, terminal_journal
+
+def count_orders(db_path, order_number):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM orders WHERE order_number = ?", (order_number,)).fetchone()[0]
+    finally:
+        conn.close()
+
+def test_sync_uploads_pending_orders_once(db_path, tmp_path, new_order):
+    journal = str(tmp_path / 'journal.db')
+    for number in ('J1', 'J2', 'J3'):
+        terminal_journal.journal_order(*new_order(number), journal_path=journal)
+    assert terminal_journal.count_pending(journal) == 3
+
+    summary = terminal_journal.sync_journal(journal, db_path, batch_size=2)
+    assert summary == {'synced': 3, 'duplicates': 0, 'conflicts': 0, 'remaining': 0}
+    assert terminal_journal.sync_journal(journal, db_path)['synced'] == 0
+    assert all(count_orders(db_path, number) == 1 for number in ('J1', 'J2', 'J3'))
+
+def test_interrupted_sync_is_resolved_as_duplicate(db_path, tmp_path, new_order):
+    journal = str(tmp_path / 'journal.db')
+    order, items = new_order('J1')
+    terminal_journal.journal_order(order, items, journal_path=journal)
+    # The central commit happened, but the journal was never marked
+    db_utils.save_order(order, items)
+
+    summary = terminal_journal.sync_journal(journal, db_path)
+    assert summary['duplicates'] == 1
+    assert summary['remaining'] == 0
+    assert count_orders(db_path, 'J1') == 1
+
+def test_differing_central_order_is_a_conflict(db_path, tmp_path, new_order):
+    journal = str(tmp_path / 'journal.db')
+    terminal_journal.journal_order(*new_order('J1', price=100.0), journal_path=journal)
+    db_utils.save_order(*new_order('J1', price=250.0))
+
+    summary = terminal_journal.sync_journal(journal, db_path)
+    assert summary['conflicts'] == 1
+    assert summary['remaining'] == 0
+    (order_number, reason, _), = terminal_journal.get_sync_conflicts(journal)
+    assert order_number == 'J1'
+    assert '262.50' in reason and '105.00' in reason
+    assert db_utils.fetch_order('J1').grand_total == 262.5
+
+def test_synced_past_orders_invalidate_cached_reports(db_path, tmp_path, new_order):
+    journal = str(tmp_path / 'journal.db')
+    day = '2020-01-15'
+    before = db_utils.get_sales_summary(day, day, use_cache=True)[0]
+    assert before.empty
+
+    order, items = new_order('J1')
+    terminal_journal.journal_order(order, items, journal_path=journal)
+    conn = sqlite3.connect(journal)
+    conn.execute("UPDATE journal SET recorded_at = ?", (f"{day} 12:00:00",))
+    conn.commit()
+    conn.close()
+    terminal_journal.sync_journal(journal, db_path)
+
+    daily_sales = db_utils.get_sales_summary(day, day, use_cache=True)[0]
+    assert daily_sales['total_orders'].tolist() == [1]
@@ -1,3 +1,5 @@
+from db.models import as_order, as_order_items
+
 def calculate_order_total(order_items, discount_percent=0):
     """Calculate order totals with GST and discount"""
     if not order_items:
@@ -9,7 +11,7 @@ def calculate_order_total(order_items, discount_percent=0):
         }
     
     # Calculate subtotal
-    subtotal = sum(item['price'] * item['quantity'] for item in order_items)
+    subtotal = sum(item.total_price for item in as_order_items(order_items))
     
     # Calculate GST (5% standard)
     gst_amount = subtotal * 0.05
@@ -36,40 +38,49 @@ def validate_order(order_items):
     if not order_items:
         return False, "No items in the order"
     
+    try:
+        order_items = as_order_items(order_items)
+    except (KeyError, TypeError, ValueError):
+        return False, "Malformed order item"
+
     for item in order_items:
-        if item['quantity'] <= 0:
-            return False, f"Invalid quantity for {item['name']}"
-        if item['price'] <= 0:
-            return False, f"Invalid price for {item['name']}"
+        if item.quantity <= 0:
+            return False, f"Invalid quantity for {item.name}"
+        if item.price <= 0:
+            return False, f"Invalid price for {item.name}"
     
     return True, "Order is valid"
 
+def _or(value, default):
+    """Use default for fields the order was created without"""
+    return default if value is None else value
+
 def generate_bill_text(order_data, order_items, calculations):
     """Generate formatted bill text"""
+    order = as_order(order_data)
     bill_text = f"""
     ================================================
               ROYAL RESTAURANT
          Premium Dining Experience
     ================================================
     
-    Order Number: {order_data['order_number']}
-    Service Mode: {order_data['service_mode']}
-    Date & Time: {order_data.get('order_date', '')}
+    Order Number: {order.order_number}
+    Service Mode: {order.service_mode}
+    Date & Time: {_or(order.order_date, '')}
     
-    Customer: {order_data.get('customer_name', 'Walk-in Customer')}
-    Phone: {order_data.get('customer_phone', 'N/A')}
-    {f"Table: {order_data.get('table_number', 'N/A')}" if order_data['service_mode'] == 'Dine-In' else ''}
+    Customer: {_or(order.customer_name, 'Walk-in Customer')}
+    Phone: {_or(order.customer_phone, 'N/A')}
+    {f"Table: {_or(order.table_number, 'N/A')}" if order.service_mode == 'Dine-In' else ''}
     
     ================================================
                     ORDER DETAILS
     ================================================
     """
     
-    for item in order_items:
-        total_price = item['price'] * item['quantity']
+    for item in as_order_items(order_items):
         bill_text += f"""
-    {item['name']}
-    Qty: {item['quantity']} x ₹{item['price']:.2f} = ₹{total_price:.2f}
+    {item.name}
+    Qty: {item.quantity} x ₹{item.price:.2f} = ₹{item.total_price:.2f}
     """
     
     bill_text += f"""
@@ -83,8 +94,8 @@ def generate_bill_text(order_data, order_items, calculations):
     ------------------------------------------------
     GRAND TOTAL:        ₹{calculations['grand_total']:.2f}
     
-    Payment Method:     {order_data['payment_method']}
-    Status:             {order_data.get('order_status', 'Completed')}
+    Payment Method:     {order.payment_method}
+    Status:             {_or(order.order_status, 'Paid')}
     
     ================================================
           Thank you for dining with us!
@@ -0,0 +1,114 @@
+"""
+Time-series chart helpers for the Reports page.
+Long ranges are shown by week or month, series still too dense are thinned
+with Largest-Triangle-Three-Buckets, and finished figures are cached as JSON
+keyed on the data they were built from, so reruns skip plotly express.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from db.report_cache import get_cached, put_cached
+
+GRAINS = ['day', 'week', 'month']
+GRAIN_LABELS = {'day': 'Daily', 'week': 'Weekly', 'month': 'Monthly'}
+
+# Ranges up to this many days are charted by day, then by week up to MAX_WEEKLY_DAYS
+MAX_DAILY_DAYS = 92
+MAX_WEEKLY_DAYS = 730
+
+# Series longer than this are downsampled before plotting
+MAX_CHART_POINTS = int(os.environ.get('RESTAURANT_MAX_CHART_POINTS', '400'))
+
+# Shared styling of the royal theme
+CHART_LAYOUT = {
+    'plot_bgcolor': 'rgba(0,0,0,0)',
+    'paper_bgcolor': 'rgba(0,0,0,0)',
+    'font_color': 'white'
+}
+
+def choose_grain(date_from, date_to):
+    """Pick day, week or month so a range gives at most about a hundred points"""
+    days = (datetime.strptime(str(date_to), '%Y-%m-%d') - datetime.strptime(str(date_from), '%Y-%m-%d')).days + 1
+    if days <= MAX_DAILY_DAYS:
+        return 'day'
+    if days <= MAX_WEEKLY_DAYS:
+        return 'week'
+    return 'month'
+
+def rollup(daily_sales, grain):
+    """Roll a daily_sales frame (date, total_orders, total_sales) up to a grain
+
+    Used for frames that did not come from SQL (consolidated or analytics reports);
+    buckets match db_utils.get_sales_trend: weeks start on Monday, months on the 1st.
+    """
+    if grain == 'day' or daily_sales.empty:
+        return daily_sales[['date', 'total_orders', 'total_sales']]
+    dates = pd.to_datetime(daily_sales['date'])
+    if grain == 'week':
+        buckets = dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    else:
+        buckets = dates.dt.to_period('M').dt.start_time
+    trend = daily_sales.groupby(buckets.dt.strftime('%Y-%m-%d'))[['total_orders', 'total_sales']].sum()
+    return trend.rename_axis('date').reset_index()
+
+def lttb(values, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+
+    x is taken as the position in the series, which suits evenly spaced buckets.
+    """
+    count = len(values)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    kept = [0]
+    bucket_size = (count - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        # Average of the next bucket is the third corner of the triangle
+        next_start, next_end = end, min(int((bucket + 2) * bucket_size) + 1, count)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / max(next_end - next_start, 1)
+
+        best, best_area = start, -1.0
+        for idx in range(start, end):
+            area = abs(
+                (previous - avg_x) * (values[idx] - values[previous])
+                - (previous - idx) * (avg_y - values[previous])
+            )
+            if area > best_area:
+                best, best_area = idx, area
+        kept.append(best)
+        previous = best
+    kept.append(count - 1)
+    return kept
+
+def downsample(frame, column, threshold=None):
+    """Keep the rows LTTB selects for one column; short frames are returned as they are"""
+    threshold = threshold or MAX_CHART_POINTS
+    if len(frame) <= threshold:
+        return frame
+    return frame.iloc[lttb(frame[column].tolist(), threshold)]
+
+def _data_key(kind, frame, x, y, title, color):
+    digest = hashlib.sha1(pd.util.hash_pandas_object(frame[[x, y]], index=False).values.tobytes()).hexdigest()
+    return ('chart', kind, x, y, title, color, digest)
+
+def trend_figure(frame, x, y, title, color, kind='line'):
+    """Get a line or bar figure as a plotly dict, built once per distinct data"""
+    key = _data_key(kind, frame, x, y, title, color)
+    hit, figure_json = get_cached(key, cache='figure')
+    if not hit:
+        import plotly.express as px
+        build = px.bar if kind == 'bar' else px.line
+        fig = build(frame, x=x, y=y, title=title, color_discrete_sequence=[color])
+        fig.update_layout(**CHART_LAYOUT)
+        figure_json = fig.to_json()
+        put_cached(key, figure_json, cache='figure')
+    return json.loads(figure_json)
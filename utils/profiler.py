@@ -0,0 +1,148 @@
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from datetime import datetime
+
+import streamlit as st
+from db.instrumentation import add_listener
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_LOG = os.environ.get('RESTAURANT_PROFILE_LOG', 'logs/render_profile.jsonl')
+
+# Streamlit runs each session's script in its own thread
+_active = threading.local()
+
+def profiling_enabled():
+    """Profiling is opt-in via ?profile=1 (sticky per session) or RESTAURANT_PROFILE=1"""
+    if os.environ.get('RESTAURANT_PROFILE') == '1':
+        return True
+    profile_param = st.query_params.get('profile')
+    if profile_param is not None:
+        st.session_state._profiling = profile_param == '1'
+    return st.session_state.get('_profiling', False)
+
+def _record_data_call(name, elapsed_ms, rows, error=None):
+    """Attribute an instrumented db_utils call to the running profile"""
+    profile = getattr(_active, 'profile', None)
+    if profile is not None:
+        profile['data_calls'].append({
+            'function': name,
+            'section': profile['section'],
+            'elapsed_ms': round(elapsed_ms, 3),
+            'rows': rows,
+            'error': error is not None,
+        })
+
+add_listener(_record_data_call)
+
+def start_page_profile(page_name):
+    """Begin timing a rerun of a page; no-op unless profiling is enabled"""
+    _active.profile = None
+    if not profiling_enabled():
+        return
+    now = time.perf_counter()
+    _active.profile = {
+        'page': page_name,
+        'started': now,
+        'section': 'Page setup',
+        'section_started': now,
+        'sections': [],
+        'data_calls': [],
+    }
+
+def profile_mark(section_name):
+    """Close the current section and start timing the next one"""
+    profile = getattr(_active, 'profile', None)
+    if profile is None:
+        return
+    now = time.perf_counter()
+    profile['sections'].append({
+        'section': profile['section'],
+        'elapsed_ms': round((now - profile['section_started']) * 1000, 3),
+    })
+    profile['section'] = section_name
+    profile['section_started'] = now
+
+def _widget_count():
+    """Count widgets registered in this rerun (internal API, may be unavailable)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        shared = getattr(ctx, 'shared', None)
+        widget_ids = getattr(shared, 'widget_ids_this_run', None)
+        if widget_ids is None:
+            widget_ids = getattr(ctx, 'widget_ids_this_run', None)
+        if hasattr(widget_ids, 'snapshot'):
+            widget_ids = widget_ids.snapshot()
+        return len(widget_ids) if widget_ids is not None else None
+    except Exception:
+        return None
+
+def _session_state_bytes():
+    """Estimate the memory held by this session's state"""
+    total = 0
+    for key in st.session_state:
+        try:
+            total += len(pickle.dumps(st.session_state[key], protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            total += sys.getsizeof(st.session_state[key])
+    return total
+
+def _peak_rss_mb():
+    """Peak resident memory of the server process"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+def finish_page_profile():
+    """Close the profile, append it to the JSON log and render the overlay"""
+    profile = getattr(_active, 'profile', None)
+    if profile is None:
+        return
+    profile_mark(None)
+    _active.profile = None
+
+    result = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'page': profile['page'],
+        'total_ms': round((time.perf_counter() - profile['started']) * 1000, 3),
+        'sections': profile['sections'],
+        'data_calls': profile['data_calls'],
+        'data_ms': round(sum(call['elapsed_ms'] for call in profile['data_calls']), 3),
+        'widgets': _widget_count(),
+        'session_state_bytes': _session_state_bytes(),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+    try:
+        directory = os.path.dirname(PROFILE_LOG)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(PROFILE_LOG, 'a') as f:
+            f.write(json.dumps(result) + "\n")
+    except OSError:
+        pass
+
+    with st.expander(f"⏱️ Render Profile — {result['total_ms']:.1f} ms", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Rerun Time", f"{result['total_ms']:.1f} ms")
+        col2.metric("Data Calls", f"{result['data_ms']:.1f} ms")
+        col3.metric("Widgets", result['widgets'] if result['widgets'] is not None else "n/a")
+        col4.metric("Session State", f"{result['session_state_bytes'] / 1024:.1f} KB")
+        st.caption(f"Peak server memory: {result['peak_rss_mb']} MB")
+
+        st.markdown("**Sections**")
+        st.dataframe(sorted(result['sections'], key=lambda item: item['elapsed_ms'], reverse=True), use_container_width=True)
+
+        if result['data_calls']:
+            st.markdown("**Data Calls**")
+            st.dataframe(result['data_calls'], use_container_width=True)